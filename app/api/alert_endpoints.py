@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.requests.price_alert_request import PriceAlertRequest
+from app.api.responses.price_alert_response import PriceAlertResponse
+from app.database.model.price_alert import PriceAlert
+from app.dependencies import get_price_alert_service
+from app.service.price_alert_service import PriceAlertService
+
+router = APIRouter(prefix="/bitcoin/alerts", tags=["alerts"])
+
+
+@router.post("", response_model=PriceAlertResponse, status_code=201)
+async def create_alert(alert_request: PriceAlertRequest,
+                       alert_service: PriceAlertService = Depends(get_price_alert_service)):
+    try:
+        alert = await alert_service.create_alert(**alert_request.model_dump())
+        return _to_alert_response(alert)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error creating alert: {str(e)}")
+
+
+@router.get("", response_model=list[PriceAlertResponse])
+async def get_alerts(email: str, alert_service: PriceAlertService = Depends(get_price_alert_service)):
+    # Only the alerts of one subscriber are listed, never the addresses of every subscriber
+    try:
+        alerts = await alert_service.get_alerts(email)
+        return [_to_alert_response(alert) for alert in alerts]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
+
+
+@router.get("/{alert_id}", response_model=PriceAlertResponse)
+async def get_alert(alert_id: int, email: str,
+                    alert_service: PriceAlertService = Depends(get_price_alert_service)):
+    # The alert of another subscriber is answered like a missing one
+    try:
+        alert = await alert_service.get_alert(alert_id, email)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching alert: {str(e)}")
+
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return _to_alert_response(alert)
+
+
+@router.delete("/{alert_id}", status_code=204)
+async def delete_alert(alert_id: int, email: str,
+                       alert_service: PriceAlertService = Depends(get_price_alert_service)):
+    try:
+        deleted = await alert_service.delete_alert(alert_id, email)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error deleting alert: {str(e)}")
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+
+def _to_alert_response(alert: PriceAlert) -> PriceAlertResponse:
+    return PriceAlertResponse(id=alert.id, email=alert.email, asset=alert.asset, vs_currency=alert.vs_currency,
+                              kind=alert.kind, threshold=alert.threshold, window_minutes=alert.window_minutes,
+                              cooldown_seconds=alert.cooldown_seconds, hysteresis_percent=alert.hysteresis_percent,
+                              active=alert.active,
+                              last_triggered_at=(alert.last_triggered_at.strftime("%Y-%m-%d %H:%M:%S")
+                                                 if alert.last_triggered_at else None))
@@ -1,50 +1,229 @@
-from datetime import datetime
+import asyncio
+from datetime import date as date_type, datetime, timedelta, timezone
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
+from app.api.http_cache import cacheable_json_response
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.responses.bitcoin_candle_response import BitcoinCandleResponse
+from app.api.responses.bitcoin_high_low_response import BitcoinHighLowResponse
+from app.api.responses.bitcoin_history_response import BitcoinHistoryResponse
+from app.api.responses.bitcoin_price_page_response import BitcoinPricePageResponse
 from app.api.responses.bitcoin_price_response import BitcoinPriceResponse
+from app.api.responses.bitcoin_stats_response import BitcoinStatsResponse, BitcoinWindowStatsResponse
 from app.api.responses.bitcoin_summary_response import BitcoinSummaryResponse
-from app.dependencies import get_bitcoin_service
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.database.model.bitcoin_summary import utc_today
+from app.dependencies import get_bitcoin_service, get_price_export_service, get_price_stats_service
 from app.service.bitcoin_service import BitcoinService
+from app.service.candle_aggregator import CANDLE_INTERVALS, to_utc_naive
+from app.service.price_export_service import EXPORT_MEDIA_TYPES, PriceExportService, parquet_available
+from app.service.price_stats_service import PriceStatsService, parse_duration
 
 router = APIRouter(prefix="/bitcoin", tags=["bitcoin"])
 
 
 @router.get("/prices/latest", response_model=BitcoinPriceResponse)
-async def get_latest_bitcoin_price(bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+async def get_latest_bitcoin_price(asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                                   bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
     try:
-        latest_price = bitcoin_service.get_latest_price()
-        if latest_price is None:
-            raise HTTPException(status_code=404, detail="No prices found")
-        return BitcoinPriceResponse(id=latest_price.id, price=latest_price.price,
-                                    timestamp=latest_price.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
+        latest_price = await bitcoin_service.get_latest_price_async(asset, vs_currency)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching latest price: {str(e)}")
 
+    if latest_price is None:
+        raise HTTPException(status_code=404, detail="No prices found")
+    return BitcoinPriceResponse(id=latest_price.id, price=latest_price.price,
+                                timestamp=latest_price.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+@router.get("/prices/high-low", response_model=BitcoinHighLowResponse)
+async def get_high_low(asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                       bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+    try:
+        high, low = await bitcoin_service.get_price_extremes_async(asset, vs_currency)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching high and low: {str(e)}")
+
+    if high is None:
+        raise HTTPException(status_code=404, detail="No prices found")
+    return BitcoinHighLowResponse(high=high, low=low, window_days=bitcoin_service.price_extremes.window_days)
+
+
+@router.get("/prices", response_model=BitcoinPricePageResponse)
+async def get_prices(start: Optional[datetime] = Query(None, alias="from"),
+                     end: Optional[datetime] = Query(None, alias="to"),
+                     limit: int = Query(500, ge=1, le=5_000),
+                     after: Optional[str] = None,
+                     asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                     bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+    after_key = None
+    if after is not None:
+        try:
+            after_timestamp, after_id = decode_cursor(after, 2)
+            after_key = (datetime.fromisoformat(after_timestamp), int(after_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        prices, next_key = await bitcoin_service.get_prices_page_async(start, end, limit, after_key, asset, vs_currency)
+        return BitcoinPricePageResponse(
+            items=[BitcoinPriceResponse(id=price.id, price=price.price,
+                                        timestamp=price.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
+                   for price in prices],
+            next_cursor=encode_cursor(next_key[0].isoformat(), next_key[1]) if next_key is not None else None)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching prices: {str(e)}")
+
 
 @router.get("/prices/summary/{date}", response_model=BitcoinSummaryResponse)
-async def get_summary_by_day(date: str, bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+async def get_summary_by_day(date: str, request: Request, asset: str = DEFAULT_ASSET,
+                             vs_currency: str = DEFAULT_VS_CURRENCY,
+                             bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
     try:
         converted_date = datetime.strptime(date, "%Y-%m-%d").date()
-        summary = bitcoin_service.get_summary_by_date(converted_date)
+        summary = await bitcoin_service.get_summary_by_date_async(converted_date, asset, vs_currency)
         if summary is None:
-            return BitcoinSummaryResponse(id=0, max_price=0.0, min_price=0.0,
-                                          date=date)
-        return BitcoinSummaryResponse(id=summary.id, max_price=summary.max_price, min_price=summary.min_price,
-                                      date=summary.day.strftime("%Y-%m-%d"))
+            return cacheable_json_response(request, BitcoinSummaryResponse(id=0, max_price=0.0, min_price=0.0,
+                                                                           date=date), closed=False)
+        # A closed day only changes when prices are backfilled, the current one must always be revalidated
+        return cacheable_json_response(request, _to_summary_response(summary),
+                                       closed=converted_date < utc_today())
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Error fetching summary: {str(e)}")
 
 
 @router.get("/prices/summaries", response_model=list[BitcoinSummaryResponse])
-async def get_all_summaries(bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+async def get_all_summaries(request: Request,
+                            start: Optional[date_type] = Query(None, alias="from"),
+                            end: Optional[date_type] = Query(None, alias="to"),
+                            limit: int = Query(1000, ge=1, le=5_000),
+                            after: Optional[str] = None,
+                            asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                            bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+    after_day = None
+    if after is not None:
+        try:
+            after_day = datetime.strptime(decode_cursor(after, 1)[0], "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
-        summaries = bitcoin_service.get_all_summaries()
-        if summaries is None or len(summaries) == 0:
-            raise HTTPException(status_code=404, detail="No summaries found!")
-        return [BitcoinSummaryResponse(id=summary.id, max_price=summary.max_price, min_price=summary.min_price,
-                                       date=summary.day.strftime("%Y-%m-%d")) for summary in summaries]
+        summaries, next_day = await bitcoin_service.get_summaries_page_async(start, end, limit, after_day, asset,
+                                                                             vs_currency)
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Error fetching summary: {str(e)}")
+
+    if summaries is None or len(summaries) == 0:
+        raise HTTPException(status_code=404, detail="No summaries found!")
+    # The body stays a plain list, the cursor of the next page is sent in a header
+    headers = {"X-Next-Cursor": encode_cursor(next_day.isoformat())} if next_day is not None else None
+    return cacheable_json_response(request, [_to_summary_response(summary) for summary in summaries],
+                                   closed=end is not None and end < utc_today(), headers=headers)
+
+
+@router.get("/candles", response_model=list[BitcoinCandleResponse])
+async def get_candles(interval: Literal["1m", "5m", "1h", "1d"] = "1m",
+                      start: Optional[datetime] = Query(None, alias="from"),
+                      end: Optional[datetime] = Query(None, alias="to"),
+                      limit: int = Query(1000, ge=1, le=10_000),
+                      asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                      bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+    try:
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(seconds=CANDLE_INTERVALS[interval] * limit)
+        candles = await bitcoin_service.get_candles_async(interval, start, end, limit, asset, vs_currency)
+        return [_to_candle_response(candle) for candle in candles]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching candles: {str(e)}")
+
+
+@router.get("/history", response_model=BitcoinHistoryResponse)
+async def get_history(start: datetime = Query(alias="from"),
+                      end: Optional[datetime] = Query(None, alias="to"),
+                      resolution: Optional[int] = Query(None, ge=60),
+                      limit: int = Query(1000, ge=1, le=10_000),
+                      asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                      bitcoin_service: BitcoinService = Depends(get_bitcoin_service)):
+    try:
+        start, end = to_utc_naive(start), to_utc_naive(end or datetime.now(timezone.utc))
+        # Without an explicit resolution, the coarsest one that still returns about limit points is used
+        resolution = resolution or max(int((end - start).total_seconds() / limit), 60)
+        interval, candles = await bitcoin_service.get_history_async(start, end, resolution, limit, asset, vs_currency)
+        return BitcoinHistoryResponse(interval=interval, candles=[_to_candle_response(candle) for candle in candles])
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
+
+
+@router.get("/stats", response_model=BitcoinStatsResponse)
+async def get_stats(windows: str = "1h,24h,7d", asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                    price_stats_service: PriceStatsService = Depends(get_price_stats_service)):
+    window_names = [window.strip() for window in windows.split(",") if window.strip()]
+    try:
+        window_seconds = [parse_duration(window) for window in window_names]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not window_seconds or len(window_seconds) > 10:
+        raise HTTPException(status_code=400, detail="Between 1 and 10 windows must be requested")
+
+    try:
+        # Computing the statistics of a long window takes a few milliseconds, kept off the event loop
+        stats = await asyncio.to_thread(price_stats_service.get_stats, window_seconds, asset, vs_currency)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
+
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No prices found")
+    return BitcoinStatsResponse(
+        price=stats.price,
+        timestamp=datetime.fromtimestamp(stats.timestamp_ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        windows=[BitcoinWindowStatsResponse(window=name, tick_count=window_stats.tick_count, sma=window_stats.sma,
+                                            ema=window_stats.ema, volatility=window_stats.volatility,
+                                            max_drawdown=window_stats.max_drawdown)
+                 for name, window_stats in zip(window_names, stats.windows)],
+        changes=stats.changes)
+
+
+@router.get("/export")
+async def export_prices(start: Optional[datetime] = Query(None, alias="from"),
+                        end: Optional[datetime] = Query(None, alias="to"),
+                        format: Literal["csv", "ndjson", "parquet"] = "csv",
+                        gzip: bool = False,
+                        asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY,
+                        price_export_service: PriceExportService = Depends(get_price_export_service)):
+    end = to_utc_naive(end) if end is not None else datetime.now(timezone.utc).replace(tzinfo=None)
+    start = to_utc_naive(start) if start is not None else None
+    if start is not None and start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow to be installed")
+
+    try:
+        filename = f"{asset}_{vs_currency}_prices.{format}" + (".gz" if gzip else "")
+        # Rows are encoded as they are read, the download starts before the range is fully read
+        return StreamingResponse(price_export_service.export(start, end, format, gzip, asset, vs_currency),
+                                 media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error exporting prices: {str(e)}")
+
+
+def _to_summary_response(summary) -> BitcoinSummaryResponse:
+    return BitcoinSummaryResponse(id=summary.id, max_price=summary.max_price, min_price=summary.min_price,
+                                  date=summary.day.strftime("%Y-%m-%d"))
+
+
+def _to_candle_response(candle) -> BitcoinCandleResponse:
+    return BitcoinCandleResponse(open_time=candle.open_time.strftime("%Y-%m-%d %H:%M:%S"), open=candle.open_price,
+                                 high=candle.high_price, low=candle.low_price, close=candle.close_price,
+                                 tick_count=candle.tick_count)
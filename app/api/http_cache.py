@@ -0,0 +1,39 @@
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# A closed day only changes when prices are backfilled, clients see it at most an hour later
+CLOSED_CACHE_CONTROL = "public, max-age=3600"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def cacheable_json_response(request: Request, content: Any, closed: bool,
+                            headers: Optional[dict[str, str]] = None) -> Response:
+    """
+    Serializes content to JSON with a strong ETag, answering 304 Not Modified when the client already has it.
+
+    :param request: The request, whose If-None-Match header is checked
+    :param content: The response body, encoded like FastAPI does
+    :param closed: Whether the content is of closed days only. Browsers then keep it for an hour, otherwise they
+                   revalidate it on every use
+    :param headers: Extra headers sent with both the 200 and the 304 responses
+    """
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    response_headers = {**(headers or {}), "ETag": etag,
+                        "Cache-Control": CLOSED_CACHE_CONTROL if closed else REVALIDATE_CACHE_CONTROL}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, a W/ prefix does not prevent a match
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
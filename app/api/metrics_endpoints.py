@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from app.metrics.instruments import registry
+from app.metrics.registry import CONTENT_TYPE
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    try:
+        return Response(content=registry.render(), media_type=CONTENT_TYPE)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching metrics: {str(e)}")
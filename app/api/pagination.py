@@ -0,0 +1,30 @@
+import base64
+import binascii
+
+
+def encode_cursor(*values) -> str:
+    """
+    Encodes the keyset values of the last returned row into an opaque, url safe cursor.
+    """
+    raw_cursor = "|".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    """
+    Decodes a cursor created by encode_cursor.
+
+    :param cursor: The cursor received from the client
+    :param size: The number of keyset values the cursor should hold
+    :return: The keyset values, as strings
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        raw_cursor = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor {cursor}") from e
+
+    values = raw_cursor.split("|")
+    if len(values) != size:
+        raise ValueError(f"Invalid cursor {cursor}")
+    return values
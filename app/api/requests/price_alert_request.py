@@ -0,0 +1,25 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+
+class PriceAlertRequest(BaseModel):
+    email: str = Field(max_length=320, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+    asset: str = DEFAULT_ASSET
+    vs_currency: str = DEFAULT_VS_CURRENCY
+    kind: Literal["above", "below", "dip_from_high", "move_within"]
+    # A price for above and below, a percent for dip_from_high and move_within
+    threshold: float = Field(gt=0)
+    window_minutes: Optional[int] = Field(None, ge=1, le=1440)
+    cooldown_seconds: int = Field(3600, ge=0)
+    hysteresis_percent: float = Field(0.0, ge=0, lt=100)
+
+    @model_validator(mode="after")
+    def check_kind_options(self):
+        if self.kind == "move_within" and self.window_minutes is None:
+            raise ValueError("window_minutes is required for move_within alerts")
+        if self.kind == "dip_from_high" and self.threshold >= 100:
+            raise ValueError("The threshold of a dip_from_high alert is a percent below 100")
+        return self
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class BitcoinCandleResponse(BaseModel):
+    open_time: str
+    open: float
+    high: float
+    low: float
+    close: float
+    tick_count: int
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class BitcoinHighLowResponse(BaseModel):
+    high: Optional[float]
+    low: Optional[float]
+    window_days: int
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+from app.api.responses.bitcoin_candle_response import BitcoinCandleResponse
+
+
+class BitcoinHistoryResponse(BaseModel):
+    interval: str
+    candles: list[BitcoinCandleResponse]
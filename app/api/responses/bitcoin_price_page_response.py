@@ -0,0 +1,10 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.api.responses.bitcoin_price_response import BitcoinPriceResponse
+
+
+class BitcoinPricePageResponse(BaseModel):
+    items: list[BitcoinPriceResponse]
+    next_cursor: Optional[str]
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class BitcoinWindowStatsResponse(BaseModel):
+    window: str
+    tick_count: int
+    sma: Optional[float]
+    ema: Optional[float]
+    volatility: Optional[float]
+    max_drawdown: Optional[float]
+
+
+class BitcoinStatsResponse(BaseModel):
+    price: float
+    timestamp: str
+    windows: list[BitcoinWindowStatsResponse]
+    changes: dict[str, Optional[float]]
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ConnectionPoolStatsResponse(BaseModel):
+    pool_size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    checkins: int
+    connects: int
+    invalidations: int
+    overflow_checkouts: int
+    peak_checked_out: int
+    avg_hold_ms: float
+    max_hold_ms: float
+    total_wait_seconds: float
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class PoolStatsResponse(BaseModel):
+    sync: ConnectionPoolStatsResponse
+    # Only present once the API opened its async engine
+    async_pool: Optional[ConnectionPoolStatsResponse] = None
+    # The pools of the read replicas, keyed like the pool label of the db_pool_* metrics: replica0, async_replica0...
+    replicas: dict[str, ConnectionPoolStatsResponse] = {}
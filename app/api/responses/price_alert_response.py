@@ -0,0 +1,17 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PriceAlertResponse(BaseModel):
+    id: int
+    email: str
+    asset: str
+    vs_currency: str
+    kind: str
+    threshold: float
+    window_minutes: Optional[int]
+    cooldown_seconds: int
+    hysteresis_percent: float
+    active: bool
+    last_triggered_at: Optional[str]
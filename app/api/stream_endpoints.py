@@ -0,0 +1,72 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import get_price_broadcaster
+from app.service.price_broadcaster import PriceBroadcaster
+
+router = APIRouter(prefix="/bitcoin", tags=["stream"])
+
+# Sent when no tick arrived for a while, so proxies do not close an idle stream
+HEARTBEAT_SECONDS = 15
+
+
+@router.websocket("/stream")
+async def stream_prices_websocket(websocket: WebSocket, asset: Optional[str] = None,
+                                  vs_currency: Optional[str] = None,
+                                  broadcaster: PriceBroadcaster = Depends(get_price_broadcaster)):
+    await websocket.accept()
+    subscription = broadcaster.subscribe(asset, vs_currency)
+    # The client sends nothing, receiving only tells when it goes away while no tick is pushed
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        while not disconnected.done():
+            next_tick = asyncio.create_task(subscription.get())
+            await asyncio.wait({next_tick, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_tick.done():
+                next_tick.cancel()
+                break
+            tick = next_tick.result()
+            if tick is None:
+                await websocket.close()
+                break
+            await websocket.send_text(tick.json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+@router.get("/stream")
+async def stream_prices_sse(request: Request, asset: Optional[str] = None, vs_currency: Optional[str] = None,
+                            broadcaster: PriceBroadcaster = Depends(get_price_broadcaster)):
+    return StreamingResponse(_sse_events(request, broadcaster, asset, vs_currency), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def _sse_events(request: Request, broadcaster: PriceBroadcaster, asset: Optional[str],
+                      vs_currency: Optional[str]) -> AsyncIterator[bytes]:
+    subscription = broadcaster.subscribe(asset, vs_currency)
+    try:
+        yield b"retry: 3000\n\n"
+        while not await request.is_disconnected():
+            try:
+                tick = await subscription.get(HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if tick is None:
+                break
+            yield tick.sse
+    finally:
+        subscription.close()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
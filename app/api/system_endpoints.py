@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+
+from app.api.responses.pool_stats_response import PoolStatsResponse
+from app.dependencies import db_manager
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/pool", response_model=PoolStatsResponse)
+async def get_pool_stats():
+    try:
+        pool_stats = db_manager.get_pool_stats()
+        return PoolStatsResponse(sync=pool_stats["sync"], async_pool=pool_stats.get("async"),
+                                 replicas={pool: stats for pool, stats in pool_stats.items()
+                                           if pool not in ("sync", "async")})
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=f"Error fetching pool stats: {str(e)}")
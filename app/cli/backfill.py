@@ -0,0 +1,50 @@
+import argparse
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import DatabaseManager
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.database.price_bulk_loader import PriceBulkLoader
+from app.service.price_backfill_service import PriceBackfillService
+from app.service.price_file_reader import detect_format, iter_price_file, open_price_file
+
+
+def _iter_files(paths: list[str], file_format: str, asset: str, vs_currency: str):
+    for path in paths:
+        print(f"Reading {path}")
+        with open_price_file(path) as file:
+            yield from iter_price_file(file, detect_format(path) if file_format == "auto" else file_format, asset,
+                                       vs_currency)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk loads historical prices from CoinGecko market_chart JSON dumps "
+                                                 "or CSV files, then rebuilds the daily summaries of the loaded days.")
+    parser.add_argument("paths", nargs="+", help="Files to load, optionally gzipped")
+    parser.add_argument("--format", choices=["auto", "json", "csv"], default="auto",
+                        help="File format, detected from the extension by default")
+    parser.add_argument("--asset", default=DEFAULT_ASSET, help="Asset of the rows that do not name one")
+    parser.add_argument("--vs-currency", default=DEFAULT_VS_CURRENCY, help="Currency of the rows that do not name one")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows sent to the database per batch")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    db_manager = DatabaseManager()
+    backfill_service = PriceBackfillService(
+        PriceBulkLoader(db_manager.get_engine(), db_manager.get_partition_manager(), args.batch_size),
+        BitcoinRepository(db_manager.get_session()))
+
+    started_at = time.monotonic()
+    result = backfill_service.backfill(_iter_files(args.paths, args.format, args.asset, args.vs_currency))
+    elapsed_seconds = time.monotonic() - started_at
+    print(f"Backfilled {result.loaded_count} prices in {elapsed_seconds:.1f} seconds "
+          f"({result.loaded_count / max(elapsed_seconds, 1e-9):.0f} prices per second)")
+    # The API caches closed days in memory, a running instance must be restarted to serve the backfilled ones
+    print("Restart the API so its caches pick up the backfilled days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import argparse
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.database.database_manager import DatabaseManager
+# The models add their tables to the metadata when imported, only imported tables are created
+from app.database.model import (bitcoin_candle, bitcoin_price, bitcoin_summary, job_lease,  # noqa: F401
+                                outbox_email, price_alert)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Creates the missing tables and indexes of DATABASE_URL. Existing "
+                                                 "ones are left untouched, so it is safe to run on every deployment.")
+    parser.parse_args(argv)
+
+    load_dotenv()
+    db_manager = DatabaseManager()
+    print(f"Creating the schema of {db_manager.engine.url.render_as_string(hide_password=True)}")
+    db_manager.create_tables()
+    print("Schema created")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.model.bitcoin_candle import BitcoinCandle
+from app.database.model.bitcoin_price import BitcoinPrice, DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.database.model.bitcoin_summary import BitcoinSummary
+
+
+class AsyncBitcoinRepository:
+    """
+    Read only repository for the API, built on SQLAlchemy's asyncio extension so queries never block the event loop.
+
+    The session lifetime is owned by the request scoped dependency, so methods do not close it. Writes stay on the
+    synchronous BitcoinRepository used by the jobs.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_latest_price(self, asset: str = DEFAULT_ASSET,
+                               vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinPrice]:
+        result = await self.session.execute(
+            select(BitcoinPrice)
+            .where(BitcoinPrice.asset == asset, BitcoinPrice.vs_currency == vs_currency)
+            .order_by(BitcoinPrice.timestamp.desc())
+            .limit(1))
+        return result.scalars().first()
+
+    async def get_summary_by_day(self, day: date, asset: str = DEFAULT_ASSET,
+                                 vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinSummary]:
+        result = await self.session.execute(
+            select(BitcoinSummary)
+            .where(BitcoinSummary.day == day, BitcoinSummary.asset == asset,
+                   BitcoinSummary.vs_currency == vs_currency))
+        return result.scalars().first()
+
+    async def get_all_summaries(self, asset: str = DEFAULT_ASSET,
+                                vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinSummary]:
+        result = await self.session.execute(
+            select(BitcoinSummary).where(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency))
+        return list(result.scalars().all())
+
+    async def get_summaries_page(self, start_day: Optional[date], end_day: Optional[date], limit: int,
+                                 after: Optional[date] = None, asset: str = DEFAULT_ASSET,
+                                 vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinSummary]:
+        query = select(BitcoinSummary).where(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency)
+        if start_day is not None:
+            query = query.where(BitcoinSummary.day >= start_day)
+        if end_day is not None:
+            query = query.where(BitcoinSummary.day <= end_day)
+        if after is not None:
+            query = query.where(BitcoinSummary.day > after)
+
+        result = await self.session.execute(query.order_by(BitcoinSummary.day).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_prices_page(self, start: Optional[datetime], end: Optional[datetime], limit: int,
+                              after: Optional[tuple[datetime, int]] = None, asset: str = DEFAULT_ASSET,
+                              vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinPrice]:
+        query = select(BitcoinPrice).where(BitcoinPrice.asset == asset, BitcoinPrice.vs_currency == vs_currency)
+        if start is not None:
+            query = query.where(BitcoinPrice.timestamp >= start)
+        if end is not None:
+            query = query.where(BitcoinPrice.timestamp <= end)
+        if after is not None:
+            after_timestamp, after_id = after
+            query = query.where(or_(BitcoinPrice.timestamp > after_timestamp,
+                                    and_(BitcoinPrice.timestamp == after_timestamp, BitcoinPrice.id > after_id)))
+
+        result = await self.session.execute(query.order_by(BitcoinPrice.timestamp, BitcoinPrice.id).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_candles(self, interval: str, start: datetime, end: datetime, limit: int,
+                          asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinCandle]:
+        result = await self.session.execute(
+            select(BitcoinCandle)
+            .where(BitcoinCandle.asset == asset, BitcoinCandle.vs_currency == vs_currency,
+                   BitcoinCandle.interval == interval)
+            .where(BitcoinCandle.open_time >= start, BitcoinCandle.open_time <= end)
+            .order_by(BitcoinCandle.open_time)
+            .limit(limit))
+        return list(result.scalars().all())
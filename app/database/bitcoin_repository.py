@@ -1,82 +1,236 @@
 import datetime
 from datetime import date, datetime, timedelta
-from typing import Optional, Type
+from typing import Iterator, Optional, Type
 
-from sqlalchemy import func
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from app.database.model.bitcoin_price import BitcoinPrice
+from app.database.model.bitcoin_candle import BitcoinCandle
+from app.database.model.bitcoin_price import BitcoinPrice, DEFAULT_ASSET, DEFAULT_VS_CURRENCY
 from app.database.model.bitcoin_summary import BitcoinSummary
 
+# The dialect insert supporting ON CONFLICT, and the scalar greatest and least functions of each backend
+_UPSERT_DIALECTS = {
+    "postgresql": (postgresql.insert, func.greatest, func.least),
+    "sqlite": (sqlite.insert, func.max, func.min),
+}
+
+
+def _upsert_summaries(dialect_name: str, values: list[dict]):
+    if dialect_name not in _UPSERT_DIALECTS:
+        raise ValueError(f"Summary upserts are not supported on {dialect_name}")
+    dialect_insert, greatest, least = _UPSERT_DIALECTS[dialect_name]
+    statement = dialect_insert(BitcoinSummary).values(values)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[BitcoinSummary.asset, BitcoinSummary.vs_currency, BitcoinSummary.day],
+        # min_price is nullable, and SQLite min returns NULL when any argument is
+        set_={"max_price": greatest(BitcoinSummary.max_price, excluded.max_price),
+              "min_price": least(func.coalesce(BitcoinSummary.min_price, excluded.min_price), excluded.min_price)})
+
 
 class BitcoinRepository:
 
     def __init__(self, session: Session):
         self.session = session
 
-    def insert_price(self, price: float, timestamp=None):
-        bitcoin_price = BitcoinPrice(price=price, timestamp=timestamp)
+    def insert_price(self, price: float, timestamp=None, asset: str = DEFAULT_ASSET,
+                     vs_currency: str = DEFAULT_VS_CURRENCY) -> BitcoinPrice:
+        bitcoin_price = BitcoinPrice(price=price, timestamp=timestamp, asset=asset, vs_currency=vs_currency)
 
         self.session.add(bitcoin_price)
         self.session.commit()
         self.session.refresh(bitcoin_price)
 
-    def get_latest_price(self) -> Optional[BitcoinPrice]:
+        return bitcoin_price
+
+    def insert_prices(self, prices: list[dict]) -> list[int]:
+        """
+        Inserts many prices in a single transaction using one multi-row (executemany) insert.
+
+        :param prices: Rows to insert, each one a dict with the price, timestamp, asset and vs_currency keys
+        :return: The ids of the inserted rows, in the same order as the given prices
+        """
+        if not prices:
+            return []
         try:
-            return self.session.query(BitcoinPrice).order_by(BitcoinPrice.timestamp.desc()).first()
+            result = self.session.execute(insert(BitcoinPrice).returning(BitcoinPrice.id, sort_by_parameter_order=True),
+                                          prices)
+            ids = list(result.scalars())
+            self.session.commit()
+
+            return ids
+        except Exception:
+            self.session.rollback()
+            raise
         finally:
             self.session.close()
 
-    def update_summary(self, price: float, day: date):
+    def get_latest_price(self, asset: str = DEFAULT_ASSET,
+                         vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinPrice]:
         try:
-            existing_bitcoin_summary = self.session.query(BitcoinSummary).filter(
-                BitcoinSummary.day == day).first()
-
-            if existing_bitcoin_summary is None:
-                print(f"Adding new summary for the day {day}")
-                summary_to_add = BitcoinSummary(min_price=price, max_price=price, day=day)
-                self.session.add(summary_to_add)
-                self.session.commit()
-                self.session.refresh(summary_to_add)
+            return (self.session.query(BitcoinPrice)
+                    .filter(BitcoinPrice.asset == asset, BitcoinPrice.vs_currency == vs_currency)
+                    .order_by(BitcoinPrice.timestamp.desc())
+                    .first())
+        finally:
+            self.session.close()
 
-                return None
+    def update_summary(self, price: float, day: date, asset: str = DEFAULT_ASSET,
+                       vs_currency: str = DEFAULT_VS_CURRENCY):
+        """
+        Widens the summary of the day with the price, creating it if missing, in one atomic statement.
+        """
+        self.update_summaries([{"price": price, "day": day, "asset": asset, "vs_currency": vs_currency}])
 
-            print(f"Existing summary {existing_bitcoin_summary.id} for the day {day}. Updating prices if needed")
+    def update_summaries(self, prices: list[dict]) -> int:
+        """
+        Widens many day summaries at once with one INSERT ... ON CONFLICT DO UPDATE, keeping the greatest max and the
+        least min of the stored and the new prices.
 
-            if existing_bitcoin_summary.max_price < price:
-                existing_bitcoin_summary.max_price = price
+        The comparison happens in the database, so concurrent writers never lose an update and a tick costs one round
+        trip whatever the number of pairs. Prices of the same summary are merged first, since one statement can only
+        update a row once.
 
-            if existing_bitcoin_summary.min_price > price:
-                existing_bitcoin_summary.min_price = price
+        :param prices: Dicts with the price and the day, and optionally the asset and the vs_currency
+        :return: The number of summaries written
+        """
+        summaries = {}
+        for row in prices:
+            key = (row.get("asset", DEFAULT_ASSET), row.get("vs_currency", DEFAULT_VS_CURRENCY), row["day"])
+            min_price, max_price = summaries.get(key, (row["price"], row["price"]))
+            summaries[key] = (min(min_price, row["price"]), max(max_price, row["price"]))
+        if not summaries:
+            return 0
 
-            self.session.add(existing_bitcoin_summary)
+        # Sorted, so concurrent batches lock their rows in the same order and cannot deadlock
+        values = [{"asset": asset, "vs_currency": vs_currency, "day": day, "min_price": min_price,
+                   "max_price": max_price}
+                  for (asset, vs_currency, day), (min_price, max_price) in sorted(summaries.items())]
+        try:
+            self.session.execute(_upsert_summaries(self.session.get_bind().dialect.name, values))
             self.session.commit()
-            self.session.refresh(existing_bitcoin_summary)
+            return len(values)
+        except Exception:
+            self.session.rollback()
+            raise
         finally:
             self.session.close()
 
-    def get_summary_by_day(self, day: date) -> Optional[BitcoinSummary]:
+    def get_summary_by_day(self, day: date, asset: str = DEFAULT_ASSET,
+                           vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinSummary]:
         try:
-            return self.session.query(BitcoinSummary).filter(BitcoinSummary.day == day).first()
+            return self.session.query(BitcoinSummary).filter(
+                BitcoinSummary.day == day, BitcoinSummary.asset == asset,
+                BitcoinSummary.vs_currency == vs_currency).first()
         finally:
             self.session.close()
 
-    def get_all_summaries(self) -> list[Type[BitcoinSummary]]:
+    def get_all_summaries(self, asset: str = DEFAULT_ASSET,
+                          vs_currency: str = DEFAULT_VS_CURRENCY) -> list[Type[BitcoinSummary]]:
         try:
-            return self.session.query(BitcoinSummary).all()
+            return (self.session.query(BitcoinSummary)
+                    .filter(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency)
+                    .all())
         finally:
             self.session.close()
 
-    def delete_prices_older_than_90_days(self):
+    def get_summaries_page(self, start_day: Optional[date], end_day: Optional[date], limit: int,
+                           after: Optional[date] = None, asset: str = DEFAULT_ASSET,
+                           vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinSummary]:
+        """
+        Returns one page of the pair summaries ordered by day, starting right after the given day.
+
+        :param start_day: First day, inclusive
+        :param end_day: Last day, inclusive
+        :param limit: Maximum number of summaries to return
+        :param after: The day of the last summary of the previous page
+        """
         try:
-            date_to_delete = datetime.now() - timedelta(days=90)
+            query = (self.session.query(BitcoinSummary)
+                     .filter(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency))
+            if start_day is not None:
+                query = query.filter(BitcoinSummary.day >= start_day)
+            if end_day is not None:
+                query = query.filter(BitcoinSummary.day <= end_day)
+            if after is not None:
+                query = query.filter(BitcoinSummary.day > after)
+
+            return query.order_by(BitcoinSummary.day).limit(limit).all()
+        finally:
+            self.session.close()
+
+    def rebuild_summaries(self, start_day: date, end_day: date, asset: str = DEFAULT_ASSET,
+                          vs_currency: str = DEFAULT_VS_CURRENCY) -> int:
+        """
+        Recomputes the pair summaries of a range of days from the stored prices, in one set-based pass.
 
-            print(f"Date to cut: {date_to_delete}")
+        The summaries of the range are deleted and inserted back with one INSERT ... SELECT grouping the prices by
+        day, in a single transaction. Used after a bulk load, instead of updating the summary tick by tick.
 
-            result = self.session.query(BitcoinPrice).filter(BitcoinPrice.timestamp < date_to_delete).delete()
+        :param start_day: First day, inclusive
+        :param end_day: Last day, inclusive
+        :return: The number of summaries written
+        """
+        price_day = func.date(BitcoinPrice.timestamp)
+        try:
+            (self.session.query(BitcoinSummary)
+             .filter(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency,
+                     BitcoinSummary.day >= start_day, BitcoinSummary.day <= end_day)
+             .delete(synchronize_session=False))
+
+            daily_prices = (select(price_day, func.max(BitcoinPrice.price), func.min(BitcoinPrice.price),
+                                   BitcoinPrice.asset, BitcoinPrice.vs_currency)
+                            .where(BitcoinPrice.asset == asset, BitcoinPrice.vs_currency == vs_currency,
+                                   BitcoinPrice.timestamp >= datetime.combine(start_day, datetime.min.time()),
+                                   BitcoinPrice.timestamp < datetime.combine(end_day + timedelta(days=1),
+                                                                             datetime.min.time()))
+                            .group_by(price_day, BitcoinPrice.asset, BitcoinPrice.vs_currency))
+            result = self.session.execute(insert(BitcoinSummary).from_select(
+                ["day", "max_price", "min_price", "asset", "vs_currency"], daily_prices))
             self.session.commit()
 
-            return result
+            return result.rowcount
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def delete_prices_older_than_90_days(self):
+        date_to_delete = datetime.now() - timedelta(days=90)
+
+        print(f"Date to cut: {date_to_delete}")
+
+        return self.delete_prices_older_than(date_to_delete)
+
+    def delete_prices_older_than(self, cutoff: datetime, batch_size: int = 10_000) -> int:
+        """
+        Deletes the prices older than the cutoff in batches, each one in its own short transaction.
+
+        Used when bitcoin_prices is not partitioned. Small batches keep locks short and avoid one huge transaction
+        competing with ingestion.
+
+        :param cutoff: Prices with a timestamp before this are deleted
+        :param batch_size: Maximum number of rows deleted per transaction
+        :return: The number of deleted prices
+        """
+        deleted_count = 0
+        try:
+            while True:
+                ids_to_delete = (self.session.query(BitcoinPrice.id)
+                                 .filter(BitcoinPrice.timestamp < cutoff)
+                                 .limit(batch_size)
+                                 .scalar_subquery())
+                result = (self.session.query(BitcoinPrice)
+                          .filter(BitcoinPrice.id.in_(ids_to_delete))
+                          .delete(synchronize_session=False))
+                self.session.commit()
+
+                deleted_count += result
+                if result < batch_size:
+                    return deleted_count
         finally:
             self.session.close()
 
@@ -86,16 +240,179 @@ class BitcoinRepository:
         finally:
             self.session.close()
 
-    def get_max_historic_price(self, start_date: date, end_date: date = date.today()) -> Optional[float]:
+    def get_prices_page(self, start: Optional[datetime], end: Optional[datetime], limit: int,
+                        after: Optional[tuple[datetime, int]] = None, asset: str = DEFAULT_ASSET,
+                        vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinPrice]:
+        """
+        Returns one page of prices ordered by (timestamp, id), using keyset pagination instead of OFFSET.
+
+        The page starts right after the given (timestamp, id) key, so its cost does not depend on how deep the client
+        paginated.
+
+        :param start: Lower bound of the timestamp, inclusive
+        :param end: Upper bound of the timestamp, inclusive
+        :param limit: Maximum number of prices to return
+        :param after: The (timestamp, id) of the last price of the previous page
+        :return: Up to limit prices
+        """
+        try:
+            query = (self.session.query(BitcoinPrice)
+                     .filter(BitcoinPrice.asset == asset, BitcoinPrice.vs_currency == vs_currency))
+            if start is not None:
+                query = query.filter(BitcoinPrice.timestamp >= start)
+            if end is not None:
+                query = query.filter(BitcoinPrice.timestamp <= end)
+            if after is not None:
+                after_timestamp, after_id = after
+                query = query.filter(or_(BitcoinPrice.timestamp > after_timestamp,
+                                         and_(BitcoinPrice.timestamp == after_timestamp, BitcoinPrice.id > after_id)))
+
+            return query.order_by(BitcoinPrice.timestamp, BitcoinPrice.id).limit(limit).all()
+        finally:
+            self.session.close()
+
+    def get_max_historic_price(self, start_date: date, end_date: date = date.today(), asset: str = DEFAULT_ASSET,
+                               vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[float]:
         try:
+            # Summaries are never removed by the retention, so any period can be queried
             period_length = (end_date - start_date).days
-            if period_length > 90:
-                raise ValueError("Period should not exceed 90 days!")
             if period_length < 0:
                 raise ValueError("Start date must be before or equal end date!")
             return (self.session.query(func.max(BitcoinSummary.max_price))
+                    .filter(BitcoinSummary.asset == asset, BitcoinSummary.vs_currency == vs_currency)
                     .filter(BitcoinSummary.day <= end_date)
                     .filter(BitcoinSummary.day >= start_date)
                     .scalar())
         finally:
             self.session.close()
+
+    def save_candles(self, candles: list, merge: bool = True):
+        """
+        Persists candles in a single transaction.
+
+        A candle whose bucket is already stored (e.g. a partial candle saved on shutdown) is merged into the stored one.
+        With merge disabled the stored candle is overwritten instead, used by rollups built from the complete raw ticks.
+
+        :param candles: Candles with the asset, vs_currency, interval, open_time and OHLC attributes
+        :param merge: Whether to merge with or overwrite an already stored candle of the same bucket
+        """
+        if not candles:
+            return
+        try:
+            for candle in candles:
+                stored_candle = self.session.query(BitcoinCandle).filter(
+                    BitcoinCandle.asset == candle.asset, BitcoinCandle.vs_currency == candle.vs_currency,
+                    BitcoinCandle.interval == candle.interval, BitcoinCandle.open_time == candle.open_time).first()
+
+                if stored_candle is None:
+                    self.session.add(BitcoinCandle(asset=candle.asset, vs_currency=candle.vs_currency,
+                                                   interval=candle.interval, open_time=candle.open_time,
+                                                   open_price=candle.open_price, high_price=candle.high_price,
+                                                   low_price=candle.low_price, close_price=candle.close_price,
+                                                   tick_count=candle.tick_count))
+                    continue
+
+                if not merge:
+                    stored_candle.open_price = candle.open_price
+                    stored_candle.high_price = candle.high_price
+                    stored_candle.low_price = candle.low_price
+                    stored_candle.close_price = candle.close_price
+                    stored_candle.tick_count = candle.tick_count
+                    continue
+
+                stored_candle.high_price = max(stored_candle.high_price, candle.high_price)
+                stored_candle.low_price = min(stored_candle.low_price, candle.low_price)
+                stored_candle.close_price = candle.close_price
+                stored_candle.tick_count += candle.tick_count
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def get_candles(self, interval: str, start: datetime, end: datetime, limit: int, asset: str = DEFAULT_ASSET,
+                    vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinCandle]:
+        try:
+            return (self.session.query(BitcoinCandle)
+                    .filter(BitcoinCandle.asset == asset, BitcoinCandle.vs_currency == vs_currency,
+                            BitcoinCandle.interval == interval)
+                    .filter(BitcoinCandle.open_time >= start, BitcoinCandle.open_time <= end)
+                    .order_by(BitcoinCandle.open_time)
+                    .limit(limit)
+                    .all())
+        finally:
+            self.session.close()
+
+    def delete_candles_older_than(self, interval: str, cutoff: datetime) -> int:
+        try:
+            result = (self.session.query(BitcoinCandle)
+                      .filter(BitcoinCandle.interval == interval, BitcoinCandle.open_time < cutoff)
+                      .delete(synchronize_session=False))
+            self.session.commit()
+
+            return result
+        finally:
+            self.session.close()
+
+    def get_oldest_price_timestamp(self) -> Optional[datetime]:
+        try:
+            return self.session.query(func.min(BitcoinPrice.timestamp)).scalar()
+        finally:
+            self.session.close()
+
+    def get_last_price_id(self) -> Optional[int]:
+        try:
+            return self.session.query(func.max(BitcoinPrice.id)).scalar()
+        finally:
+            self.session.close()
+
+    def get_prices_after_id(self, after_id: int, since: datetime, limit: int) -> list[BitcoinPrice]:
+        """
+        Returns the prices stored after the given one, in the order they were stored. Used to follow the prices
+        another process stores.
+
+        :param after_id: The id of the last price already read
+        :param since: Lower bound of the timestamp, so a partitioned table only scans its recent partitions
+        :param limit: Maximum number of prices to return
+        """
+        try:
+            return (self.session.query(BitcoinPrice)
+                    .filter(BitcoinPrice.id > after_id, BitcoinPrice.timestamp >= since)
+                    .order_by(BitcoinPrice.id)
+                    .limit(limit)
+                    .all())
+        finally:
+            self.session.close()
+
+    def iter_prices(self, start: Optional[datetime], end: datetime, batch_size: int = 5_000,
+                    asset: Optional[str] = None,
+                    vs_currency: Optional[str] = None) -> Iterator[tuple[str, str, datetime, float]]:
+        """
+        Streams the prices of every pair in a time range, ordered by pair and timestamp.
+
+        Rows are read through a server side cursor in batches, so memory stays flat whatever the size of the range.
+
+        :param start: Lower bound of the timestamp, inclusive. None reads from the oldest price
+        :param end: Upper bound of the timestamp, exclusive
+        :param batch_size: Number of rows fetched per round trip
+        :param asset: Only streams this asset when set
+        :param vs_currency: Only streams this currency when set
+        :return: An iterator of (asset, vs_currency, timestamp, price) tuples
+        """
+        try:
+            query = (self.session.query(BitcoinPrice.asset, BitcoinPrice.vs_currency, BitcoinPrice.timestamp,
+                                        BitcoinPrice.price)
+                     .filter(BitcoinPrice.timestamp < end))
+            if start is not None:
+                query = query.filter(BitcoinPrice.timestamp >= start)
+            if asset is not None:
+                query = query.filter(BitcoinPrice.asset == asset)
+            if vs_currency is not None:
+                query = query.filter(BitcoinPrice.vs_currency == vs_currency)
+
+            for row in (query.order_by(BitcoinPrice.asset, BitcoinPrice.vs_currency, BitcoinPrice.timestamp)
+                        .execution_options(yield_per=batch_size)):
+                yield tuple(row)
+        finally:
+            self.session.close()
@@ -1,31 +1,280 @@
 # app/database/database_manager.py
 import os
+from threading import Lock
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from app.database.pool_stats import PoolStats
+from app.database.query_metrics import QueryMetrics
+from app.database.price_partition_manager import PricePartitionManager
+from app.database.replica_router import ReplicaRouter, RoutingSession
+from app.metrics.instruments import metrics_enabled
 
 load_dotenv()
 
 Base = declarative_base()
 
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_database_url(database_url: str):
+    """
+    Returns the url of the same database with an asyncio driver, or None when the async engine cannot be used.
+
+    An in memory SQLite database lives inside one connection, so a second engine would see an empty database.
+    """
+    url: URL = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return None
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        return None
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _split_urls(urls) -> list[str]:
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    return [url.strip() for url in urls or [] if url.strip()]
+
 
 class DatabaseManager:
-    def __init__(self, database_url=None):
+    """
+    Owns the engines and session factories of the database.
+
+    Nothing is created nor connected on construction: the engine is built on first use and the tables are only created
+    by an explicit create_tables call, e.g. from python -m app.cli.create_schema. Importing the app is then free of
+    side effects.
+
+    With read replicas, the read sessions of the API send their queries to a healthy replica and everything else,
+    the jobs included, stays on the primary.
+    """
+
+    def __init__(self, database_url=None, partition_prices=None, pool_size=None, max_overflow=None,
+                 pool_timeout=None, pool_recycle=None, pool_pre_ping=None, read_database_urls=None):
+        """
+        :param read_database_urls: Urls of the read replicas, a list or a comma separated string. Defaults to
+            DATABASE_READ_URL
+        """
         self.database_url = database_url or os.getenv("DATABASE_URL")
+        self.read_database_urls = _split_urls(read_database_urls if read_database_urls is not None
+                                              else os.getenv("DATABASE_READ_URL"))
+        self._pool_settings = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": pool_timeout,
+                               "pool_recycle": pool_recycle, "pool_pre_ping": pool_pre_ping}
+        self._partition_prices = partition_prices
+        self._lock = Lock()
+        self._engine = None
+        self.pool_options = None
+        self.pool_stats = None
+        self.query_metrics = None
+        self.SessionLocal = None
+        self.ReadSessionLocal = None
+        self.replica_engines = []
+        self.replica_pool_stats = []
+        self.replica_router = None
+        self.async_replica_engines = []
+        self.async_database_url = to_async_database_url(self.database_url) if self.database_url else None
+        self.async_engine = None
+        self.async_pool_stats = None
+        self.async_replica_pool_stats = []
+        self.AsyncSessionLocal = None
+        # Sessions are not thread safe, each thread of the jobs gets its own from this registry. It opens its sessions
+        # through get_session, so it can be handed out before the engine exists
+        self.ScopedSession = scoped_session(self.get_session)
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._create_engine()
+        return self._engine
+
+    @property
+    def partition_prices(self) -> bool:
+        partition_prices = self._partition_prices
+        if partition_prices is None:
+            partition_prices = os.getenv("PRICE_PARTITIONING", "false").lower() == "true"
+        return partition_prices and self._get_url().get_backend_name() == "postgresql"
+
+    def _get_url(self) -> URL:
         if not self.database_url:
             raise ValueError("DATABASE_URL is not set and no database_url provided")
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=self.engine)
-        Base.metadata.bind = self.engine
-        Base.metadata.create_all(bind=self.engine)
+        return make_url(self.database_url)
+
+    def _resolve_pool_options(self) -> dict:
+        settings = self._pool_settings
+        pool_options = {
+            "pool_pre_ping": settings["pool_pre_ping"] if settings["pool_pre_ping"] is not None
+            else os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+            "pool_recycle": settings["pool_recycle"] if settings["pool_recycle"] is not None
+            else _env_int("DB_POOL_RECYCLE_SECONDS", 1800),
+        }
+        if self._get_url().get_backend_name() != "sqlite":
+            # SQLite uses its own pools, which have no size nor overflow
+            pool_options.update({
+                "pool_size": settings["pool_size"] if settings["pool_size"] is not None
+                else _env_int("DB_POOL_SIZE", 5),
+                "max_overflow": settings["max_overflow"] if settings["max_overflow"] is not None
+                else _env_int("DB_MAX_OVERFLOW", 10),
+                "pool_timeout": settings["pool_timeout"] if settings["pool_timeout"] is not None
+                else _env_int("DB_POOL_TIMEOUT_SECONDS", 30),
+            })
+        return pool_options
+
+    def _create_engine(self):
+        self.pool_options = self._resolve_pool_options()
+        engine = create_engine(self.database_url, **self.pool_options)
+        self.pool_stats = PoolStats(engine)
+        self.query_metrics = QueryMetrics(engine) if metrics_enabled else None
+        self.SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+        self.ReadSessionLocal = sessionmaker(class_=RoutingSession, autoflush=False, autocommit=False, bind=engine)
+        self.replica_engines = [create_engine(url, **self.pool_options) for url in self.read_database_urls]
+        self.replica_pool_stats = [PoolStats(replica_engine) for replica_engine in self.replica_engines]
+        if metrics_enabled:
+            for replica_engine in self.replica_engines:
+                QueryMetrics(replica_engine)
+        self.replica_router = ReplicaRouter(self.replica_engines,
+                                            float(os.getenv("DB_REPLICA_CHECK_SECONDS", 10)),
+                                            float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 30)))
+        self._engine = engine
 
     def get_session(self):
+        if self.SessionLocal is None:
+            self.get_engine()
         return self.SessionLocal()
 
+    def get_read_session(self) -> Session:
+        """
+        Returns a new session reading from the next healthy replica, or a primary session without replicas.
+
+        Its writes still go to the primary, and its reads too once it wrote, so it reads its own writes.
+        """
+        if not self.read_database_urls:
+            return self.get_session()
+        self.get_engine()
+        index = self.replica_router.choose()
+        return self.ReadSessionLocal(replica=self.replica_engines[index] if index is not None else None)
+
+    def check_replicas(self):
+        if self.read_database_urls:
+            self.get_engine()
+            self.replica_router.check_all()
+
+    def get_scoped_session(self):
+        """
+        Returns the thread local session registry, shared by the long lived repositories of the jobs.
+
+        It proxies to one session per thread, so the fetcher, the cleaner and the write buffer never share a session.
+        """
+        return self.ScopedSession
+
     def get_engine(self):
         return self.engine
 
+    def is_connected(self) -> bool:
+        """
+        Whether the engine was created, i.e. the database was used by this process.
+        """
+        return self._engine is not None
+
+    def supports_async(self):
+        return self.async_database_url is not None
+
+    def get_async_session(self):
+        """
+        Returns a new AsyncSession, used by the API so queries do not block the event loop.
+
+        The async engine is created on first use, so the jobs never open its pool.
+        """
+        if not self.supports_async():
+            raise ValueError(f"No asyncio driver available for {self.engine.dialect.name}")
+        if self.async_engine is None:
+            self.async_engine = create_async_engine(self.async_database_url, **self._resolve_pool_options())
+            self.async_pool_stats = PoolStats(self.async_engine.sync_engine)
+            if metrics_enabled:
+                QueryMetrics(self.async_engine.sync_engine)
+            # Replicas without an asyncio driver keep None, their async reads go to the primary
+            self.async_replica_engines = [create_async_engine(async_url, **self._resolve_pool_options())
+                                          if async_url is not None else None
+                                          for async_url in map(to_async_database_url, self.read_database_urls)]
+            self.async_replica_pool_stats = [PoolStats(async_replica_engine.sync_engine)
+                                             if async_replica_engine is not None else None
+                                             for async_replica_engine in self.async_replica_engines]
+            if metrics_enabled:
+                for async_replica_engine in filter(None, self.async_replica_engines):
+                    QueryMetrics(async_replica_engine.sync_engine)
+            self.AsyncSessionLocal = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False,
+                                                        sync_session_class=RoutingSession)
+        return self.AsyncSessionLocal()
+
+    def get_async_read_session(self):
+        """
+        Returns a new AsyncSession reading from the next healthy replica, like get_read_session.
+        """
+        session = self.get_async_session()
+        if self.read_database_urls:
+            # The replicas are checked with their sync engines
+            self.get_engine()
+            index = self.replica_router.choose()
+            if index is not None and self.async_replica_engines[index] is not None:
+                session.sync_session.replica = self.async_replica_engines[index].sync_engine
+        return session
+
+    async def dispose_async_engine(self):
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        for async_replica_engine in filter(None, self.async_replica_engines):
+            await async_replica_engine.dispose()
+
+    def get_pool_stats(self) -> dict:
+        if self.pool_stats is None:
+            self.get_engine()
+        pool_stats = {"sync": self.pool_stats.snapshot()}
+        if self.async_pool_stats is not None:
+            pool_stats["async"] = self.async_pool_stats.snapshot()
+        for index, replica_pool_stats in enumerate(self.replica_pool_stats):
+            pool_stats[f"replica{index}"] = replica_pool_stats.snapshot()
+        for index, async_replica_pool_stats in enumerate(self.async_replica_pool_stats):
+            if async_replica_pool_stats is not None:
+                pool_stats[f"async_replica{index}"] = async_replica_pool_stats.snapshot()
+        return pool_stats
+
+    def get_partition_manager(self):
+        """
+        Returns the partition manager of bitcoin_prices, or None when the table is not partitioned by day.
+        """
+        if not self.partition_prices:
+            return None
+        partition_manager = PricePartitionManager(self.engine, int(os.getenv("PRICE_PARTITIONS_AHEAD_DAYS", 7)))
+        return partition_manager if partition_manager.is_partitioned() else None
+
+    def get_leader_lock(self, name: str):
+        """
+        Returns the lock electing the one process that runs the named jobs: a Postgres advisory lock, or a lease row
+        of job_leases on the other backends.
+        """
+        # Imported here, the lease model itself imports Base from this module
+        from app.database.leader_lock import AdvisoryLeaderLock, LeaseLeaderLock
+
+        if self.engine.dialect.name == "postgresql":
+            return AdvisoryLeaderLock(self.engine, name)
+        return LeaseLeaderLock(self.engine, name, float(os.getenv("LEADER_LEASE_SECONDS", 30)))
+
     def create_tables(self):
+        """
+        Creates the missing tables and indexes. Existing ones are left untouched.
+        """
+        if self.partition_prices:
+            # The partitioned table is created first so create_all keeps it instead of creating a plain one
+            PricePartitionManager(self.engine).create_partitioned_table()
         Base.metadata.create_all(bind=self.engine)
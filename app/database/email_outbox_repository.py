@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.database.model.outbox_email import OutboxEmail
+
+
+class EmailOutboxRepository:
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def add_emails(self, emails: list[dict]) -> list[int]:
+        """
+        Stores emails to send in one multi-row insert.
+
+        :param emails: Rows to insert, each one a dict with the destination, subject and message keys
+        :return: The ids of the inserted rows, in the same order as the given emails
+        """
+        if not emails:
+            return []
+        try:
+            result = self.session.execute(insert(OutboxEmail).returning(OutboxEmail.id, sort_by_parameter_order=True),
+                                          emails)
+            ids = list(result.scalars())
+            self.session.commit()
+
+            return ids
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def get_pending_emails(self, limit: int = 10_000) -> list[OutboxEmail]:
+        """
+        Returns the emails neither delivered nor given up on, oldest first.
+        """
+        try:
+            return (self.session.query(OutboxEmail)
+                    .filter(OutboxEmail.sent_at.is_(None), OutboxEmail.failed_at.is_(None))
+                    .order_by(OutboxEmail.id)
+                    .limit(limit)
+                    .all())
+        finally:
+            self.session.close()
+
+    def mark_sent(self, email_ids: list[int], sent_at: datetime):
+        if not email_ids:
+            return
+        try:
+            (self.session.query(OutboxEmail)
+             .filter(OutboxEmail.id.in_(email_ids))
+             .update({OutboxEmail.sent_at: sent_at}, synchronize_session=False))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def record_attempts(self, attempts: list[dict]):
+        """
+        Stores the failed attempts of many emails with one executemany update by primary key.
+
+        :param attempts: Rows with the id, attempts, last_error and failed_at keys. failed_at is set on the last attempt
+        """
+        if not attempts:
+            return
+        try:
+            self.session.execute(update(OutboxEmail), attempts)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
@@ -0,0 +1,139 @@
+import os
+import socket
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import insert, or_, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.database.model.job_lease import JobLease
+
+
+def _holder_id() -> str:
+    # Unique per process, and readable enough to tell from the table which host runs the jobs
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+class AdvisoryLeaderLock:
+    """
+    Leadership held as a Postgres session advisory lock, on a connection kept out of the pool.
+
+    Postgres releases the lock as soon as that connection closes, so a crashed or partitioned leader is replaced by
+    the next acquire of another process without waiting for any lease to expire.
+    """
+
+    def __init__(self, engine: Engine, name: str):
+        if engine.dialect.name != "postgresql":
+            raise ValueError("Advisory locks are only supported on Postgres!")
+        self.engine = engine
+        self.name = name
+        # Advisory locks are keyed by a number, derived from the name so every process agrees on it
+        self.key = zlib.crc32(name.encode("utf-8"))
+        self._connection: Optional[Connection] = None
+
+    def acquire(self) -> bool:
+        """
+        Takes the lock if it is free, or checks it is still held when already taken.
+
+        :return: Whether this process holds the lock
+        """
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                self._connection.commit()
+                return True
+            except Exception as e:
+                # The lock went away with the connection
+                print(f"Lost the connection holding the {self.name} lock: {e}")
+                self._close()
+                return False
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            # The lock belongs to the session, ending the transaction does not release it
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def release(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            self._connection.commit()
+        except Exception as e:
+            print(f"An error happened while releasing the {self.name} lock: {e}")
+        finally:
+            self._close()
+
+    def _close(self):
+        try:
+            # Invalidated rather than returned to the pool, so a lock still held on the server goes away with it
+            self._connection.invalidate()
+            self._connection.close()
+        except Exception as e:
+            print(f"An error happened while closing the {self.name} lock connection: {e}")
+        self._connection = None
+
+
+class LeaseLeaderLock:
+    """
+    Leadership held as a row of job_leases, renewed before it expires. Works on every backend.
+
+    A lease that is not renewed within lease_seconds, e.g. because its holder crashed, is taken over by the next
+    acquire of another process. The expiry is compared with the clocks of the processes, which are expected to be
+    within a few seconds of each other.
+    """
+
+    def __init__(self, engine: Engine, name: str, lease_seconds: float = 30):
+        self.engine = engine
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = _holder_id()
+
+    def acquire(self) -> bool:
+        """
+        Takes the lease if it is free or expired, or extends it when already held.
+
+        :return: Whether this process holds the lease
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        with self.engine.begin() as connection:
+            # One conditional update, so two processes can never both take an expired lease
+            renewed = connection.execute(
+                update(JobLease)
+                .where(JobLease.name == self.name, or_(JobLease.holder == self.holder, JobLease.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at)).rowcount
+        if renewed:
+            return True
+
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(JobLease).values(name=self.name, holder=self.holder, expires_at=expires_at))
+            return True
+        except IntegrityError:
+            # Held by another process
+            return False
+
+    def release(self):
+        """
+        Expires the lease if this process holds it, so another process takes over without waiting.
+        """
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(update(JobLease)
+                                   .where(JobLease.name == self.name, JobLease.holder == self.holder)
+                                   .values(expires_at=datetime(1970, 1, 1)))
+        except Exception as e:
+            print(f"An error happened while releasing the {self.name} lease: {e}")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, DateTime, String, UniqueConstraint
+
+from app.database.database_manager import Base
+
+
+class BitcoinCandle(Base):
+    __tablename__ = "bitcoin_candles"
+    __table_args__ = (UniqueConstraint("asset", "vs_currency", "interval", "open_time",
+                                       name="uq_bitcoin_candles_asset_currency_interval_open_time"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    asset = Column(String(64), nullable=False)
+    vs_currency = Column(String(16), nullable=False)
+    interval = Column(String(8), nullable=False)
+    open_time = Column(DateTime, nullable=False)
+    open_price = Column(Float, nullable=False)
+    high_price = Column(Float, nullable=False)
+    low_price = Column(Float, nullable=False)
+    close_price = Column(Float, nullable=False)
+    tick_count = Column(Integer, nullable=False)
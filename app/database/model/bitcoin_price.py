@@ -1,14 +1,21 @@
 import datetime
 
 import pytz
-from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy import Column, Integer, Float, DateTime, String, Index
 
 from app.database.database_manager import Base
 
+DEFAULT_ASSET = "bitcoin"
+DEFAULT_VS_CURRENCY = "usd"
+
 
 class BitcoinPrice(Base):
     __tablename__ = "bitcoin_prices"
+    # Serves the per pair latest price and the (timestamp, id) keyset pagination without sorting
+    __table_args__ = (Index("ix_bitcoin_prices_asset_currency_timestamp_id", "asset", "vs_currency", "timestamp", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     price = Column(Float, nullable=False)
-    timestamp = Column(DateTime, default=datetime.datetime.now(pytz.UTC))
+    timestamp = Column(DateTime, default=lambda: datetime.datetime.now(pytz.UTC), index=True)
+    asset = Column(String(64), nullable=False, default=DEFAULT_ASSET, server_default=DEFAULT_ASSET)
+    vs_currency = Column(String(16), nullable=False, default=DEFAULT_VS_CURRENCY, server_default=DEFAULT_VS_CURRENCY)
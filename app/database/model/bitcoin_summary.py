@@ -1,12 +1,26 @@
-from sqlalchemy import Column, Integer, Float, Date
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Column, Integer, Float, Date, String, UniqueConstraint
 
 from app.database.database_manager import Base
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
 
 
 class BitcoinSummary(Base):
     __tablename__ = "bitcoin_summary"
+    __table_args__ = (UniqueConstraint("asset", "vs_currency", "day", name="uq_bitcoin_summary_asset_currency_day"),)
 
     id = Column(Integer, primary_key=True, index=True)
     max_price = Column(Float, nullable=False)
     min_price = Column(Float)
-    day = Column(Date, unique=True, index=True)
+    day = Column(Date, index=True)
+    asset = Column(String(64), nullable=False, default=DEFAULT_ASSET, server_default=DEFAULT_ASSET)
+    vs_currency = Column(String(16), nullable=False, default=DEFAULT_VS_CURRENCY, server_default=DEFAULT_VS_CURRENCY)
+
+
+def utc_today() -> date:
+    """
+    The current UTC day. Prices are stored in UTC and rebuilt summaries grouped by the day of their timestamp, so a
+    summary always covers a UTC day, whatever the time zone of the server.
+    """
+    return datetime.now(timezone.utc).date()
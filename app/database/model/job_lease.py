@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.database.database_manager import Base
+
+
+class JobLease(Base):
+    """
+    Lease of a job, renewed by the process that runs it. Another process takes it over once it expires.
+    """
+    __tablename__ = "job_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(255), nullable=False)
+    # Naive UTC
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,23 @@
+import datetime
+
+import pytz
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from app.database.database_manager import Base
+
+
+class OutboxEmail(Base):
+    __tablename__ = "email_outbox"
+    # Serves the pending emails lookup at startup
+    __table_args__ = (Index("ix_email_outbox_sent_at_id", "sent_at", "id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    destination = Column(String(320), nullable=False)
+    subject = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    # Set once delivered, or once the last attempt failed
+    sent_at = Column(DateTime)
+    failed_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(pytz.UTC))
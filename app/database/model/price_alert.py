@@ -0,0 +1,27 @@
+import datetime
+
+import pytz
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, String
+
+from app.database.database_manager import Base
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+
+class PriceAlert(Base):
+    __tablename__ = "price_alerts"
+    __table_args__ = (Index("ix_price_alerts_email", "email"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(320), nullable=False)
+    asset = Column(String(64), nullable=False, default=DEFAULT_ASSET)
+    vs_currency = Column(String(16), nullable=False, default=DEFAULT_VS_CURRENCY)
+    # above, below, dip_from_high or move_within
+    kind = Column(String(16), nullable=False)
+    # A price for above and below, a percent for dip_from_high and move_within
+    threshold = Column(Float, nullable=False)
+    window_minutes = Column(Integer)
+    cooldown_seconds = Column(Integer, nullable=False, default=3600)
+    hysteresis_percent = Column(Float, nullable=False, default=0.0)
+    active = Column(Boolean, nullable=False, default=True)
+    last_triggered_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(pytz.UTC))
@@ -0,0 +1,101 @@
+import time
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class PoolStats:
+    """
+    Collects connection pool statistics of an engine from the pool events.
+
+    Besides the live pool status, it counts checkouts, checkins, new connections, invalidations and checkouts that
+    had to use an overflow connection, and measures how long connections are held and how long getting one took.
+    Long holds are what makes other requests wait for a connection, the wait time is what they pay for it.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.peak_checked_out = 0
+        self._total_hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+        self.connection_waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        # The pool has no event before a checkout, so the engine call getting a connection from the pool is timed
+        # instead. The wait includes opening a new connection when the pool has to
+        self._raw_connection = engine.raw_connection
+        engine.raw_connection = self._timed_raw_connection
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _timed_raw_connection(self):
+        started_at = time.monotonic()
+        try:
+            return self._raw_connection()
+        finally:
+            wait_seconds = time.monotonic() - started_at
+            with self._lock:
+                self.connection_waits += 1
+                self.total_wait_seconds += wait_seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_time"] = time.monotonic()
+        checked_out = self._pool_status("checkedout")
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            if self._pool_status("overflow") > 0:
+                self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        checkout_time = connection_record.info.pop("checkout_time", None)
+        with self._lock:
+            self.checkins += 1
+            if checkout_time is not None:
+                hold_seconds = time.monotonic() - checkout_time
+                self._total_hold_seconds += hold_seconds
+                self.max_hold_seconds = max(self.max_hold_seconds, hold_seconds)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _pool_status(self, name: str) -> int:
+        # Only QueuePool reports its size and overflow, the SQLite pools do not
+        status = getattr(self.engine.pool, name, None)
+        return status() if callable(status) else 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"pool_size": self._pool_status("size"),
+                    "checked_out": self._pool_status("checkedout"),
+                    "checked_in": self._pool_status("checkedin"),
+                    # QueuePool counts the connections it has yet to open below its size as a negative overflow
+                    "overflow": max(0, self._pool_status("overflow")),
+                    "checkouts": self.checkouts,
+                    "checkins": self.checkins,
+                    "connects": self.connects,
+                    "invalidations": self.invalidations,
+                    "overflow_checkouts": self.overflow_checkouts,
+                    "peak_checked_out": self.peak_checked_out,
+                    "avg_hold_ms": self._total_hold_seconds / self.checkins * 1000 if self.checkins else 0.0,
+                    "max_hold_ms": self.max_hold_seconds * 1000,
+                    "total_wait_seconds": self.total_wait_seconds,
+                    "avg_wait_ms": self.total_wait_seconds / self.connection_waits * 1000
+                    if self.connection_waits else 0.0,
+                    "max_wait_ms": self.max_wait_seconds * 1000}
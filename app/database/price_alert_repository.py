@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.model.price_alert import PriceAlert
+
+
+class PriceAlertRepository:
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def create_alert(self, **values) -> PriceAlert:
+        try:
+            price_alert = PriceAlert(**values)
+            self.session.add(price_alert)
+            self.session.commit()
+            self.session.refresh(price_alert)
+
+            return price_alert
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def get_alert(self, alert_id: int) -> Optional[PriceAlert]:
+        try:
+            return self.session.get(PriceAlert, alert_id)
+        finally:
+            self.session.close()
+
+    def get_alerts(self, email: Optional[str] = None) -> list[PriceAlert]:
+        try:
+            query = self.session.query(PriceAlert)
+            if email is not None:
+                query = query.filter(PriceAlert.email == email)
+            return query.order_by(PriceAlert.id).all()
+        finally:
+            self.session.close()
+
+    def get_active_alerts(self) -> list[PriceAlert]:
+        try:
+            return self.session.query(PriceAlert).filter(PriceAlert.active.is_(True)).all()
+        finally:
+            self.session.close()
+
+    def delete_alert(self, alert_id: int, email: Optional[str] = None) -> bool:
+        """
+        :param email: When given, the alert is only deleted if it belongs to this subscriber
+        :return: Whether an alert was deleted
+        """
+        try:
+            query = self.session.query(PriceAlert).filter(PriceAlert.id == alert_id)
+            if email is not None:
+                query = query.filter(PriceAlert.email == email)
+            deleted_count = query.delete()
+            self.session.commit()
+
+            return deleted_count > 0
+        finally:
+            self.session.close()
+
+    def mark_triggered(self, alert_ids: list[int], triggered_at: datetime):
+        """
+        Records when alerts were triggered, so their cooldown survives a restart.
+        """
+        if not alert_ids:
+            return
+        try:
+            (self.session.query(PriceAlert)
+             .filter(PriceAlert.id.in_(alert_ids))
+             .update({PriceAlert.last_triggered_at: triggered_at}, synchronize_session=False))
+            self.session.commit()
+        finally:
+            self.session.close()
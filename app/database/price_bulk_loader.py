@@ -0,0 +1,102 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.database.model.bitcoin_price import BitcoinPrice
+from app.database.price_partition_manager import PRICES_TABLE, PricePartitionManager
+
+_COPY_PRICES = f"COPY {PRICES_TABLE} (asset, vs_currency, timestamp, price) FROM STDIN WITH (FORMAT csv)"
+
+
+@dataclass
+class BulkLoadResult:
+    loaded_count: int = 0
+    # The first and last day loaded for each (asset, vs_currency) pair
+    day_ranges: dict[tuple[str, str], tuple[date, date]] = field(default_factory=dict)
+
+
+class PriceBulkLoader:
+    """
+    Loads a stream of prices into bitcoin_prices in large batches, holding only one batch in memory.
+
+    On Postgres with psycopg2 each batch is sent with COPY, elsewhere with one executemany insert. Each batch is
+    committed on its own, and the daily partitions it needs are created first when the table is partitioned.
+    """
+
+    def __init__(self, engine: Engine, partition_manager: Optional[PricePartitionManager] = None,
+                 batch_size: int = 50_000):
+        self.engine = engine
+        self.partition_manager = partition_manager
+        self.batch_size = batch_size
+        self.use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+        self._partitioned_days: Optional[tuple[date, date]] = None
+
+    def load(self, rows: Iterable[tuple[str, str, datetime, float]]) -> BulkLoadResult:
+        """
+        :param rows: The (asset, vs_currency, timestamp, price) rows to load, timestamps in naive UTC
+        :return: How many rows were loaded and the days they cover
+        """
+        result = BulkLoadResult()
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self._track_days(batch, result.day_ranges)
+            self._ensure_partitions(batch)
+            if self.use_copy:
+                self._copy(batch)
+            else:
+                self._insert(batch)
+            result.loaded_count += len(batch)
+            print(f"Loaded {result.loaded_count} prices")
+        return result
+
+    def _copy(self, batch: list[tuple[str, str, datetime, float]]):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows((asset, vs_currency, timestamp.isoformat(sep=" "), repr(price))
+                                     for asset, vs_currency, timestamp, price in batch)
+        buffer.seek(0)
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(_COPY_PRICES, buffer)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def _insert(self, batch: list[tuple[str, str, datetime, float]]):
+        with self.engine.begin() as connection:
+            connection.execute(insert(BitcoinPrice.__table__),
+                               [{"asset": asset, "vs_currency": vs_currency, "timestamp": timestamp, "price": price}
+                                for asset, vs_currency, timestamp, price in batch])
+
+    def _ensure_partitions(self, batch: list[tuple[str, str, datetime, float]]):
+        if self.partition_manager is None:
+            return
+        first_day = min(row[2] for row in batch).date()
+        last_day = max(row[2] for row in batch).date()
+        if self._partitioned_days is not None:
+            if self._partitioned_days[0] <= first_day and last_day <= self._partitioned_days[1]:
+                return
+            first_day = min(first_day, self._partitioned_days[0])
+            last_day = max(last_day, self._partitioned_days[1])
+        self.partition_manager.ensure_partitions(first_day, last_day)
+        self._partitioned_days = (first_day, last_day)
+
+    @staticmethod
+    def _track_days(batch: list[tuple[str, str, datetime, float]],
+                    day_ranges: dict[tuple[str, str], tuple[date, date]]):
+        for asset, vs_currency, timestamp, _ in batch:
+            day = timestamp.date()
+            day_range = day_ranges.get((asset, vs_currency))
+            if day_range is None:
+                day_ranges[(asset, vs_currency)] = (day, day)
+            elif day < day_range[0] or day > day_range[1]:
+                day_ranges[(asset, vs_currency)] = (min(day, day_range[0]), max(day, day_range[1]))
@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+PRICES_TABLE = "bitcoin_prices"
+PARTITION_PREFIX = f"{PRICES_TABLE}_p"
+
+_CREATE_PARTITIONED_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {PRICES_TABLE} (
+    id SERIAL NOT NULL,
+    price DOUBLE PRECISION NOT NULL,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    asset VARCHAR(64) DEFAULT 'bitcoin' NOT NULL,
+    vs_currency VARCHAR(16) DEFAULT 'usd' NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+_CREATE_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS ix_{PRICES_TABLE}_id ON {PRICES_TABLE} (id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{PRICES_TABLE}_timestamp ON {PRICES_TABLE} (timestamp)",
+    f"CREATE INDEX IF NOT EXISTS ix_{PRICES_TABLE}_asset_currency_timestamp_id "
+    f"ON {PRICES_TABLE} (asset, vs_currency, timestamp, id)",
+]
+
+_IS_PARTITIONED = """
+SELECT count(*) FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table_name
+"""
+
+_LIST_PARTITIONS = """
+SELECT c.relname FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+WHERE p.relname = :table_name
+"""
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """
+    Returns the day covered by a partition created by this manager, or None for any other table.
+    """
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+class PricePartitionManager:
+    """
+    Manages the daily range partitions of the bitcoin_prices table on Postgres.
+
+    Each UTC day lives in its own partition, created ahead of time. Retention detaches and drops whole expired
+    partitions, a metadata only operation that neither scans the table nor competes with inserts.
+    """
+
+    def __init__(self, engine: Engine, days_ahead: int = 7):
+        if engine.dialect.name != "postgresql":
+            raise ValueError("Price partitioning is only supported on Postgres!")
+        self.engine = engine
+        self.days_ahead = days_ahead
+
+    def create_partitioned_table(self):
+        """
+        Creates bitcoin_prices as a table partitioned by day, with its indexes and the upcoming partitions.
+
+        Postgres requires the partition key in the primary key, so it is (id, timestamp) instead of id.
+        An existing non partitioned table is left untouched and retention falls back to batched deletes.
+        """
+        with self.engine.begin() as connection:
+            connection.execute(text(_CREATE_PARTITIONED_TABLE))
+            for create_index in _CREATE_INDEXES:
+                connection.execute(text(create_index))
+
+        if self.is_partitioned():
+            self.ensure_partitions()
+        else:
+            print(f"{PRICES_TABLE} already exists and is not partitioned, partitioning is disabled")
+
+    def is_partitioned(self) -> bool:
+        with self.engine.connect() as connection:
+            return connection.execute(text(_IS_PARTITIONED), {"table_name": PRICES_TABLE}).scalar() > 0
+
+    def ensure_partitions(self, start_day: Optional[date] = None, end_day: Optional[date] = None):
+        """
+        Creates the missing daily partitions between start_day and end_day, both inclusive.
+
+        By default it covers yesterday up to days_ahead days from today, so inserts never hit a missing partition.
+        """
+        today = datetime.now(timezone.utc).date()
+        start_day = start_day or today - timedelta(days=1)
+        end_day = end_day or today + timedelta(days=self.days_ahead)
+
+        with self.engine.begin() as connection:
+            day = start_day
+            while day <= end_day:
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {PRICES_TABLE} "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"))
+                day += timedelta(days=1)
+
+    def list_partitions(self) -> dict[str, date]:
+        with self.engine.connect() as connection:
+            names = connection.execute(text(_LIST_PARTITIONS), {"table_name": PRICES_TABLE}).scalars().all()
+        return {name: partition_day(name) for name in names if partition_day(name) is not None}
+
+    def drop_partitions_older_than(self, cutoff: datetime) -> list[str]:
+        """
+        Detaches and drops every partition whose whole day is before the cutoff.
+
+        The partition holding the cutoff itself is kept, so retention has a granularity of one day.
+
+        :param cutoff: Prices older than this are expired (naive UTC)
+        :return: The names of the dropped partitions
+        """
+        expired_partitions = [name for name, day in sorted(self.list_partitions().items(), key=lambda item: item[1])
+                              if day + timedelta(days=1) <= cutoff.date()]
+
+        for name in expired_partitions:
+            # Each partition is dropped in its own short transaction to keep the lock on the parent brief
+            with self.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {PRICES_TABLE} DETACH PARTITION {name}"))
+                connection.execute(text(f"DROP TABLE {name}"))
+            print(f"Dropped expired partition {name}")
+
+        return expired_partitions
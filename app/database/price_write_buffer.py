@@ -0,0 +1,161 @@
+import datetime
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Optional
+
+import pytz
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+OVERFLOW_POLICIES = ("block", "drop_oldest")
+
+
+class PriceWriteBuffer:
+    """
+    Write-behind buffer for bitcoin prices.
+
+    Prices are kept in memory and written as one multi-row insert once the batch size or the age threshold is hit.
+    A background thread flushes rows that got too old between ticks, and stopping the job flushes whatever is pending.
+    When the buffer reaches max_buffer_size the overflow policy decides what happens: "block" flushes synchronously
+    on the caller thread, retrying with a growing backoff, "drop_oldest" discards the oldest pending price.
+    """
+
+    def __init__(self, repository: BitcoinRepository, max_batch_size: int = 100, max_age_seconds: float = 5.0,
+                 max_buffer_size: int = 10_000, overflow_policy: str = "block", flush_retries: int = 3,
+                 retry_backoff_seconds: float = 0.5):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy should be one of {OVERFLOW_POLICIES}!")
+        if max_buffer_size < max_batch_size:
+            raise ValueError("Max buffer size should not be lower than the max batch size!")
+
+        self.repository = repository
+        self.max_batch_size = max_batch_size
+        self.max_age_seconds = max_age_seconds
+        self.max_buffer_size = max_buffer_size
+        self.overflow_policy = overflow_policy
+        self.flush_retries = flush_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.dropped_count = 0
+
+        self._pending: deque[dict] = deque()
+        self._oldest_added_at: Optional[float] = None
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._stop_event = Event()
+        self._thread = None
+
+    def add(self, price: float, timestamp=None, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY):
+        """
+        Buffers a price, flushing the buffer if a threshold is hit.
+
+        :param price: The price to store
+        :param timestamp: The tick timestamp, defaults to now. It is captured here, not at flush time
+        :param asset: The asset the price belongs to
+        :param vs_currency: The currency the price is quoted in
+        :raises BufferError: Under the block policy, when the buffer is still full after every flush retry. The
+            price is not stored then
+        """
+        if self.overflow_policy == "block":
+            self._flush_until_not_full()
+
+        with self._lock:
+            if len(self._pending) >= self.max_buffer_size:
+                if self.overflow_policy == "block":
+                    raise BufferError("Price write buffer is full and could not be flushed")
+                self._pending.popleft()
+                self.dropped_count += 1
+                print(f"Price write buffer is full, dropped the oldest pending price ({self.dropped_count} so far)")
+
+            self._pending.append({"price": price, "timestamp": timestamp or datetime.datetime.now(pytz.UTC),
+                                  "asset": asset, "vs_currency": vs_currency})
+            if self._oldest_added_at is None:
+                self._oldest_added_at = time.monotonic()
+            should_flush = self._is_due()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Writes every pending price in one multi-row insert.
+
+        If the insert fails, the rows are put back in front of the buffer so they are retried on the next flush.
+
+        :return: The number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._pending)
+                self._pending.clear()
+                self._oldest_added_at = None
+
+            if not rows:
+                return 0
+
+            try:
+                self.repository.insert_prices(rows)
+                print(f"Flushed {len(rows)} buffered prices")
+                return len(rows)
+            except Exception as e:
+                print(f"An error happened while flushing buffered prices: {e}")
+                self._requeue(rows)
+                return 0
+
+    def flush_if_due(self) -> int:
+        with self._lock:
+            should_flush = self._is_due()
+        return self.flush() if should_flush else 0
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def is_full(self) -> bool:
+        with self._lock:
+            return len(self._pending) >= self.max_buffer_size
+
+    def _flush_until_not_full(self):
+        # A database blip shorter than the retries does not lose the tick
+        for attempt in range(self.flush_retries + 1):
+            if not self.is_full():
+                return
+            if attempt > 0:
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+            self.flush()
+
+    def _is_due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_batch_size:
+            return True
+        return time.monotonic() - self._oldest_added_at >= self.max_age_seconds
+
+    def _requeue(self, rows: list[dict]):
+        with self._lock:
+            self._pending.extendleft(reversed(rows))
+            while len(self._pending) > self.max_buffer_size:
+                self._pending.popleft()
+                self.dropped_count += 1
+            if self._oldest_added_at is None:
+                self._oldest_added_at = time.monotonic()
+
+    def _run_job(self):
+        while not self._stop_event.wait(self.max_age_seconds):
+            self.flush_if_due()
+
+    def start_job(self):
+        if not self._thread or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = Thread(target=self._run_job)
+            self._thread.daemon = True
+            self._thread.start()
+            print("PriceWriteBuffer flusher started!")
+
+    def stop_job(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        print("PriceWriteBuffer flusher stopped!")
@@ -0,0 +1,67 @@
+import os
+import re
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics.instruments import db_query_duration, db_slow_queries
+from app.metrics.rate_limited_log import RateLimitedLog
+from app.metrics.registry import Counter, Histogram
+
+_OPERATION = re.compile(r"^\s*(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?\S+\s+ON)\s+"
+                    r"(?:IF\s+(?:NOT\s+)?EXISTS\s+)?[\"`]?(\w+)", re.IGNORECASE)
+_MAX_CACHED_STATEMENTS = 1024
+
+
+class QueryMetrics:
+    """
+    Times every statement an engine executes from the cursor events, into a histogram labelled by operation and
+    table, and logs the statements slower than slow_query_seconds.
+
+    The labels of a statement are parsed once and cached, the generated SQL being the same for every call of a query.
+    Only the SQL is logged, never its parameters, and at most once every DB_SLOW_QUERY_LOG_INTERVAL_SECONDS per
+    operation and table, so a slow database does not flood the logs. The counter still counts every slow statement.
+    """
+
+    def __init__(self, engine: Engine, slow_query_seconds: Optional[float] = None,
+                 histogram: Histogram = db_query_duration, slow_query_counter: Counter = db_slow_queries):
+        self.engine = engine
+        self.slow_query_seconds = (slow_query_seconds if slow_query_seconds is not None
+                                   else float(os.getenv("DB_SLOW_QUERY_MS", 250)) / 1000)
+        self.histogram = histogram
+        self.slow_query_counter = slow_query_counter
+        self._labels: dict[str, tuple[str, str]] = {}
+        self._slow_query_log = RateLimitedLog(float(os.getenv("DB_SLOW_QUERY_LOG_INTERVAL_SECONDS", 60)))
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started_at = time.perf_counter()
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        started_at = getattr(context, "_query_started_at", None)
+        if started_at is None:
+            return
+        duration = time.perf_counter() - started_at
+        labels = self._statement_labels(statement)
+        self.histogram.observe(duration, *labels)
+        if duration >= self.slow_query_seconds:
+            self.slow_query_counter.inc(*labels)
+            self._slow_query_log.print(labels, f"Slow query ({duration * 1000:.1f} ms): "
+                                               f"{' '.join(statement.split())[:1000]}")
+
+    def _statement_labels(self, statement: str) -> tuple[str, str]:
+        labels = self._labels.get(statement)
+        if labels is None:
+            operation = _OPERATION.match(statement)
+            table = _TABLE.search(statement)
+            labels = (operation.group(1).upper() if operation else "OTHER", table.group(1) if table else "")
+            if len(self._labels) >= _MAX_CACHED_STATEMENTS:
+                self._labels.clear()
+            self._labels[statement] = labels
+        return labels
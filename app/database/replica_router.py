@@ -0,0 +1,116 @@
+import itertools
+import time
+from threading import Lock, Thread
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Seconds the replica is behind the primary, 0 when it replayed everything it received
+_POSTGRES_REPLICATION_LAG = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class RoutingSession(Session):
+    """
+    Session sending its reads to a replica and everything else to the primary.
+
+    Inserts, updates, deletes, flushes and SELECT ... FOR UPDATE go to the primary. Once the session wrote, its
+    following reads go to the primary too, so a request always reads its own writes.
+    """
+
+    def __init__(self, replica: Optional[Engine] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replica = replica
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.wrote = True
+        elif (self.replica is not None and not self.wrote and clause is not None and clause.is_select
+              and getattr(clause, "_for_update_arg", None) is None):
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Picks the replica serving the next read session, round-robin among the healthy ones.
+
+    A replica is skipped while it cannot be reached or lags the primary by more than max_lag_seconds, and None is
+    returned when no replica is usable, so the reads fall back to the primary. The replicas are checked in the
+    background every check_interval_seconds, when their turn comes, so a slow or unreachable replica never delays a
+    request. Until its first check a replica is not used.
+    """
+
+    def __init__(self, engines: list[Engine], check_interval_seconds: float = 10, max_lag_seconds: float = 30):
+        self.engines = engines
+        self.check_interval_seconds = check_interval_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._turns = itertools.count()
+        self._lock = Lock()
+        self._healthy = [False] * len(engines)
+        self._checked_at: list[Optional[float]] = [None] * len(engines)
+        self.fallback_count = 0
+
+    def choose(self) -> Optional[int]:
+        """
+        :return: The index of the replica to read from, or None to read from the primary
+        """
+        for _ in range(len(self.engines)):
+            index = next(self._turns) % len(self.engines)
+            self._check_if_due(index)
+            if self._healthy[index]:
+                return index
+        if self.engines:
+            self.fallback_count += 1
+        return None
+
+    def check_all(self):
+        """
+        Checks every replica now, e.g. on startup so the reads do not wait for the first background checks.
+        """
+        for index in range(len(self.engines)):
+            with self._lock:
+                self._checked_at[index] = time.monotonic()
+            self._healthy[index] = self.check(index)
+
+    def health(self) -> list[bool]:
+        return list(self._healthy)
+
+    def _check_if_due(self, index: int):
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._checked_at[index]
+            if checked_at is not None and now - checked_at < self.check_interval_seconds:
+                return
+            # Claimed under the lock, so one check runs at a time per replica
+            self._checked_at[index] = now
+        Thread(target=self._store_check, args=(index,), daemon=True).start()
+
+    def _store_check(self, index: int):
+        self._healthy[index] = self.check(index)
+
+    def check(self, index: int) -> bool:
+        """
+        :return: Whether the replica answers and is at most max_lag_seconds behind the primary
+        """
+        engine = self.engines[index]
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name != "postgresql":
+                    connection.execute(text("SELECT 1"))
+                    return True
+                lag_seconds = float(connection.execute(text(_POSTGRES_REPLICATION_LAG)).scalar())
+        except Exception as e:
+            print(f"Read replica {index} is unreachable, its reads go to the primary: {e}")
+            return False
+        if lag_seconds > self.max_lag_seconds:
+            print(f"Read replica {index} lags {lag_seconds:.1f} seconds behind, its reads go to the primary")
+            return False
+        return True
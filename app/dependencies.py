@@ -1,36 +1,191 @@
 import os
-from datetime import date
+from typing import AsyncIterator, Iterator, Optional
 
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.database.async_bitcoin_repository import AsyncBitcoinRepository
 from app.database.bitcoin_repository import BitcoinRepository
 from app.database.database_manager import DatabaseManager
+from app.database.email_outbox_repository import EmailOutboxRepository
+from app.database.model.bitcoin_summary import utc_today
+from app.database.price_alert_repository import PriceAlertRepository
+from app.integration.email_outbox import EmailOutbox
 from app.integration.email_sender_integration import EmailSenderIntegration
+from app.metrics.instruments import registry
 from app.service.bitcoin_price_api_service import BitcoinPriceApiService
 from app.service.bitcoin_service import BitcoinService
+from app.service.candle_aggregator import CandleAggregator
+from app.service.market_snapshot import MarketSnapshot
+from app.service.price_alert_engine import PriceAlertEngine
+from app.service.price_alert_service import PriceAlertService
+from app.service.price_broadcaster import PriceBroadcaster
+from app.service.price_export_service import PriceExportService
+from app.service.price_extremes import PriceExtremes
+from app.service.price_ring_buffer import RecentPrices
+from app.service.price_stats_service import PriceStatsService
+from app.service.summary_cache import SummaryCache
 
 db_manager = DatabaseManager()
+market_snapshot = MarketSnapshot()
+candle_aggregator = CandleAggregator()
+summary_cache = SummaryCache(int(os.getenv("SUMMARY_CACHE_SIZE", 4096)),
+                             float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 3600)))
+# Enough room for every tick of the retention window, plus a day of margin
+recent_prices = RecentPrices((int(os.getenv("PRICE_RETENTION_DAYS", 90)) + 1) * 86400
+                             // max(int(float(os.getenv("BITCOIN_FETCH_INTERVAL_SECONDS", 60))), 1))
+price_stats_service = PriceStatsService(recent_prices)
+price_extremes = PriceExtremes()
+alert_engine = PriceAlertEngine(recent_prices)
+price_broadcaster = PriceBroadcaster(int(os.getenv("STREAM_CLIENT_QUEUE_SIZE", 32)))
+# Emails are sent by a background thread over one SMTP session, optionally stored so a restart does not lose them
+email_outbox = EmailOutbox(EmailSenderIntegration(),
+                           EmailOutboxRepository(db_manager.get_scoped_session())
+                           if os.getenv("EMAIL_OUTBOX_PERSISTENT", "false").lower() == "true" else None,
+                           max_recipients=int(os.getenv("EMAIL_MAX_RECIPIENTS", 50)),
+                           max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", 5)),
+                           retry_backoff_seconds=float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", 2)))
+
+
+def _pool_stat(name: str) -> dict[tuple[str], float]:
+    return {(pool,): stats[name] for pool, stats in db_manager.get_pool_stats().items()}
+
+
+# The values the singletons already track are read when the metrics are scraped
+registry.gauge_callback("db_pool_checked_out", "Connections checked out of the pool",
+                        lambda: _pool_stat("checked_out"), ("pool",))
+registry.gauge_callback("db_pool_overflow", "Overflow connections open beyond the pool size",
+                        lambda: _pool_stat("overflow"), ("pool",))
+registry.counter_callback("db_pool_checkouts_total", "Connections checked out of the pool",
+                          lambda: _pool_stat("checkouts"), ("pool",))
+registry.counter_callback("db_pool_wait_seconds_total", "Time spent waiting for a connection from the pool",
+                          lambda: _pool_stat("total_wait_seconds"), ("pool",))
+registry.counter_callback("db_pool_invalidations_total", "Pooled connections invalidated",
+                          lambda: _pool_stat("invalidations"), ("pool",))
+registry.gauge_callback("db_replica_healthy", "Whether the read replica serves reads",
+                        lambda: {(str(index),): float(healthy) for index, healthy in
+                                 enumerate(db_manager.replica_router.health())} if db_manager.replica_router else {},
+                        ("replica",))
+registry.counter_callback("db_replica_fallbacks_total", "Read sessions sent to the primary as no replica was healthy",
+                          lambda: db_manager.replica_router.fallback_count if db_manager.replica_router else 0)
+registry.gauge_callback("email_outbox_pending", "Emails waiting in the outbox", email_outbox.pending_count)
+registry.counter_callback("email_outbox_sent_total", "Emails sent by the outbox", lambda: email_outbox.sent_count)
+registry.counter_callback("email_outbox_failed_total", "Emails the outbox gave up on",
+                          lambda: email_outbox.failed_count)
+registry.counter_callback("email_outbox_retried_total", "Email sends scheduled for a retry",
+                          lambda: email_outbox.retried_count)
+registry.counter_callback("email_outbox_dropped_total", "Emails dropped because the outbox was full",
+                          lambda: email_outbox.dropped_count)
+registry.gauge_callback("stream_subscribers", "Connected live stream clients",
+                        lambda: price_broadcaster.subscriber_count)
+registry.counter_callback("stream_ticks_published_total", "Ticks pushed to the live stream clients",
+                          lambda: price_broadcaster.published_count)
 
 
 # Dependency functions
-def get_session() -> Session:
-    return db_manager.get_session()
+def get_session() -> Iterator[Session]:
+    # One session per request, always closed so its connection goes back to the pool
+    session = db_manager.get_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_read_session() -> Iterator[Session]:
+    # Like get_session, reading from a replica when there are any
+    session = db_manager.get_read_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+async def get_async_session() -> AsyncIterator[Optional[AsyncSession]]:
+    # One async session per request, closed once the response is sent. None when the database has no asyncio driver.
+    # The API only reads through it, so it reads from a replica when there are any
+    if not db_manager.supports_async():
+        yield None
+        return
+    async with db_manager.get_async_read_session() as session:
+        yield session
 
 
 def get_email_sender() -> EmailSenderIntegration:
     return EmailSenderIntegration()
 
 
-def get_bitcoin_repository(session: Session = Depends(get_session)) -> BitcoinRepository:
+def get_market_snapshot() -> MarketSnapshot:
+    return market_snapshot
+
+
+def get_candle_aggregator() -> CandleAggregator:
+    return candle_aggregator
+
+
+def get_summary_cache() -> SummaryCache:
+    return summary_cache
+
+
+def get_recent_prices() -> RecentPrices:
+    return recent_prices
+
+
+def get_price_stats_service() -> PriceStatsService:
+    return price_stats_service
+
+
+def get_price_extremes() -> PriceExtremes:
+    return price_extremes
+
+
+def get_alert_engine() -> PriceAlertEngine:
+    return alert_engine
+
+
+def get_price_export_service() -> PriceExportService:
+    # Exports outlive the request, they open their own session instead of the request one
+    return PriceExportService(db_manager.get_read_session)
+
+
+def get_price_broadcaster() -> PriceBroadcaster:
+    return price_broadcaster
+
+
+def get_email_outbox() -> EmailOutbox:
+    return email_outbox
+
+
+def get_bitcoin_repository(session: Session = Depends(get_read_session)) -> BitcoinRepository:
     return BitcoinRepository(session)
 
 
+def get_async_bitcoin_repository(
+        session: Optional[AsyncSession] = Depends(get_async_session)) -> Optional[AsyncBitcoinRepository]:
+    return AsyncBitcoinRepository(session) if session is not None else None
+
+
 def get_bitcoin_service(repository: BitcoinRepository = Depends(get_bitcoin_repository),
-                        email_sender: EmailSenderIntegration = Depends(get_email_sender)) -> BitcoinService:
-    return BitcoinService(repository, date.today(), email_sender)
+                        email_sender: EmailSenderIntegration = Depends(get_email_sender),
+                        snapshot: MarketSnapshot = Depends(get_market_snapshot),
+                        aggregator: CandleAggregator = Depends(get_candle_aggregator),
+                        async_repository: Optional[AsyncBitcoinRepository] = Depends(
+                            get_async_bitcoin_repository),
+                        cache: SummaryCache = Depends(get_summary_cache),
+                        prices: RecentPrices = Depends(get_recent_prices),
+                        extremes: PriceExtremes = Depends(get_price_extremes)) -> BitcoinService:
+    return BitcoinService(repository, utc_today(), email_sender, market_snapshot=snapshot,
+                          candle_aggregator=aggregator, async_repository=async_repository, summary_cache=cache,
+                          recent_prices=prices, price_extremes=extremes)
 
 
 def get_bitcoin_price_api_service(
         bitcoin_service: BitcoinService = Depends(get_bitcoin_service)) -> BitcoinPriceApiService:
     return BitcoinPriceApiService(bitcoin_service, os.getenv("BITCOIN_API_URL"))
+
+
+def get_price_alert_service(session: Session = Depends(get_session),
+                            engine: PriceAlertEngine = Depends(get_alert_engine),
+                            outbox: EmailOutbox = Depends(get_email_outbox)) -> PriceAlertService:
+    return PriceAlertService(PriceAlertRepository(session), engine, outbox)
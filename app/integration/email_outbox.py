@@ -0,0 +1,235 @@
+import datetime
+import smtplib
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Optional
+
+import pytz
+
+from app.database.email_outbox_repository import EmailOutboxRepository
+from app.integration.email_sender_integration import EmailSenderIntegration
+
+
+class _OutboxEmail:
+    __slots__ = ("email_id", "destination", "subject", "message", "attempts", "next_attempt_at")
+
+    def __init__(self, destination: str, subject: str, message: str, email_id: Optional[int] = None,
+                 attempts: int = 0):
+        self.email_id = email_id
+        self.destination = destination
+        self.subject = subject
+        self.message = message
+        self.attempts = attempts
+        self.next_attempt_at = 0.0
+
+
+class EmailOutbox:
+    """
+    Queue of emails delivered by a background thread, so sending never blocks the caller on the mail server.
+
+    The sender drains the queue over one SMTP session kept open between batches, sending a message shared by many
+    recipients once with all of them in the envelope, up to max_recipients per transaction. Failed deliveries are
+    retried with an exponential backoff, and given up after max_attempts or when the server refuses the recipient.
+    With a repository the emails are also stored, so the ones still pending are sent after a restart.
+    """
+
+    def __init__(self, email_sender: EmailSenderIntegration, repository: Optional[EmailOutboxRepository] = None,
+                 max_recipients: int = 50, max_attempts: int = 5, retry_backoff_seconds: float = 2.0,
+                 max_backoff_seconds: float = 300.0, max_queue_size: int = 10_000, batch_delay_seconds: float = 0.5,
+                 poll_seconds: float = 1.0):
+        self.email_sender = email_sender
+        self.repository = repository
+        self.max_recipients = max_recipients
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_queue_size = max_queue_size
+        self.batch_delay_seconds = batch_delay_seconds
+        self.poll_seconds = poll_seconds
+        self.sent_count = 0
+        self.failed_count = 0
+        self.retried_count = 0
+        self.dropped_count = 0
+
+        self._pending: deque[_OutboxEmail] = deque()
+        self._lock = Lock()
+        self._drain_lock = Lock()
+        self._wake_event = Event()
+        self._stop_event = Event()
+        self._thread = None
+
+    def send_email(self, message: str, subject: str, destination: str):
+        """
+        Queues an email. Same signature as EmailSenderIntegration.send_email, but returns without waiting for the
+        mail server.
+        """
+        self.enqueue(message, subject, [destination])
+
+    def enqueue(self, message: str, subject: str, destinations: list[str]):
+        """
+        Queues the same email to many destinations, stored with one multi-row insert when the outbox is persistent.
+        """
+        emails = [_OutboxEmail(destination, subject, message) for destination in destinations]
+        if self.repository is not None:
+            try:
+                email_ids = self.repository.add_emails([{"destination": email.destination, "subject": subject,
+                                                         "message": message} for email in emails])
+                for email, email_id in zip(emails, email_ids):
+                    email.email_id = email_id
+            except Exception as e:
+                print(f"An error happened while storing emails in the outbox, they are only queued in memory: {e}")
+        self._append(emails)
+        self._wake_event.set()
+
+    def load_pending(self) -> int:
+        """
+        Queues the stored emails that were not sent yet, e.g. the ones pending when the process stopped.
+
+        :return: The number of queued emails
+        """
+        if self.repository is None:
+            return 0
+        with self._lock:
+            queued_ids = {email.email_id for email in self._pending}
+        emails = [_OutboxEmail(email.destination, email.subject, email.message, email.id, email.attempts)
+                  for email in self.repository.get_pending_emails(self.max_queue_size)
+                  if email.id not in queued_ids]
+        self._append(emails)
+        print(f"Loaded {len(emails)} pending emails from the outbox")
+        return len(emails)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self) -> int:
+        """
+        Sends every queued email whose next attempt is due.
+
+        :return: The number of delivered emails
+        """
+        with self._drain_lock:
+            emails = self._take_due()
+            if not emails:
+                return 0
+
+            sent_emails, failed_attempts = [], []
+            batches = self._batches(emails)
+            for index, batch in enumerate(batches):
+                try:
+                    refused_recipients = self.email_sender.send_batch(batch[0].message, batch[0].subject,
+                                                                      [email.destination for email in batch])
+                except smtplib.SMTPRecipientsRefused as e:
+                    refused_recipients = e.recipients
+                except Exception as e:
+                    # The server or the session is failing, the remaining batches wait for the backoff as well
+                    print(f"An error happened when sending emails, retrying them later: {e}")
+                    for failed_batch in batches[index:]:
+                        failed_attempts.extend(self._retry_later(failed_batch, str(e)))
+                    break
+
+                for email in batch:
+                    if email.destination in refused_recipients:
+                        print(f"The mail server refused {email.destination}, giving up")
+                        failed_attempts.append(self._give_up(email, str(refused_recipients[email.destination])))
+                    else:
+                        sent_emails.append(email)
+
+            self.sent_count += len(sent_emails)
+            print(f"Sent {len(sent_emails)} emails, {self.pending_count()} pending")
+            self._store_results(sent_emails, failed_attempts)
+            return len(sent_emails)
+
+    def _take_due(self) -> list[_OutboxEmail]:
+        now = time.monotonic()
+        with self._lock:
+            due_emails = [email for email in self._pending if email.next_attempt_at <= now]
+            if due_emails:
+                self._pending = deque(email for email in self._pending if email.next_attempt_at > now)
+            return due_emails
+
+    def _batches(self, emails: list[_OutboxEmail]) -> list[list[_OutboxEmail]]:
+        emails_by_content: dict[tuple[str, str], list[_OutboxEmail]] = {}
+        for email in emails:
+            emails_by_content.setdefault((email.subject, email.message), []).append(email)
+        return [same_emails[start:start + self.max_recipients]
+                for same_emails in emails_by_content.values()
+                for start in range(0, len(same_emails), self.max_recipients)]
+
+    def _retry_later(self, emails: list[_OutboxEmail], error: str) -> list[dict]:
+        failed_attempts, retried_emails = [], []
+        for email in emails:
+            email.attempts += 1
+            if email.attempts >= self.max_attempts:
+                print(f"Giving up on the email to {email.destination} after {email.attempts} attempts")
+                failed_attempts.append(self._give_up(email, error))
+                continue
+            backoff_seconds = min(self.retry_backoff_seconds * 2 ** (email.attempts - 1), self.max_backoff_seconds)
+            email.next_attempt_at = time.monotonic() + backoff_seconds
+            retried_emails.append(email)
+            failed_attempts.append(self._attempt_row(email, error))
+
+        self.retried_count += len(retried_emails)
+        self._append(retried_emails)
+        return failed_attempts
+
+    def _give_up(self, email: _OutboxEmail, error: str) -> dict:
+        self.failed_count += 1
+        return self._attempt_row(email, error, failed_at=datetime.datetime.now(pytz.UTC))
+
+    @staticmethod
+    def _attempt_row(email: _OutboxEmail, error: str, failed_at: Optional[datetime.datetime] = None) -> dict:
+        return {"id": email.email_id, "attempts": email.attempts, "last_error": error, "failed_at": failed_at}
+
+    def _store_results(self, sent_emails: list[_OutboxEmail], failed_attempts: list[dict]):
+        if self.repository is None:
+            return
+        try:
+            self.repository.mark_sent([email.email_id for email in sent_emails if email.email_id is not None],
+                                      datetime.datetime.now(pytz.UTC))
+            self.repository.record_attempts([attempt for attempt in failed_attempts if attempt["id"] is not None])
+        except Exception as e:
+            print(f"An error happened while storing the outbox delivery results: {e}")
+
+    def _append(self, emails: list[_OutboxEmail]):
+        with self._lock:
+            self._pending.extend(emails)
+            dropped_count = max(len(self._pending) - self.max_queue_size, 0)
+            for _ in range(dropped_count):
+                self._pending.popleft()
+            self.dropped_count += dropped_count
+        if dropped_count:
+            print(f"Email outbox is full, dropped the oldest emails ({self.dropped_count} so far)")
+
+    def _run_job(self):
+        while not self._stop_event.is_set():
+            if self._wake_event.wait(self.poll_seconds):
+                # Gives a burst of alerts the time to be queued, so their recipients share transactions
+                self._stop_event.wait(self.batch_delay_seconds)
+            self._wake_event.clear()
+            self.drain()
+            self.email_sender.close_if_idle()
+
+    def start_job(self):
+        if not self._thread or not self._thread.is_alive():
+            try:
+                self.load_pending()
+            except Exception as e:
+                print(f"An error happened while loading the pending emails: {e}")
+            self._stop_event.clear()
+            self._thread = Thread(target=self._run_job)
+            self._thread.daemon = True
+            self._thread.start()
+            print("EmailOutbox sender started!")
+
+    def stop_job(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join()
+        self.drain()
+        self.email_sender.close()
+        if self.pending_count():
+            print(f"EmailOutbox stopped with {self.pending_count()} emails waiting for a retry")
+        print("EmailOutbox sender stopped!")
@@ -1,29 +1,111 @@
 import os
 import smtplib
+import time
 from email.mime.text import MIMEText
+from threading import Lock
+from typing import Optional
+
+from app.metrics.instruments import email_send_duration
+
+UNDISCLOSED_RECIPIENTS = "undisclosed-recipients:;"
 
 
 class EmailSenderIntegration:
 
-    def __init__(self):
+    def __init__(self, keep_alive_seconds: Optional[float] = None):
         self.sender_email = os.getenv("SENDER_EMAIL")
         self.sender_email_password = os.getenv("SENDER_EMAIL_PASSWORD")
         self.smtp_address = os.getenv("SMTP_ADDRESS")
         self.smtp_port = os.getenv("SMTP_PORT")
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        self.keep_alive_seconds = (keep_alive_seconds if keep_alive_seconds is not None
+                                   else float(os.getenv("SMTP_KEEP_ALIVE_SECONDS", 30)))
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used_at = 0.0
+        self._lock = Lock()
 
     def send_email(self, message: str, subject: str, destination: str):
+        """
+        Sends a single email right away on the calling thread, then closes the session. Notifications sent from the
+        ingestion path go through the EmailOutbox instead.
+        """
         try:
-            email_message = self._create_email_message(message, subject, destination)
-            with smtplib.SMTP(self.smtp_address, int(self.smtp_port)) as server:
+            self.send_batch(message, subject, [destination])
+            print("Message sent successfully!")
+        except Exception as e:
+            print(f"An error happened when sending email {e}")
+        finally:
+            self.close()
+
+    def send_batch(self, message: str, subject: str, recipients: list[str]) -> dict:
+        """
+        Sends one message to many recipients in a single SMTP transaction, over the session kept open between calls.
+
+        With several recipients they are only in the envelope, so they do not see each other. A session the server
+        closed in between is reopened once.
+
+        :return: The recipients the server refused, keyed by address
+        :raises smtplib.SMTPException: If the message could not be sent
+        """
+        destination = recipients[0] if len(recipients) == 1 else UNDISCLOSED_RECIPIENTS
+        email_message = self._create_email_message(message, subject, destination)
+        with self._lock:
+            started_at = time.perf_counter()
+            outcome = "failed"
+            try:
+                try:
+                    refused_recipients = self._get_server().send_message(email_message, to_addrs=recipients)
+                except smtplib.SMTPServerDisconnected:
+                    self._close_server()
+                    refused_recipients = self._get_server().send_message(email_message, to_addrs=recipients)
+                except smtplib.SMTPRecipientsRefused:
+                    raise
+                except Exception:
+                    # The session may be in any state, the next send starts a new one
+                    self._close_server()
+                    raise
+                outcome = "sent"
+            finally:
+                email_send_duration.observe(time.perf_counter() - started_at, outcome)
+            self._last_used_at = time.monotonic()
+            return refused_recipients
+
+    def close_if_idle(self):
+        """
+        Closes the kept open session once it was not used for keep_alive_seconds, before the server drops it.
+        """
+        with self._lock:
+            if self._server is not None and time.monotonic() - self._last_used_at >= self.keep_alive_seconds:
+                self._close_server()
+
+    def close(self):
+        with self._lock:
+            self._close_server()
+
+    def _get_server(self) -> smtplib.SMTP:
+        if self._server is None:
+            server = smtplib.SMTP(self.smtp_address, int(self.smtp_port))
+            try:
                 print("Log in into smtp server")
-                server.starttls()
-                server.login(self.sender_email, self.sender_email_password)
+                if self.use_starttls:
+                    server.starttls()
+                if self.sender_email_password:
+                    server.login(self.sender_email, self.sender_email_password)
                 print("Log in successfully!")
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+        return self._server
 
-                server.send_message(email_message)
-                print("Message sent successfully!")
-        except Exception as e:
-            print(f"An error happened when sending email {e}")
+    def _close_server(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
 
     def _create_email_message(self, message: str, subject: str, destination: str) -> MIMEText:
         email_message = MIMEText(message)
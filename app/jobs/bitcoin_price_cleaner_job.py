@@ -1,23 +1,68 @@
+from datetime import datetime, timedelta, timezone
 from threading import Event, Thread
+from typing import Optional
 
 from app.database.bitcoin_repository import BitcoinRepository
+from app.database.price_partition_manager import PricePartitionManager
+from app.service.price_ring_buffer import RecentPrices
+from app.service.price_rollup_service import PriceRollupService
 
 
 class BitcoinPriceCleaner:
 
-    def __init__(self, bitcoin_repository: BitcoinRepository):
+    def __init__(self, bitcoin_repository: BitcoinRepository,
+                 partition_manager: Optional[PricePartitionManager] = None, retention_days: int = 90,
+                 delete_batch_size: int = 10_000, rollup_service: Optional[PriceRollupService] = None,
+                 recent_prices: Optional[RecentPrices] = None):
         self._stop_event = Event()
         self._thread = None
         self.bitcoin_repository = bitcoin_repository
-        self.start_job()
+        self.partition_manager = partition_manager
+        self.rollup_service = rollup_service
+        self.recent_prices = recent_prices
+        self.retention_days = retention_days
+        self.delete_batch_size = delete_batch_size
 
     def _run_job(self):
-        while not self._stop_event.wait(86400):
-            print("Removing bitcoin prices older than 90 days!")
-            self.bitcoin_repository.delete_prices_older_than_90_days()
+        # Runs once at start, a process restarted more often than daily would otherwise never create the partitions
+        while True:
+            self.apply_retention()
+            if self._stop_event.wait(86400):
+                return
+
+    def apply_retention(self):
+        """
+        Removes the prices older than the retention window.
+
+        The expiring prices are first rolled up into the coarser candle tiers, and nothing is removed if that fails.
+        On a partitioned table the upcoming partitions are created and the expired ones dropped whole. Otherwise the
+        expired rows are deleted in small batches. The cutoff is aligned on a UTC day so both strategies and the
+        rollup cover exactly the same prices. Once they are removed, the in-memory recent prices are trimmed with the
+        same cutoff, so memory never holds less than the database.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        cutoff = datetime.combine(now.date() - timedelta(days=self.retention_days), datetime.min.time())
+        try:
+            if self.rollup_service is not None:
+                self.rollup_service.roll_up_prices_older_than(cutoff)
+                self.rollup_service.apply_candle_retention(now)
+
+            if self.partition_manager is not None:
+                print(f"Dropping bitcoin price partitions older than {self.retention_days} days!")
+                self.partition_manager.ensure_partitions()
+                self.partition_manager.drop_partitions_older_than(cutoff)
+            else:
+                print(f"Removing bitcoin prices older than {self.retention_days} days!")
+                deleted_count = self.bitcoin_repository.delete_prices_older_than(cutoff, self.delete_batch_size)
+                print(f"{deleted_count} bitcoin prices removed")
+
+            if self.recent_prices is not None:
+                self.recent_prices.trim_older_than(cutoff)
+        except Exception as e:
+            print(f"An error happened while applying the retention: {e}")
 
     def start_job(self):
-        if not self._thread or not self._thread._is_alive():
+        if not self._thread or not self._thread.is_alive():
             self._stop_event.clear()
             self._thread = Thread(target=self._run_job)
             self._thread.daemon = True
@@ -1,30 +1,45 @@
-from threading import Event, Thread
+import asyncio
+from typing import Optional
 
 from app.service.bitcoin_price_api_service import BitcoinPriceApiService
 
 
 class BitcoinPriceFetcher:
-    def __init__(self, bitcoin_price_api_service: BitcoinPriceApiService):
-        self._stop_event = Event()
-        self._thread = None
+    def __init__(self, bitcoin_price_api_service: BitcoinPriceApiService, interval_seconds: float = 60):
+        self._stop_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
         self.bitcoin_price_api_service = bitcoin_price_api_service
-        self.start_job()
+        self.interval_seconds = interval_seconds
 
-    def _run_job(self):
-        while not self._stop_event.wait(60):
-            print("Fetching latest bitcoin price each 60 seconds")
-            self.bitcoin_price_api_service.fetch_latest_price()
+    async def _run_job(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.interval_seconds
+        while not await self._wait_for_stop(next_tick - loop.time()):
+            print(f"Fetching latest bitcoin price each {self.interval_seconds} seconds")
+            await self.bitcoin_price_api_service.fetch_latest_price()
+
+            # Ticks are scheduled at a fixed rate, so a slow fetch does not push every following tick back
+            next_tick = max(next_tick + self.interval_seconds, loop.time())
+
+    async def _wait_for_stop(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=max(timeout, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
 
     def start_job(self):
-        if not self._thread or not self._thread.is_alive():
-            self._stop_event.clear()
-            self._thread = Thread(target=self._run_job)
-            self._thread.daemon = True
-            self._thread.start()
+        """
+        Starts the fetcher as a task on the running event loop. Must be called from within the loop.
+        """
+        if not self._task or self._task.done():
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run_job())
             print("BitcoinPriceFetcher job started!")
 
-    def stop_job(self):
-        self._stop_event.set()
-        if self._thread:
-            self._thread.join()
+    async def stop_job(self):
+        if self._stop_event:
+            self._stop_event.set()
+        if self._task:
+            await self._task
         print("BitcoinPriceFetcher job stopped!")
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, Union
+
+from app.database.database_manager import DatabaseManager
+from app.database.leader_lock import AdvisoryLeaderLock, LeaseLeaderLock
+
+
+class LeaderElection:
+    """
+    Elects the one process that runs the jobs which must not run twice, e.g. the fetcher and the cleaner when the API
+    is served by several workers or instances.
+
+    Every interval the process tries to take, or keeps, the leader lock. on_elected runs when it becomes the leader
+    and on_demoted when it loses the lock or stops, so the jobs move to another process when the leader goes away.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, name: str, on_elected: Callable[[], Awaitable[None]],
+                 on_demoted: Callable[[], Awaitable[None]], interval_seconds: float = 10):
+        self._stop_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.db_manager = db_manager
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval_seconds = interval_seconds
+        self.lock: Optional[Union[AdvisoryLeaderLock, LeaseLeaderLock]] = None
+        self.is_leader = False
+
+    @property
+    def is_stopping(self) -> bool:
+        return self._stop_event is not None and self._stop_event.is_set()
+
+    async def elect(self) -> bool:
+        """
+        Tries to take or keep the lock, and runs the callback when the leadership changed.
+
+        :return: Whether this process is the leader
+        """
+        try:
+            if self.lock is None:
+                self.lock = await asyncio.to_thread(self.db_manager.get_leader_lock, self.name)
+            is_leader = await asyncio.to_thread(self.lock.acquire)
+        except Exception as e:
+            print(f"An error happened while electing the {self.name} leader: {e}")
+            # The lock cannot be confirmed, another process may take it over
+            is_leader = False
+
+        if is_leader != self.is_leader:
+            self.is_leader = is_leader
+            print(f"This process {'is now' if is_leader else 'is no longer'} the {self.name} leader")
+            try:
+                await (self.on_elected() if is_leader else self.on_demoted())
+            except Exception as e:
+                print(f"An error happened while switching the {self.name} jobs: {e}")
+        return is_leader
+
+    async def _run_job(self):
+        while True:
+            await self.elect()
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    def start_job(self):
+        """
+        Starts the election as a task on the running event loop. Must be called from within the loop.
+        """
+        if not self._task or self._task.done():
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run_job())
+            print("LeaderElection job started!")
+
+    async def stop_job(self):
+        """
+        Stops the election, stopping the jobs first when this process leads so they never run without the lock.
+        """
+        if self._stop_event:
+            self._stop_event.set()
+        if self._task:
+            await self._task
+        if self.is_leader:
+            self.is_leader = False
+            await self.on_demoted()
+        if self.lock is not None:
+            await asyncio.to_thread(self.lock.release)
+        print("LeaderElection job stopped!")
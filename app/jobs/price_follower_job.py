@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from threading import Event, Thread
+from typing import Optional
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.service.bitcoin_service import BitcoinService
+
+
+class PriceFollower:
+    """
+    Keeps the in-memory state of an API only process current while another process fetches and stores the prices.
+
+    Every interval the prices stored since the last run are read in id order and applied through the bitcoin service,
+    so the latest price, the current day summary, the stats and the live streams lag the fetcher by one interval at
+    most.
+    """
+
+    def __init__(self, repository: BitcoinRepository, bitcoin_service: BitcoinService, interval_seconds: float = 60,
+                 batch_size: int = 1_000):
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self.repository = repository
+        self.bitcoin_service = bitcoin_service
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._last_id: Optional[int] = None
+        self._last_timestamp: Optional[datetime] = None
+
+    def follow(self) -> int:
+        """
+        Applies the prices stored since the previous call. The first call only records where to start from, the
+        prices stored before it are loaded at startup.
+
+        :return: The number of applied prices
+        """
+        if self._last_id is None:
+            self._last_id = self.repository.get_last_price_id() or 0
+            self._last_timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+            return 0
+
+        applied_count = 0
+        while True:
+            # The write behind buffer may store prices a little after their timestamp
+            since = self._last_timestamp - timedelta(hours=1)
+            prices = self.repository.get_prices_after_id(self._last_id, since, self.batch_size)
+            if not prices:
+                return applied_count
+            self.bitcoin_service.apply_stored_prices(prices)
+            self._last_id = prices[-1].id
+            self._last_timestamp = max(self._last_timestamp, max(price.timestamp for price in prices))
+            applied_count += len(prices)
+            if len(prices) < self.batch_size:
+                return applied_count
+
+    def _run_job(self):
+        while True:
+            try:
+                self.follow()
+            except Exception as e:
+                print(f"An error happened while following the stored prices: {e}")
+            if self._stop_event.wait(self.interval_seconds):
+                return
+
+    def start_job(self):
+        if not self._thread or not self._thread.is_alive():
+            # Restarted after this process stored the prices itself, the prices stored meanwhile are already applied
+            self._last_id = None
+            self._stop_event.clear()
+            self._thread = Thread(target=self._run_job)
+            self._thread.daemon = True
+            self._thread.start()
+            print("PriceFollower job started!")
+
+    def stop_job(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        print("PriceFollower job stopped!")
@@ -1,25 +1,190 @@
+import asyncio
 import os
-from datetime import date
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.alert_endpoints import router as alert_router
 from app.api.endpoints import router as bitcoin_router
+from app.api.metrics_endpoints import router as metrics_router
+from app.api.stream_endpoints import router as stream_router
+from app.api.system_endpoints import router as system_router
 from app.database.bitcoin_repository import BitcoinRepository
-from app.dependencies import db_manager
+from app.database.model.bitcoin_summary import utc_today
+from app.database.price_alert_repository import PriceAlertRepository
+from app.database.price_write_buffer import PriceWriteBuffer
+from app.dependencies import (alert_engine, candle_aggregator, db_manager, email_outbox, market_snapshot,
+                              price_broadcaster, price_extremes, recent_prices)
 from app.integration.email_sender_integration import EmailSenderIntegration
 from app.jobs.bitcoin_price_cleaner_job import BitcoinPriceCleaner
 from app.jobs.bitcoin_price_fetcher_job import BitcoinPriceFetcher
-from app.service.bitcoin_price_api_service import BitcoinPriceApiService
+from app.jobs.leader_election_job import LeaderElection
+from app.jobs.price_follower_job import PriceFollower
+from app.metrics.instruments import metrics_enabled
+from app.metrics.middleware import MetricsMiddleware
+from app.service.bitcoin_price_api_service import BitcoinPriceApiService, create_http_client
 from app.service.bitcoin_service import BitcoinService
-
-# Initialization
-app = FastAPI()
+from app.service.price_alert_service import PriceAlertService
+from app.service.price_rollup_service import PriceRollupService
 
 load_dotenv()
 
+
+def _split_env(name: str) -> list[str]:
+    return [value.strip() for value in os.getenv(name, "").split(",") if value.strip()]
+
+
+# all runs the API and the jobs in one process, api and jobs split them so the API can be scaled on its own
+APP_ROLES = ("all", "api", "jobs")
+app_role = os.getenv("APP_ROLE", "all").lower()
+if app_role not in APP_ROLES:
+    raise ValueError(f"APP_ROLE should be one of {', '.join(APP_ROLES)}, got {app_role}")
+runs_jobs = app_role in ("all", "jobs")
+# Several workers or instances elect one of them to fetch, clean and send the alerts
+leader_election_enabled = runs_jobs and os.getenv("LEADER_ELECTION", "true").lower() == "true"
+
+# The jobs run in several threads, the scoped session gives each thread its own session. Nothing below connects to
+# the database nor starts a thread, that is left to the lifespan
+session = db_manager.get_scoped_session()
+bitcoin_repository = BitcoinRepository(session)
+price_write_buffer = None
+if runs_jobs and os.getenv("PRICE_WRITE_BEHIND", "false").lower() == "true":
+    price_write_buffer = PriceWriteBuffer(bitcoin_repository,
+                                          max_batch_size=int(os.getenv("PRICE_WRITE_BATCH_SIZE", 100)),
+                                          max_age_seconds=float(os.getenv("PRICE_WRITE_MAX_AGE_SECONDS", 5)),
+                                          max_buffer_size=int(os.getenv("PRICE_WRITE_MAX_BUFFER_SIZE", 10_000)),
+                                          overflow_policy=os.getenv("PRICE_WRITE_OVERFLOW_POLICY", "block"),
+                                          flush_retries=int(os.getenv("PRICE_WRITE_FLUSH_RETRIES", 3)),
+                                          retry_backoff_seconds=float(
+                                              os.getenv("PRICE_WRITE_RETRY_BACKOFF_SECONDS", 0.5)))
+# The process running the jobs does not see the alerts created through the API of the other processes, it reloads
+# them instead
+price_alert_service = PriceAlertService(PriceAlertRepository(session), alert_engine, email_outbox,
+                                        sync_interval_seconds=float(os.getenv("ALERTS_SYNC_SECONDS", 60))
+                                        if app_role == "jobs" or leader_election_enabled else None)
+bitcoin_service = BitcoinService(bitcoin_repository, utc_today(), EmailSenderIntegration(), price_write_buffer,
+                                 market_snapshot, candle_aggregator, recent_prices=recent_prices,
+                                 price_extremes=price_extremes, alert_service=price_alert_service,
+                                 price_broadcaster=price_broadcaster)
+bitcoin_price_api_service = BitcoinPriceApiService(bitcoin_service, os.getenv("BITCOIN_API_URL"),
+                                                   max_retries=int(os.getenv("BITCOIN_API_MAX_RETRIES", 3)),
+                                                   assets=_split_env("TRACKED_ASSETS"),
+                                                   vs_currencies=_split_env("TRACKED_VS_CURRENCIES"))
+
+# Jobs
+bitcoin_fetch_interval_seconds = float(os.getenv("BITCOIN_FETCH_INTERVAL_SECONDS", 60))
+bitcoin_price_fetcher_job = BitcoinPriceFetcher(bitcoin_price_api_service, bitcoin_fetch_interval_seconds)
+price_retention_days = int(os.getenv("PRICE_RETENTION_DAYS", 90))
+bitcoin_price_cleaner_job = BitcoinPriceCleaner(bitcoin_repository,
+                                                retention_days=price_retention_days,
+                                                delete_batch_size=int(os.getenv("PRICE_DELETE_BATCH_SIZE", 10_000)),
+                                                rollup_service=PriceRollupService(bitcoin_repository,
+                                                                                  price_retention_days),
+                                                recent_prices=recent_prices)
+# A process that does not fetch applies the prices the leader stores instead
+price_follower_job = PriceFollower(bitcoin_repository, bitcoin_service, bitcoin_fetch_interval_seconds)
+# An all process only follows the prices while another one is elected
+follows_prices = app_role == "api" or (app_role == "all" and leader_election_enabled)
+
+
+async def _start_ingestion():
+    """
+    Starts the jobs that must only run in one process.
+    """
+    if follows_prices:
+        await asyncio.to_thread(price_follower_job.stop_job)
+    try:
+        # Picks up the alerts created through the other processes
+        await asyncio.to_thread(price_alert_service.sync_alerts)
+    except Exception as e:
+        print(f"An error happened while loading the price alerts: {e}")
+    email_outbox.start_job()
+    bitcoin_price_fetcher_job.start_job()
+    bitcoin_price_cleaner_job.start_job()
+
+
+async def _stop_ingestion():
+    await bitcoin_price_fetcher_job.stop_job()
+    await asyncio.to_thread(bitcoin_price_cleaner_job.stop_job)
+    await asyncio.to_thread(bitcoin_service.save_open_candles)
+    # Alerts of the last ticks are sent before another process takes over
+    await asyncio.to_thread(email_outbox.stop_job)
+    if follows_prices and not leader_election.is_stopping:
+        price_follower_job.start_job()
+
+
+leader_election = LeaderElection(db_manager, "ingestion", _start_ingestion, _stop_ingestion,
+                                 float(os.getenv("LEADER_RENEW_SECONDS", 10)))
+
+
+def _http_client():
+    return create_http_client(connect_timeout=float(os.getenv("BITCOIN_API_CONNECT_TIMEOUT", 5)),
+                              read_timeout=float(os.getenv("BITCOIN_API_READ_TIMEOUT", 10)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("CREATE_SCHEMA_ON_STARTUP", "false").lower() == "true":
+        # Meant for development, deployments run python -m app.cli.create_schema once instead
+        await asyncio.to_thread(db_manager.create_tables)
+    if app_role != "jobs":
+        try:
+            # The API reads from the replicas from its first request instead of waiting for their background checks
+            await asyncio.to_thread(db_manager.check_replicas)
+        except Exception as e:
+            print(f"An error happened while checking the read replicas: {e}")
+    try:
+        # The recent prices are loaded before the first tick, so the in-memory window has no gap
+        retention_start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=price_retention_days)
+        await asyncio.to_thread(recent_prices.hydrate, bitcoin_repository, retention_start)
+    except Exception as e:
+        print(f"An error happened while loading the recent prices: {e}")
+
+    if follows_prices:
+        price_follower_job.start_job()
+    if runs_jobs:
+        try:
+            # Checking whether the prices table is partitioned needs the database, so it is not done on import
+            partition_manager = await asyncio.to_thread(db_manager.get_partition_manager)
+            if partition_manager is not None:
+                # Inserts fail once the partitions created ahead of time run out
+                await asyncio.to_thread(partition_manager.ensure_partitions)
+            bitcoin_price_cleaner_job.partition_manager = partition_manager
+        except Exception as e:
+            print(f"An error happened while checking the price partitions: {e}")
+        bitcoin_price_api_service.client = _http_client()
+        if price_write_buffer is not None:
+            price_write_buffer.start_job()
+        if leader_election_enabled:
+            leader_election.start_job()
+        else:
+            await _start_ingestion()
+    yield
+
+    if leader_election_enabled:
+        # Demotes this process first, so the jobs are stopped before the lock is released
+        await leader_election.stop_job()
+    elif runs_jobs:
+        await _stop_ingestion()
+    if follows_prices:
+        await asyncio.to_thread(price_follower_job.stop_job)
+    price_broadcaster.close()
+    if runs_jobs:
+        await bitcoin_price_api_service.aclose()
+        if price_write_buffer is not None:
+            # Pending prices must reach the database before the process exits
+            price_write_buffer.stop_job()
+    await db_manager.dispose_async_engine()
+    session.remove()
+
+
+# Initialization
+app = FastAPI(lifespan=lifespan)
+
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
     CORSMiddleware,
@@ -27,19 +192,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
-
-session = db_manager.get_session()
-bitcoin_repository = BitcoinRepository(session)
-bitcoin_service = BitcoinService(bitcoin_repository, date.today(), EmailSenderIntegration())
-bitcoin_price_api_service = BitcoinPriceApiService(bitcoin_service, os.getenv("BITCOIN_API_URL"))
-
-# Jobs
-bitcoin_price_fetcher_job = BitcoinPriceFetcher(bitcoin_price_api_service)
-bitcoin_price_cleaner_job = BitcoinPriceCleaner(bitcoin_repository)
+if metrics_enabled:
+    # Added last so it is the outermost middleware and its timings include the others
+    app.add_middleware(MetricsMiddleware)
 
 # Include the router
 app.include_router(bitcoin_router)
+app.include_router(alert_router)
+app.include_router(stream_router)
+app.include_router(system_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host=os.getenv("APP_HOST", "localhost"), port=os.getenv("APP_PORT", 8000))
@@ -0,0 +1,25 @@
+import os
+
+from app.metrics.registry import MetricsRegistry
+
+# The metrics of the process, exposed by /metrics. Recording stays on in production unless METRICS_ENABLED is false
+registry = MetricsRegistry()
+metrics_enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, until its response is fully sent",
+    ("method", "route", "status"))
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Time to execute a database statement", ("operation", "table"))
+db_slow_queries = registry.counter(
+    "db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS", ("operation", "table"))
+price_fetch_duration = registry.histogram(
+    "price_fetch_duration_seconds", "Time to fetch the prices from the price API, retries included")
+price_fetch_errors = registry.counter(
+    "price_fetch_errors_total", "Fetches of the prices that failed, by exception", ("error",))
+price_fetch_retries = registry.counter(
+    "price_fetch_retries_total", "Requests to the price API that were retried")
+price_ingest_duration = registry.histogram(
+    "price_ingest_duration_seconds", "Time from the start of a fetch until its prices are committed")
+email_send_duration = registry.histogram(
+    "email_send_duration_seconds", "Time to send one message over SMTP, connection included", ("outcome",))
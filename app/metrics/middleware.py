@@ -0,0 +1,38 @@
+import time
+
+from app.metrics.instruments import http_request_duration
+from app.metrics.registry import Histogram
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into a latency histogram labelled by method, route and status.
+
+    Requests are labelled with the path template of the route they matched, e.g. /bitcoin/prices/summary/{date}, so
+    the number of series stays bounded whatever the requested paths. The ones matching no route share one label.
+    """
+
+    def __init__(self, app, histogram: Histogram = http_request_duration):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope it was given
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.histogram.observe(time.perf_counter() - started_at, scope["method"], route, str(status_code))
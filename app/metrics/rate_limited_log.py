@@ -0,0 +1,32 @@
+import time
+from threading import Lock
+from typing import Hashable
+
+
+class RateLimitedLog:
+    """
+    Prints a message at most once every interval_seconds per key, so a hot path failing or slowing down on every call
+    does not flood stdout. The next message printed for the key tells how many were suppressed meanwhile.
+
+    The keys must come from a bounded set, e.g. metric names or (operation, table) labels.
+    """
+
+    def __init__(self, interval_seconds: float = 60):
+        self.interval_seconds = interval_seconds
+        self._lock = Lock()
+        self._last_printed: dict[Hashable, tuple[float, int]] = {}
+
+    def print(self, key: Hashable, message: str) -> bool:
+        """
+        :return: Whether the message was printed
+        """
+        now = time.monotonic()
+        with self._lock:
+            printed_at, suppressed_count = self._last_printed.get(key, (None, 0))
+            if printed_at is not None and now - printed_at < self.interval_seconds:
+                self._last_printed[key] = (printed_at, suppressed_count + 1)
+                return False
+            self._last_printed[key] = (now, 0)
+
+        print(f"{message} ({suppressed_count} similar messages suppressed)" if suppressed_count else message)
+        return True
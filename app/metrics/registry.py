@@ -0,0 +1,189 @@
+import math
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Union
+
+from app.metrics.rate_limited_log import RateLimitedLog
+
+# Seconds, from a cached read to a slow upstream call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    """
+    A monotonically increasing value per combination of label values.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, self.label_names, label_values, value) for label_values, value in values]
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets per combination of label values.
+
+    Recording is one bisect and two additions under a lock, buckets are only made cumulative when rendered.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # Per label values, the count of each bucket then of +Inf, and the sum of the observations
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        with self._lock:
+            series = [(label_values, list(counts), total[0]) for label_values, (counts, total) in self._series.items()]
+
+        samples = []
+        bucket_label_names = self.label_names + ("le",)
+        for label_values, counts, total in series:
+            cumulative_count = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative_count += count
+                samples.append((f"{self.name}_bucket", bucket_label_names, label_values + (_format_value(bound),),
+                                cumulative_count))
+            samples.append((f"{self.name}_sum", self.label_names, label_values, total))
+            samples.append((f"{self.name}_count", self.label_names, label_values, cumulative_count))
+        return samples
+
+
+class CallbackMetric:
+    """
+    A gauge or counter read from a callback when the metrics are scraped, for values another object already tracks.
+
+    The callback returns a single value, or a dict of values keyed by label values.
+    """
+
+    def __init__(self, name: str, documentation: str, type_name: str,
+                 callback: Callable[[], Union[float, dict[tuple[str, ...], float]]],
+                 label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.type_name = type_name
+        self.label_names = label_names
+        self.callback = callback
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, self.label_names, label_values, value) for label_values, value in values.items()]
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Union[Counter, Histogram, CallbackMetric]] = {}
+        self._lock = Lock()
+        # A callback failing on every scrape is logged once a minute
+        self._error_log = RateLimitedLog(60)
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable,
+                       label_names: tuple[str, ...] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "gauge", callback, label_names), replace=True)
+
+    def counter_callback(self, name: str, documentation: str, callback: Callable,
+                         label_names: tuple[str, ...] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "counter", callback, label_names), replace=True)
+
+    def _register(self, metric, replace: bool = False):
+        """
+        :param replace: Whether a metric registered again replaces the previous one, for callbacks bound to objects
+            that can be rebuilt
+        """
+        with self._lock:
+            if metric.name in self._metrics and not replace:
+                raise ValueError(f"A metric named {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                self._error_log.print(metric.name, f"An error happened while collecting the {metric.name} metric: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, label_names, label_values, value in samples:
+                lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: tuple[str, ...]) -> str:
+    if not label_names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(str(value))}"'
+                          for name, value in zip(label_names, label_values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
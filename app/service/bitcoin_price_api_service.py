@@ -1,28 +1,180 @@
-import requests
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
 
+import httpx
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.metrics.instruments import price_fetch_duration, price_fetch_errors, price_fetch_retries, price_ingest_duration
 from app.service.bitcoin_service import BitcoinService
 
+DEFAULT_API_URL = "https://api.coingecko.com/api/v3/simple/price"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def create_http_client(connect_timeout: float = 5.0, read_timeout: float = 10.0,
+                       max_connections: int = 4, keepalive_expiry: float = 120.0) -> httpx.AsyncClient:
+    """
+    Creates the persistent keep-alive client used to talk to the price API.
+
+    The same client is reused for every tick so the TCP and TLS handshakes are paid once and not per request.
+
+    :param connect_timeout: Seconds to wait for a connection to be established
+    :param read_timeout: Seconds to wait for the response (also used for write and pool timeouts)
+    :param max_connections: Maximum number of pooled connections
+    :param keepalive_expiry: Seconds an idle connection is kept open before being discarded
+    :return: An httpx.AsyncClient configured with timeouts and connection limits
+    """
+    return httpx.AsyncClient(timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                             limits=httpx.Limits(max_connections=max_connections,
+                                                 max_keepalive_connections=max_connections,
+                                                 keepalive_expiry=keepalive_expiry))
+
 
 class BitcoinPriceApiService:
 
-    def __init__(self, bitcoin_service: BitcoinService, api_url):
+    def __init__(self, bitcoin_service: BitcoinService, api_url, client: Optional[httpx.AsyncClient] = None,
+                 max_retries: int = 3, backoff_factor: float = 0.5, max_backoff: float = 30.0,
+                 assets: Optional[list[str]] = None, vs_currencies: Optional[list[str]] = None):
+        api_url = api_url or DEFAULT_API_URL
+        query = parse_qs(urlsplit(api_url).query)
         self.bitcoin_service = bitcoin_service
-        self.api_url = api_url
+        self.assets = assets or _split_param(query.get("ids"), DEFAULT_ASSET)
+        self.vs_currencies = vs_currencies or _split_param(query.get("vs_currencies"), DEFAULT_VS_CURRENCY)
+        self.api_url = _build_price_url(api_url, self.assets, self.vs_currencies)
+        self._client = client
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.last_fetch_latency: Optional[float] = None
 
-    def fetch_latest_price(self):
-        try:
-            print(f"Fetching bitcoin price from {self.api_url}")
-            response = requests.get(self.api_url)
-            response.raise_for_status()
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use, loading the TLS certificates is not free and only the jobs need the client
+        if self._client is None:
+            self._client = create_http_client()
+        return self._client
 
-            data = response.json()
-            bitcoin_price: float = float(data["bitcoin"]["usd"])
+    @client.setter
+    def client(self, client: httpx.AsyncClient):
+        self._client = client
 
-            print(f"Price of {bitcoin_price} fetched successfully! Updating database")
-            self.bitcoin_service.update_price(bitcoin_price)
+    async def fetch_latest_price(self):
+        """
+        Fetches the latest price of every configured (asset, vs_currency) pair and stores them through the bitcoin
+        service.
 
-            return bitcoin_price
+        All pairs are fetched with a single request and ingested as one batch.
+        The request is retried with exponential backoff on timeouts, connection errors and retryable status codes.
+        The database update runs in a worker thread so the event loop is never blocked by it.
+        The fetch duration, the time until the prices are committed and the failures are recorded in the metrics.
+
+        :return: The fetched prices keyed by (asset, vs_currency), or None if the prices could not be fetched
+        """
+        try:
+            print(f"Fetching prices from {self.api_url}")
+            started_at = time.perf_counter()
+            data = await self._get_with_retries()
+            prices = self._parse_prices(data)
+            self.last_fetch_latency = time.perf_counter() - started_at
+            price_fetch_duration.observe(self.last_fetch_latency)
+
+            print(f"{len(prices)} prices fetched successfully in {self.last_fetch_latency * 1000:.1f} ms! "
+                  f"Updating database")
+            await asyncio.to_thread(self.bitcoin_service.update_prices, prices)
+            price_ingest_duration.observe(time.perf_counter() - started_at)
+
+            return prices
 
         except Exception as e:
-            print(f"An error occurred while fetching bitcoin price from the {self.api_url}! {e}")
+            price_fetch_errors.inc(type(e).__name__)
+            print(f"An error occurred while fetching prices from the {self.api_url}! {e}")
             return None
+
+    def _parse_prices(self, data: dict) -> dict[tuple[str, str], float]:
+        prices = {}
+        for asset in self.assets:
+            for vs_currency in self.vs_currencies:
+                price = data.get(asset, {}).get(vs_currency)
+                if price is None:
+                    print(f"No {asset}/{vs_currency} price in the response")
+                    continue
+                prices[(asset, vs_currency)] = float(price)
+
+        if not prices:
+            raise ValueError("No configured price found in the response")
+        return prices
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def _get_with_retries(self) -> dict:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(self.api_url)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                delay = self._retry_delay(attempt, response)
+                print(f"Price API answered {response.status_code}, retrying in {delay:.2f} seconds")
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                print(f"Price API request failed ({e!r}), retrying in {delay:.2f} seconds")
+
+            attempt += 1
+            price_fetch_retries.inc()
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Computes how long to wait before the next attempt.
+
+        A Retry-After header (in seconds or as an HTTP date) takes precedence over the exponential backoff.
+        The result is always capped by max_backoff.
+        """
+        if response is not None and "Retry-After" in response.headers:
+            retry_after = _parse_retry_after(response.headers["Retry-After"])
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+
+        return min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+
+def _split_param(values: Optional[list[str]], default: str) -> list[str]:
+    if not values:
+        return [default]
+    return [value.strip() for value in values[0].split(",") if value.strip()]
+
+
+def _build_price_url(api_url: str, assets: list[str], vs_currencies: list[str]) -> str:
+    """
+    Rewrites the ids and vs_currencies query parameters of the configured simple/price url, keeping the others.
+    """
+    url = urlsplit(api_url)
+    query = {key: values[0] for key, values in parse_qs(url.query).items()}
+    query["ids"] = ",".join(assets)
+    query["vs_currencies"] = ",".join(vs_currencies)
+    return urlunsplit(url._replace(query=urlencode(query, safe=",")))
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
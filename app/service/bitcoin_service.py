@@ -1,137 +1,606 @@
+import asyncio
 import os
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional
 
+import pytz
+
+from app.database.async_bitcoin_repository import AsyncBitcoinRepository
 from app.database.bitcoin_repository import BitcoinRepository
-from app.database.model.bitcoin_price import BitcoinPrice
-from app.database.model.bitcoin_summary import BitcoinSummary
+from app.database.model.bitcoin_price import BitcoinPrice, DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.database.model.bitcoin_summary import BitcoinSummary, utc_today
+from app.database.price_write_buffer import PriceWriteBuffer
 from app.integration.email_sender_integration import EmailSenderIntegration
+from app.service.candle_aggregator import Candle, CandleAggregator, to_utc_naive
+from app.service.market_snapshot import DailySummary, MarketSnapshot, PriceTick
+from app.service.price_alert_service import PriceAlertService
+from app.service.price_broadcaster import PriceBroadcaster
+from app.service.price_extremes import PriceExtremes, SlidingWindowExtrema
+from app.service.price_ring_buffer import RecentPrices
+from app.service.price_rollup_service import PriceRollupService
+from app.service.summary_cache import SummaryCache
+
+DEFAULT_PAIR = (DEFAULT_ASSET, DEFAULT_VS_CURRENCY)
 
 
 class BitcoinService:
     _bitcoin_summary_cache = {}
     _curr_date = None
 
-    def __init__(self, repository: BitcoinRepository, current_date: date, email_sender: EmailSenderIntegration):
+    def __init__(self, repository: BitcoinRepository, current_date: date, email_sender: EmailSenderIntegration,
+                 price_writer: Optional[PriceWriteBuffer] = None, market_snapshot: Optional[MarketSnapshot] = None,
+                 candle_aggregator: Optional[CandleAggregator] = None,
+                 rollup_service: Optional[PriceRollupService] = None,
+                 async_repository: Optional[AsyncBitcoinRepository] = None,
+                 summary_cache: Optional[SummaryCache] = None, recent_prices: Optional[RecentPrices] = None,
+                 price_extremes: Optional[PriceExtremes] = None,
+                 alert_service: Optional[PriceAlertService] = None,
+                 price_broadcaster: Optional[PriceBroadcaster] = None):
         self.repository = repository
+        self.price_broadcaster = price_broadcaster
+        self.alert_service = alert_service
+        self.price_extremes = price_extremes or PriceExtremes()
+        self.recent_prices = recent_prices
+        self.summary_cache = summary_cache
+        self.async_repository = async_repository
         self.email_sender = email_sender
+        self.price_writer = price_writer
+        self.market_snapshot = market_snapshot
+        self.candle_aggregator = candle_aggregator
+        self.rollup_service = rollup_service or PriceRollupService(repository)
+        self._snapshot_seeded_days: dict[tuple[str, str], date] = {}
         self._curr_date = current_date
-        self._bitcoin_summary_cache = {'min_price': 999_999_999.0,
-                                       'max_price': 0.0,
-                                       'current_date': self._curr_date}
-        self.current_price = 0.0
-        self.max_historic_price = 0.0
+        self._summary_caches: dict[tuple[str, str], dict] = {}
+        self._bitcoin_summary_cache = self._get_summary_cache(DEFAULT_PAIR)
         self.bitcoin_price_dip_threshold = os.getenv("bitcoin_price_dip_min_threshold")
 
-    def update_price(self, price: float):
+    @property
+    def current_price(self) -> float:
+        return self._bitcoin_summary_cache['current_price']
+
+    @property
+    def max_historic_price(self) -> float:
+        return self.get_price_extremes()[0] or 0.0
+
+    @property
+    def min_historic_price(self) -> float:
+        return self.get_price_extremes()[1] or 0.0
+
+    def update_price(self, price: float, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY):
 
         """
         Updates the price of bitcoin.
 
         This method inserts a new price for bitcoin in the database, updates the summary for the current date and notifies by email if the price has dipped.
-        If an error occurs while inserting the price, it logs the error.
+        It is a single pair shortcut for update_prices.
 
         :param price: The current price of bitcoin
+        :param asset: The asset the price belongs to
+        :param vs_currency: The currency the price is quoted in
         :return: None
         """
-        try:
-            print(f"Inserting new price for bitcoin {price}")
-            self.repository.insert_price(price)
+        self.update_prices({(asset, vs_currency): price})
 
-            self.update_summary(price)
+    def update_prices(self, prices: dict[tuple[str, str], float]):
+        """
+        Updates the prices of every fetched (asset, vs_currency) pair as one batch.
+
+        All prices are inserted with one multi-row insert, or buffered and written behind in batches when a price
+        writer is configured. Then the summary of each pair is updated for the current date and the ticks are fed to
+        the candle aggregator, persisting the candles they close.
+        The shared market snapshot and the in-memory recent prices are refreshed next, so readers see the new prices
+        without querying the database, and the ticks are pushed to the live stream clients. The price alerts are
+        evaluated last.
+        If an error occurs while inserting the prices, it logs the error and only the prices already stored go
+        further.
+
+        :param prices: The fetched prices keyed by (asset, vs_currency)
+        :return: None
+        """
+        timestamp = datetime.now(pytz.UTC)
+        price_ids = {}
+        stored_prices = {}
+        try:
+            print(f"Inserting {len(prices)} new prices")
+            if self.price_writer is not None:
+                for (asset, vs_currency), price in prices.items():
+                    self.price_writer.add(price, timestamp, asset, vs_currency)
+                    stored_prices[(asset, vs_currency)] = price
+            else:
+                rows = [{"price": price, "timestamp": timestamp, "asset": asset, "vs_currency": vs_currency}
+                        for (asset, vs_currency), price in prices.items()]
+                price_ids = dict(zip(prices.keys(), self.repository.insert_prices(rows)))
+                stored_prices = prices
         except Exception as e:
-            print(f"An error occurred while inserting price: {e}")
+            print(f"An error occurred while inserting prices: {e}")
+        if not stored_prices:
+            return None
+
+        # A price that was not stored is neither summarized, streamed nor alerted on
+        prices = stored_prices
+        self._update_summaries(prices)
+
+        self._update_candles(prices, timestamp)
+
+        for pair, price in prices.items():
+            self._update_market_snapshot(price, timestamp, price_ids.get(pair), pair)
+            if self.recent_prices is not None:
+                self.recent_prices.append(price, timestamp, *pair)
+            self._publish_tick(price, timestamp, pair)
+
+        self._evaluate_alerts(prices, timestamp)
 
-    def update_summary(self, price: float):
+    def update_summary(self, price: float, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY):
         """
-        Updates the bitcoin summary for the current date.
+        Updates the summary of the given pair for the current date.
 
         This method checks if the current date has changed. If it has, it creates a new cache for the new date.
         It also checks if the current price is lower than the minimum price stored in the cache or higher than the maximum price stored in the cache.
         If the price is lower or higher than the values stored in the cache, it updates the cache with the new values and updates the summary in the database.
+        The price is also added to the sliding window of the 90 days high and low.
 
-        :param price: The current price of bitcoin
+        :param price: The current price
+        :param asset: The asset the price belongs to
+        :param vs_currency: The currency the price is quoted in
         :return: None
         """
         try:
-            print("Updating bitcoin summary")
-            today = date.today()
-            if self._curr_date < today:
-                self.repository.update_summary(price, today)
-                self._create_new_cache(price, today)
-
-                return None
-
-            if self._should_update_summary(price):
-                self._update_cache(price)
-                self.repository.update_summary(price, today)
+            print(f"Updating {asset}/{vs_currency} summary")
+            summary_day = self._update_summary_cache(price, (asset, vs_currency))
+            if summary_day is not None:
+                self.repository.update_summary(price, summary_day, asset, vs_currency)
         except Exception as e:
             print(f"An error happened while updating summary: {e}")
 
-    def _create_new_cache(self, price: float, cache_date: date):
+    def _update_summaries(self, prices: dict[tuple[str, str], float]):
+        """
+        Updates the summaries of every fetched pair, writing the ones that changed with a single upsert.
+        """
+        try:
+            rows = []
+            for (asset, vs_currency), price in prices.items():
+                summary_day = self._update_summary_cache(price, (asset, vs_currency))
+                if summary_day is not None:
+                    rows.append({"price": price, "day": summary_day, "asset": asset, "vs_currency": vs_currency})
+            if rows:
+                self.repository.update_summaries(rows)
+        except Exception as e:
+            print(f"An error happened while updating summaries: {e}")
+
+    def _update_summary_cache(self, price: float, pair: tuple[str, str]) -> Optional[date]:
+        """
+        Applies the price to the cached summary of the pair and to its 90 days window.
+
+        :return: The day whose stored summary must be updated, or None when the price is within the cached min and max
+        """
+        cache = self._get_summary_cache(pair)
+        today = utc_today()
+        cache['current_price'] = price
+        self._get_price_window(pair).add(today, price, price)
+        if cache['current_date'] < today:
+            self._create_new_cache(price, today, pair)
+            return today
+
+        if self._should_update_summary(price, cache):
+            self._update_cache(price, cache)
+            return today
+        return None
+
+    def apply_stored_prices(self, prices: list[BitcoinPrice]):
+        """
+        Applies prices fetched and stored by another process to the in-memory state, without writing anything.
+
+        Used by the processes that serve the API without running the fetcher: the market snapshot, the recent prices,
+        the 90 days high and low and the live stream clients are updated as update_prices would have.
+
+        :param prices: The stored prices, in the order they were stored
+        """
+        for price in prices:
+            pair = (price.asset, price.vs_currency)
+            try:
+                self._get_price_window(pair).add(utc_today(), price.price, price.price)
+                self._update_market_snapshot(price.price, price.timestamp, price.id, pair)
+                if self.recent_prices is not None:
+                    self.recent_prices.append(price.price, price.timestamp, *pair)
+                self._publish_tick(price.price, price.timestamp, pair)
+            except Exception as e:
+                print(f"An error happened while applying a stored price: {e}")
+
+    def _get_summary_cache(self, pair: tuple[str, str]) -> dict:
+        if pair not in self._summary_caches:
+            self._summary_caches[pair] = {'min_price': 999_999_999.0,
+                                          'max_price': 0.0,
+                                          'current_date': self._curr_date,
+                                          'current_price': 0.0}
+        return self._summary_caches[pair]
+
+    def _create_new_cache(self, price: float, cache_date: date, pair: tuple[str, str] = DEFAULT_PAIR):
         """
         Creates a new cache for the given date with the given price.
 
         This method is called when the current date changes and a new cache needs to be created for the new date.
-        It sets the current date, the current price and the max_historic_price for the new cache.
+        It sets the current date and the current price for the new cache.
 
         :param price: The price to be used for the new cache
         :param cache_date: The date for which the new cache should be created
+        :param pair: The (asset, vs_currency) pair the cache belongs to
         :return: None
         """
-        print(f"Creating new bitcoin  cache for {cache_date}")
-        self._curr_date = cache_date
-        ninety_days_ago = cache_date - timedelta(days=90)
+        print(f"Creating new {pair[0]}/{pair[1]} cache for {cache_date}")
+        cache = self._get_summary_cache(pair)
 
-        self.current_price = price
-        self.max_historic_price = self.repository.get_max_historic_price(start_date=ninety_days_ago)
+        cache['current_price'] = price
+        cache['min_price'] = price
+        cache['max_price'] = price
+        cache['current_date'] = cache_date
 
-        self._bitcoin_summary_cache['min_price'] = price
-        self._bitcoin_summary_cache['max_price'] = price
-        self._bitcoin_summary_cache['current_date'] = cache_date
+    def _should_update_summary(self, price: float, cache: dict):
+        return cache['min_price'] > price or cache['max_price'] < price
 
-    def _should_update_summary(self, price: float):
-        return (self._bitcoin_summary_cache['min_price'] > price or
-                self._bitcoin_summary_cache['max_price'] < price)
-
-    def _update_cache(self, price: float):
+    def _update_cache(self, price: float, cache: dict):
         print("Updating cache")
-        self.current_price = price
+        cache['current_price'] = price
+
+        if cache['min_price'] > price:
+            cache['min_price'] = price
+
+        if cache['max_price'] < price:
+            cache['max_price'] = price
+
+    def _publish_tick(self, price: float, timestamp: datetime, pair: tuple[str, str]):
+        if self.price_broadcaster is None:
+            return
+        today = utc_today()
+        summary = None
+        if self.market_snapshot is not None:
+            current_summary = self.market_snapshot.get_summary(today, *pair)
+            if current_summary is not None:
+                summary = (current_summary.day, current_summary.max_price, current_summary.min_price)
+        else:
+            cache = self._get_summary_cache(pair)
+            if cache['current_date'] == today:
+                summary = (today, cache['max_price'], cache['min_price'])
+        self.price_broadcaster.publish(price, timestamp, *pair, summary=summary)
+
+    def _evaluate_alerts(self, prices: dict[tuple[str, str], float], timestamp: datetime):
+        if self.alert_service is None:
+            return
+        for (asset, vs_currency), price in prices.items():
+            try:
+                high, _ = self.get_price_extremes(asset, vs_currency)
+                self.alert_service.on_tick(price, timestamp, asset, vs_currency, high)
+            except Exception as e:
+                print(f"An error occurred while evaluating the price alerts: {e}")
+
+    def _update_candles(self, prices: dict[tuple[str, str], float], timestamp: datetime):
+        if self.candle_aggregator is None:
+            return
+        try:
+            closed_candles = []
+            for (asset, vs_currency), price in prices.items():
+                closed_candles.extend(self.candle_aggregator.add_tick(price, timestamp, asset, vs_currency))
 
-        if price > self.max_historic_price:
-            print(f"Updating max_historic_price with new price {price}")
-            self.max_historic_price = price
+            if closed_candles:
+                print(f"Saving {len(closed_candles)} closed candles")
+                self.repository.save_candles(closed_candles)
+        except Exception as e:
+            print(f"An error happened while updating candles: {e}")
 
-        if self._bitcoin_summary_cache['min_price'] > price:
-            self._bitcoin_summary_cache['min_price'] = price
+    def save_open_candles(self):
+        """
+        Persists the candles still open in the aggregator. Called on shutdown so partial candles are not lost, they
+        are merged with the rest of their bucket once it closes after a restart.
+        """
+        if self.candle_aggregator is not None:
+            self.repository.save_candles(self.candle_aggregator.drain_open_candles())
 
-        if self._bitcoin_summary_cache['max_price'] < price:
-            self._bitcoin_summary_cache['max_price'] = price
+    def _update_market_snapshot(self, price: float, timestamp: datetime, price_id: Optional[int],
+                                pair: tuple[str, str]):
+        """
+        Applies the tick to the shared market snapshot.
 
-    def get_cached_summary(self) -> dict:
-        return self._bitcoin_summary_cache
+        The first tick of each day merges the stored summary into the snapshot, so a restart in the middle of the day
+        does not lose the min/max seen before it.
+        """
+        if self.market_snapshot is None:
+            return
+
+        asset, vs_currency = pair
+        today = utc_today()
+        self.market_snapshot.update(price, timestamp, today, price_id, asset, vs_currency)
+
+        if self._snapshot_seeded_days.get(pair) != today:
+            try:
+                stored_summary = self.repository.get_summary_by_day(today, asset, vs_currency)
+                if stored_summary is not None:
+                    self.market_snapshot.seed_summary(_to_daily_summary(stored_summary), asset, vs_currency)
+                self._snapshot_seeded_days[pair] = today
+            except Exception as e:
+                print(f"An error happened while seeding the market snapshot: {e}")
+
+    def get_cached_summary(self, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> dict:
+        return self._get_summary_cache((asset, vs_currency))
+
+    def get_latest_price(self, asset: str = DEFAULT_ASSET,
+                         vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinPrice | PriceTick]:
+        """
+        Returns the latest price of the pair, read from the market snapshot when available.
+
+        The database is only queried on cold start, before the first tick, and the result seeds the snapshot.
+        """
+        latest_price = self._get_snapshot_latest_price(asset, vs_currency)
+        if latest_price is not None:
+            return latest_price
+
+        return self._seed_latest_price(self.repository.get_latest_price(asset, vs_currency), asset, vs_currency)
+
+    async def get_latest_price_async(self, asset: str = DEFAULT_ASSET,
+                                     vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinPrice | PriceTick]:
+        """
+        Same as get_latest_price, for the async endpoints. Without an async repository the synchronous query runs in a
+        worker thread, so the event loop is never blocked.
+        """
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_latest_price, asset, vs_currency)
+
+        latest_price = self._get_snapshot_latest_price(asset, vs_currency)
+        if latest_price is not None:
+            return latest_price
+
+        latest_price = await self.async_repository.get_latest_price(asset, vs_currency)
+        return self._seed_latest_price(latest_price, asset, vs_currency)
+
+    def _get_snapshot_latest_price(self, asset: str, vs_currency: str) -> Optional[PriceTick]:
+        if self.market_snapshot is None:
+            return None
+        return self.market_snapshot.get_latest_price(asset, vs_currency)
+
+    def _seed_latest_price(self, latest_price: Optional[BitcoinPrice], asset: str,
+                           vs_currency: str) -> Optional[BitcoinPrice]:
+        if latest_price is not None and self.market_snapshot is not None:
+            self.market_snapshot.seed_latest_price(PriceTick(id=latest_price.id, price=latest_price.price,
+                                                             timestamp=latest_price.timestamp), asset, vs_currency)
+        return latest_price
+
+    def get_summary_by_date(self, day: date, asset: str = DEFAULT_ASSET,
+                            vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinSummary | DailySummary]:
+        """
+        Returns the summary of the pair for the given day. The current day is served from the market snapshot and
+        closed days from the summary cache when available.
+        """
+        summary = self._get_cached_summary(day, asset, vs_currency)
+        if summary is not None:
+            return summary
+
+        return self._remember_summary(self.repository.get_summary_by_day(day, asset, vs_currency), day, asset,
+                                      vs_currency)
+
+    async def get_summary_by_date_async(
+            self, day: date, asset: str = DEFAULT_ASSET,
+            vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[BitcoinSummary | DailySummary]:
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_summary_by_date, day, asset, vs_currency)
+
+        summary = self._get_cached_summary(day, asset, vs_currency)
+        if summary is not None:
+            return summary
+
+        summary = await self.async_repository.get_summary_by_day(day, asset, vs_currency)
+        return self._remember_summary(summary, day, asset, vs_currency)
+
+    def _get_cached_summary(self, day: date, asset: str, vs_currency: str) -> Optional[DailySummary]:
+        today = utc_today()
+        if day == today and self.market_snapshot is not None:
+            return self.market_snapshot.get_summary(day, asset, vs_currency)
+        if day < today and self.summary_cache is not None:
+            return self.summary_cache.get(("day", asset, vs_currency, day))
+        return None
+
+    def _remember_summary(self, summary: Optional[BitcoinSummary], day: date, asset: str,
+                          vs_currency: str) -> Optional[BitcoinSummary]:
+        if summary is None:
+            return None
+
+        today = utc_today()
+        if day == today and self.market_snapshot is not None:
+            self.market_snapshot.seed_summary(_to_daily_summary(summary), asset, vs_currency)
+        elif day < today and self.summary_cache is not None:
+            self.summary_cache.put(("day", asset, vs_currency, day), _to_daily_summary(summary))
+        return summary
+
+    def get_summaries_page(self, start_day: Optional[date], end_day: Optional[date], limit: int,
+                           after: Optional[date] = None, asset: str = DEFAULT_ASSET,
+                           vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[list[DailySummary], Optional[date]]:
+        """
+        Returns one page of the pair summaries ordered by day, and the day the next page starts after.
+
+        A page whose whole range is closed never changes, so it is kept in the summary cache.
+
+        :param start_day: First day, inclusive
+        :param end_day: Last day, inclusive. None reads up to the current day
+        :param limit: Maximum number of summaries
+        :param after: The day of the last summary of the previous page
+        :return: The summaries and the next page key, None on the last page
+        """
+        cache_key = self._summaries_page_cache_key(start_day, end_day, limit, after, asset, vs_currency)
+        if cache_key is not None:
+            cached_page = self.summary_cache.get(cache_key)
+            if cached_page is not None:
+                return list(cached_page[0]), cached_page[1]
+
+        summaries = self.repository.get_summaries_page(start_day, end_day, limit + 1, after, asset, vs_currency)
+        return self._remember_summaries_page(cache_key, summaries, limit)
+
+    async def get_summaries_page_async(
+            self, start_day: Optional[date], end_day: Optional[date], limit: int, after: Optional[date] = None,
+            asset: str = DEFAULT_ASSET,
+            vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[list[DailySummary], Optional[date]]:
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_summaries_page, start_day, end_day, limit, after, asset,
+                                           vs_currency)
+
+        cache_key = self._summaries_page_cache_key(start_day, end_day, limit, after, asset, vs_currency)
+        if cache_key is not None:
+            cached_page = self.summary_cache.get(cache_key)
+            if cached_page is not None:
+                return list(cached_page[0]), cached_page[1]
+
+        summaries = await self.async_repository.get_summaries_page(start_day, end_day, limit + 1, after, asset,
+                                                                   vs_currency)
+        return self._remember_summaries_page(cache_key, summaries, limit)
+
+    def _summaries_page_cache_key(self, start_day: Optional[date], end_day: Optional[date], limit: int,
+                                  after: Optional[date], asset: str, vs_currency: str) -> Optional[tuple]:
+        if self.summary_cache is None or end_day is None or end_day >= utc_today():
+            return None
+        return "page", asset, vs_currency, start_day, end_day, limit, after
+
+    def _remember_summaries_page(self, cache_key: Optional[tuple], summaries: list,
+                                 limit: int) -> tuple[list[DailySummary], Optional[date]]:
+        page = tuple(_to_daily_summary(summary) for summary in summaries[:limit])
+        next_day = page[-1].day if len(summaries) > limit else None
+        if cache_key is not None:
+            self.summary_cache.put(cache_key, (page, next_day))
+        return list(page), next_day
+
+    def get_all_summaries(self, asset: str = DEFAULT_ASSET,
+                          vs_currency: str = DEFAULT_VS_CURRENCY) -> list[type[BitcoinSummary]]:
+        return self.repository.get_all_summaries(asset, vs_currency)
+
+    async def get_all_summaries_async(self, asset: str = DEFAULT_ASSET,
+                                      vs_currency: str = DEFAULT_VS_CURRENCY) -> list[BitcoinSummary]:
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_all_summaries, asset, vs_currency)
+        return await self.async_repository.get_all_summaries(asset, vs_currency)
+
+    def get_prices_page(self, start: Optional[datetime], end: Optional[datetime], limit: int,
+                        after: Optional[tuple[datetime, int]] = None, asset: str = DEFAULT_ASSET,
+                        vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[list[BitcoinPrice], Optional[tuple]]:
+        """
+        Returns one page of the pair price history and the (timestamp, id) key the next page starts after.
+
+        One extra row is read to know whether there is a next page, the key is None on the last page.
+        """
+        start = to_utc_naive(start) if start is not None else None
+        end = to_utc_naive(end) if end is not None else None
+        return _to_page(self.repository.get_prices_page(start, end, limit + 1, after, asset, vs_currency), limit)
+
+    async def get_prices_page_async(
+            self, start: Optional[datetime], end: Optional[datetime], limit: int,
+            after: Optional[tuple[datetime, int]] = None, asset: str = DEFAULT_ASSET,
+            vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[list[BitcoinPrice], Optional[tuple]]:
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_prices_page, start, end, limit, after, asset, vs_currency)
+
+        start = to_utc_naive(start) if start is not None else None
+        end = to_utc_naive(end) if end is not None else None
+        prices = await self.async_repository.get_prices_page(start, end, limit + 1, after, asset, vs_currency)
+        return _to_page(prices, limit)
+
+    def get_candles(self, interval: str, start: datetime, end: datetime, limit: int, asset: str = DEFAULT_ASSET,
+                    vs_currency: str = DEFAULT_VS_CURRENCY) -> list[Candle]:
+        """
+        Returns the candles of the pair whose bucket opens within the given range, oldest first.
 
-    def get_latest_price(self) -> Optional[BitcoinPrice]:
-        return self.repository.get_latest_price()
+        Closed candles come from the database. The candle still open in the aggregator is appended when it falls in the
+        range, merged with its stored part if a partial candle was saved before a restart.
+        """
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        stored_candles = self.repository.get_candles(interval, start, end, limit, asset, vs_currency)
+        return self._merge_open_candle(stored_candles, interval, start, end, limit, asset, vs_currency)
+
+    async def get_candles_async(self, interval: str, start: datetime, end: datetime, limit: int,
+                                asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> list[Candle]:
+        if self.async_repository is None:
+            return await asyncio.to_thread(self.get_candles, interval, start, end, limit, asset, vs_currency)
+
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        stored_candles = await self.async_repository.get_candles(interval, start, end, limit, asset, vs_currency)
+        return self._merge_open_candle(stored_candles, interval, start, end, limit, asset, vs_currency)
+
+    def _merge_open_candle(self, stored_candles: list, interval: str, start: datetime, end: datetime, limit: int,
+                           asset: str, vs_currency: str) -> list[Candle]:
+        candles = [Candle(asset=row.asset, vs_currency=row.vs_currency, interval=row.interval,
+                          open_time=row.open_time, open_price=row.open_price, high_price=row.high_price,
+                          low_price=row.low_price, close_price=row.close_price, tick_count=row.tick_count)
+                   for row in stored_candles]
+
+        open_candle = None
+        if self.candle_aggregator is not None:
+            open_candle = self.candle_aggregator.get_open_candle(interval, asset, vs_currency)
+
+        if open_candle is None or not start <= open_candle.open_time <= end:
+            return candles
+
+        if candles and candles[-1].open_time == open_candle.open_time:
+            candles[-1].merge(open_candle)
+        elif len(candles) < limit:
+            candles.append(open_candle)
+        return candles
+
+    def get_history(self, start: datetime, end: datetime, resolution_seconds: int, limit: int,
+                    asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[str, list[Candle]]:
+        """
+        Returns the pair history over a range from the coarsest candle tier meeting the requested resolution.
+
+        :param start: The beginning of the range
+        :param end: The end of the range
+        :param resolution_seconds: The coarsest acceptable spacing between two candles
+        :param limit: Maximum number of candles
+        :return: The interval of the chosen tier and its candles
+        """
+        interval = self._choose_history_interval(start, resolution_seconds)
+        return interval, self.get_candles(interval, start, end, limit, asset, vs_currency)
 
-    def get_summary_by_date(self, day: date) -> Optional[BitcoinSummary]:
-        return self.repository.get_summary_by_day(day)
+    async def get_history_async(self, start: datetime, end: datetime, resolution_seconds: int, limit: int,
+                                asset: str = DEFAULT_ASSET,
+                                vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[str, list[Candle]]:
+        interval = self._choose_history_interval(start, resolution_seconds)
+        return interval, await self.get_candles_async(interval, start, end, limit, asset, vs_currency)
 
-    def get_all_summaries(self) -> list[type[BitcoinSummary]]:
-        return self.repository.get_all_summaries()
+    def _choose_history_interval(self, start: datetime, resolution_seconds: int) -> str:
+        now = to_utc_naive(datetime.now(pytz.UTC))
+        return self.rollup_service.choose_tier(to_utc_naive(start), resolution_seconds, now).interval
+
+    def get_price_extremes(self, asset: str = DEFAULT_ASSET,
+                           vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[Optional[float], Optional[float]]:
+        """
+        Returns the (high, low) of the pair over the last 90 days, read from the sliding window kept in memory.
+
+        The window is built from the stored daily summaries the first time a pair is read, then fed with every tick.
+        """
+        return self._get_price_window((asset, vs_currency)).get(utc_today())
+
+    async def get_price_extremes_async(
+            self, asset: str = DEFAULT_ASSET,
+            vs_currency: str = DEFAULT_VS_CURRENCY) -> tuple[Optional[float], Optional[float]]:
+        # Only the first read of a pair queries the database, in a worker thread so the event loop is not blocked
+        return await asyncio.to_thread(self.get_price_extremes, asset, vs_currency)
+
+    def _get_price_window(self, pair: tuple[str, str]) -> SlidingWindowExtrema:
+        return self.price_extremes.get_or_build(pair, lambda: self._load_daily_extremes(pair))
+
+    def _load_daily_extremes(self, pair: tuple[str, str]) -> list[tuple[date, float, float]]:
+        window_days = self.price_extremes.window_days
+        today = utc_today()
+        summaries = self.repository.get_summaries_page(today - timedelta(days=window_days), today, window_days + 1,
+                                                       None, *pair)
+        print(f"Loaded {len(summaries)} daily summaries of {pair[0]}/{pair[1]} in the {window_days} days high and low")
+        return [(summary.day, summary.max_price, summary.min_price) for summary in summaries]
 
     def notify_email_bitcoin_price_dip(self):
         """
         Notify by email when the current bitcoin price is lower than the lowest price of the last 90 days.
 
-        This method checks if the current bitcoin price is lower than the lowest price of the last 90 days.
-        If it is, it sends an email with the current price and a suggestion to buy bitcoin.
+        This method checks if the current bitcoin price is the lowest price of the last 90 days and far enough below
+        the highest one. If it is, it sends an email with the current price and a suggestion to buy bitcoin.
         """
         if self._should_notify():
             print("Notifying via email lowest price of bitcoin in the last 90 days")
             destination_email = os.getenv("DESTINATION_EMAIL")
             email_message = (f"There is a new low in the bitcoin price ${self.current_price}. "
-                             f"It is the lowest price of the last 90 days. Perhaps is a good time to buy ")
+                             f"It is the lowest price of the last 90 days, whose highest price was "
+                             f"${self.max_historic_price}. Perhaps is a good time to buy ")
             subject = "Time to buy bitcoin"
 
             self.email_sender.send_email(email_message, subject, destination_email)
@@ -141,16 +610,30 @@ class BitcoinService:
         Determines whether a notification should be sent based on the current bitcoin price.
 
         This method checks if the current bitcoin price has dipped below a certain
-        threshold compared to the maximum historic price. The threshold is determined
-        as a percentage of the maximum historic price, retrieved from an environment
-        variable. If the price dip exceeds this threshold, a notification is warranted.
+        threshold compared to the highest price of the last 90 days. The threshold is determined
+        as a percentage of that highest price, retrieved from an environment
+        variable. If the price dip exceeds this threshold and the current price is the lowest of the
+        last 90 days, a notification is warranted.
 
         :return: True if the price dip exceeds the threshold and a notification should be sent, False otherwise.
         """
-        if self.max_historic_price <= 0:
+        max_historic_price, min_historic_price = self.get_price_extremes()
+        if not max_historic_price or min_historic_price is None:
             return False
 
-        percentual_value_threshold = float(os.getenv("BITCOIN_PRICE_DIP_MIN_THRESHOLD", 0.1) * self.max_historic_price)
-        variation = (self.max_historic_price - self.current_price) - percentual_value_threshold
+        percentual_value_threshold = float(os.getenv("BITCOIN_PRICE_DIP_MIN_THRESHOLD", 0.1)) * max_historic_price
+        variation = (max_historic_price - self.current_price) - percentual_value_threshold
+
+        return variation >= 0 and self.current_price <= min_historic_price
+
+
+def _to_page(prices: list, limit: int) -> tuple[list, Optional[tuple]]:
+    if len(prices) <= limit:
+        return prices, None
+
+    prices = prices[:limit]
+    return prices, (prices[-1].timestamp, prices[-1].id)
+
 
-        return variation >= 0
+def _to_daily_summary(summary: BitcoinSummary) -> DailySummary:
+    return DailySummary(id=summary.id, max_price=summary.max_price, min_price=summary.min_price, day=summary.day)
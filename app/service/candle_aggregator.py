@@ -0,0 +1,111 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Optional
+
+CANDLE_INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(slots=True)
+class Candle:
+    asset: str
+    vs_currency: str
+    interval: str
+    open_time: datetime
+    open_price: float
+    high_price: float
+    low_price: float
+    close_price: float
+    tick_count: int
+
+    def add(self, price: float):
+        if price > self.high_price:
+            self.high_price = price
+        if price < self.low_price:
+            self.low_price = price
+        self.close_price = price
+        self.tick_count += 1
+
+    def merge(self, later: "Candle"):
+        """
+        Folds a candle covering a later part of the same bucket into this one.
+        """
+        self.high_price = max(self.high_price, later.high_price)
+        self.low_price = min(self.low_price, later.low_price)
+        self.close_price = later.close_price
+        self.tick_count += later.tick_count
+
+
+def to_utc_naive(timestamp: datetime) -> datetime:
+    """
+    Converts a timestamp to a naive UTC datetime, the form candles are bucketed and stored in.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def bucket_start(timestamp: datetime, interval_seconds: int) -> datetime:
+    elapsed_seconds = int((to_utc_naive(timestamp) - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=elapsed_seconds - elapsed_seconds % interval_seconds)
+
+
+class CandleAggregator:
+    """
+    Builds OHLC candles incrementally from ticks.
+
+    Only the open candle of each (asset, vs_currency, interval) is kept in memory and every tick updates it in O(1).
+    When a tick falls into a later bucket the open candle is closed and returned so it can be persisted.
+    """
+
+    def __init__(self, intervals: Optional[dict[str, int]] = None):
+        self.intervals = intervals or CANDLE_INTERVALS
+        self._lock = Lock()
+        self._open_candles: dict[tuple[str, str, str], Candle] = {}
+
+    def add_tick(self, price: float, timestamp: datetime, asset: str, vs_currency: str) -> list[Candle]:
+        """
+        Applies a tick to the open candle of every interval.
+
+        :param price: The tick price
+        :param timestamp: When the price was fetched
+        :param asset: The asset the price belongs to
+        :param vs_currency: The currency the price is quoted in
+        :return: The candles closed by this tick
+        """
+        closed_candles = []
+        with self._lock:
+            for interval, interval_seconds in self.intervals.items():
+                key = (asset, vs_currency, interval)
+                open_time = bucket_start(timestamp, interval_seconds)
+                candle = self._open_candles.get(key)
+
+                if candle is not None and open_time <= candle.open_time:
+                    candle.add(price)
+                    continue
+
+                if candle is not None:
+                    closed_candles.append(candle)
+                self._open_candles[key] = Candle(asset=asset, vs_currency=vs_currency, interval=interval,
+                                                 open_time=open_time, open_price=price, high_price=price,
+                                                 low_price=price, close_price=price, tick_count=1)
+
+        return closed_candles
+
+    def get_open_candle(self, interval: str, asset: str, vs_currency: str) -> Optional[Candle]:
+        with self._lock:
+            candle = self._open_candles.get((asset, vs_currency, interval))
+            if candle is None:
+                return None
+            return replace(candle)
+
+    def drain_open_candles(self) -> list[Candle]:
+        """
+        Removes and returns every open candle, used to persist partial candles on shutdown.
+        """
+        with self._lock:
+            candles = list(self._open_candles.values())
+            self._open_candles.clear()
+        return candles
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from threading import Lock
+from typing import Optional
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+
+@dataclass(frozen=True)
+class PriceTick:
+    id: int
+    price: float
+    timestamp: datetime
+
+
+@dataclass(frozen=True)
+class DailySummary:
+    id: int
+    max_price: float
+    min_price: float
+    day: date
+
+
+@dataclass(frozen=True)
+class _MarketState:
+    latest_price: Optional[PriceTick] = None
+    current_summary: Optional[DailySummary] = None
+
+
+class MarketSnapshot:
+    """
+    Process-wide, thread-safe view of the latest price and the current day summary of every (asset, vs_currency) pair.
+
+    The ingestion path replaces the immutable state of a pair under a lock on every tick, so readers only need to grab
+    a single reference and always see a latest price and a summary that belong together.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._states: dict[tuple[str, str], _MarketState] = {}
+
+    def update(self, price: float, timestamp: datetime, day: date, price_id: Optional[int] = None,
+               asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY):
+        """
+        Applies a new tick to the snapshot.
+
+        :param price: The new price
+        :param timestamp: When the price was fetched
+        :param day: The day the price belongs to, used to roll the current summary over
+        :param price_id: The database id of the price, if it is already known
+        :param asset: The asset the price belongs to
+        :param vs_currency: The currency the price is quoted in
+        """
+        pair = (asset, vs_currency)
+        with self._lock:
+            summary = self._get_state(pair).current_summary
+            if summary is None or summary.day != day:
+                summary = DailySummary(id=0, max_price=price, min_price=price, day=day)
+            elif summary.min_price > price or summary.max_price < price:
+                summary = DailySummary(id=summary.id, max_price=max(summary.max_price, price),
+                                       min_price=min(summary.min_price, price), day=day)
+
+            self._states[pair] = _MarketState(latest_price=PriceTick(id=price_id or 0, price=price,
+                                                                     timestamp=timestamp),
+                                              current_summary=summary)
+
+    def seed_latest_price(self, latest_price: PriceTick, asset: str = DEFAULT_ASSET,
+                          vs_currency: str = DEFAULT_VS_CURRENCY):
+        """
+        Fills the latest price on cold start. Never overrides a price already set by the ingestion path.
+        """
+        pair = (asset, vs_currency)
+        with self._lock:
+            state = self._get_state(pair)
+            if state.latest_price is None:
+                self._states[pair] = _MarketState(latest_price=latest_price, current_summary=state.current_summary)
+
+    def seed_summary(self, summary: DailySummary, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY):
+        """
+        Merges a summary read from the database into the snapshot.
+
+        The snapshot may only have seen the ticks fetched since the process started, so the stored min/max are merged
+        in instead of being replaced.
+        """
+        pair = (asset, vs_currency)
+        with self._lock:
+            state = self._get_state(pair)
+            current_summary = state.current_summary
+            if current_summary is not None and current_summary.day > summary.day:
+                return
+            if current_summary is not None and current_summary.day == summary.day:
+                summary = DailySummary(id=summary.id or current_summary.id,
+                                       max_price=max(summary.max_price, current_summary.max_price),
+                                       min_price=min(summary.min_price, current_summary.min_price),
+                                       day=summary.day)
+            self._states[pair] = _MarketState(latest_price=state.latest_price, current_summary=summary)
+
+    def get_latest_price(self, asset: str = DEFAULT_ASSET,
+                         vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[PriceTick]:
+        return self._get_state((asset, vs_currency)).latest_price
+
+    def get_summary(self, day: date, asset: str = DEFAULT_ASSET,
+                    vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[DailySummary]:
+        summary = self._get_state((asset, vs_currency)).current_summary
+        if summary is None or summary.day != day:
+            return None
+        return summary
+
+    def has_summary_for(self, day: date, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> bool:
+        return self.get_summary(day, asset, vs_currency) is not None
+
+    def _get_state(self, pair: tuple[str, str]) -> _MarketState:
+        return self._states.get(pair) or _MarketState()
@@ -0,0 +1,230 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Iterable, Optional
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.service.candle_aggregator import to_utc_naive
+from app.service.price_ring_buffer import RecentPrices, to_epoch_ms
+
+ALERT_KINDS = ("above", "below", "dip_from_high", "move_within")
+
+
+@dataclass(frozen=True)
+class TriggeredAlert:
+    alert_id: int
+    email: str
+    kind: str
+    threshold: float
+    window_minutes: Optional[int]
+    asset: str
+    vs_currency: str
+    price: float
+    value: float
+    triggered_at: datetime
+
+
+class _AlertRule:
+    """
+    The in-memory state of one alert. An alert fires when its metric crosses the trigger level, then stays disarmed
+    until the metric crosses back past the re-arm level, which the hysteresis moves away from the trigger level.
+    """
+
+    __slots__ = ("alert_id", "email", "asset", "vs_currency", "kind", "threshold", "window_minutes",
+                 "cooldown_seconds", "hysteresis_percent", "armed", "last_triggered_at")
+
+    def __init__(self, alert):
+        self.alert_id = alert.id
+        self.email = alert.email
+        self.asset = alert.asset
+        self.vs_currency = alert.vs_currency
+        self.kind = alert.kind
+        self.threshold = alert.threshold
+        self.window_minutes = alert.window_minutes
+        self.cooldown_seconds = alert.cooldown_seconds or 0
+        self.hysteresis_percent = alert.hysteresis_percent or 0.0
+        self.armed = True
+        self.last_triggered_at = to_utc_naive(alert.last_triggered_at) if alert.last_triggered_at else None
+
+    @property
+    def metric(self):
+        if self.kind in ("above", "below"):
+            return "price"
+        if self.kind == "dip_from_high":
+            return "dip"
+        return "move", self.window_minutes
+
+    def levels(self) -> tuple[float, bool, float]:
+        """
+        :return: The trigger level, whether it triggers when the metric rises through it, and the re-arm level
+        """
+        hysteresis = self.hysteresis_percent / 100
+        if self.kind == "below":
+            return self.threshold, False, self.threshold * (1 + hysteresis)
+        return self.threshold, True, self.threshold * (1 - hysteresis)
+
+    def is_cooling_down(self, timestamp: datetime) -> bool:
+        return (self.last_triggered_at is not None
+                and timestamp - self.last_triggered_at < timedelta(seconds=self.cooldown_seconds))
+
+
+class _MetricIndex:
+    """
+    The trigger and re-arm levels of every alert on one metric of a pair, in two sorted lists.
+
+    Levels crossed by a rising metric are in rising, those crossed by a falling one in falling. A tick only bisects the
+    lists between the previous and the new value, so it touches the crossed alerts only.
+    """
+
+    __slots__ = ("rising", "falling", "last_value")
+
+    def __init__(self):
+        self.rising: list[tuple[float, int, bool]] = []
+        self.falling: list[tuple[float, int, bool]] = []
+        self.last_value: Optional[float] = None
+
+    def add(self, rule: _AlertRule):
+        trigger_level, triggers_rising, rearm_level = rule.levels()
+        insort(self.rising if triggers_rising else self.falling, (trigger_level, rule.alert_id, True))
+        insort(self.falling if triggers_rising else self.rising, (rearm_level, rule.alert_id, False))
+
+    def remove(self, rule: _AlertRule):
+        self.rising = [entry for entry in self.rising if entry[1] != rule.alert_id]
+        self.falling = [entry for entry in self.falling if entry[1] != rule.alert_id]
+
+    def is_empty(self) -> bool:
+        return not self.rising and not self.falling
+
+    def crossed(self, value: float) -> list[tuple[float, int, bool]]:
+        """
+        Moves the metric to value and returns the (level, alert_id, is_trigger) entries it crossed.
+
+        The first value only sets the baseline, an alert fires on a crossing, not on a level already passed.
+        """
+        previous_value, self.last_value = self.last_value, value
+        if previous_value is None or value == previous_value:
+            return []
+        if value > previous_value:
+            # previous_value < level <= value
+            return self.rising[bisect_right(self.rising, (previous_value, math.inf)):
+                               bisect_right(self.rising, (value, math.inf))]
+        # value <= level < previous_value
+        return self.falling[bisect_left(self.falling, (value,)):bisect_left(self.falling, (previous_value,))]
+
+
+class PriceAlertEngine:
+    """
+    Evaluates the price alerts of every pair on each tick, with a cooldown and hysteresis per alert.
+
+    Supported alerts are a price crossing above or below a level, a dip of a percent from the 90 days high and a move
+    of a percent within a number of minutes. Alerts are indexed per (pair, metric), only the metrics that have alerts
+    are computed and only the alerts whose level was crossed are visited.
+    """
+
+    def __init__(self, recent_prices: Optional[RecentPrices] = None):
+        self.recent_prices = recent_prices
+        self._lock = Lock()
+        self._rules: dict[int, _AlertRule] = {}
+        self._indexes: dict[tuple[str, str], dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def load(self, alerts: Iterable):
+        """
+        Replaces the indexed alerts, e.g. with the active alerts stored in the database at startup.
+        """
+        with self._lock:
+            self._rules.clear()
+            self._indexes.clear()
+        for alert in alerts:
+            self.add_alert(alert)
+
+    def sync(self, alerts: Iterable):
+        """
+        Brings the indexed alerts in line with the given ones, e.g. the active alerts another process stored.
+
+        Alerts already indexed keep their state, so a sync never re-arms an alert nor resets a cooldown.
+        """
+        alerts = {alert.id: alert for alert in alerts}
+        with self._lock:
+            indexed_ids = set(self._rules)
+        for alert_id in indexed_ids - alerts.keys():
+            self.remove_alert(alert_id)
+        for alert_id in alerts.keys() - indexed_ids:
+            self.add_alert(alerts[alert_id])
+
+    def add_alert(self, alert):
+        """
+        Indexes an alert. It may be a PriceAlert or any object with the same attributes.
+        """
+        if alert.kind not in ALERT_KINDS:
+            raise ValueError(f"Unknown alert kind {alert.kind}")
+        rule = _AlertRule(alert)
+        with self._lock:
+            if rule.alert_id in self._rules:
+                self._remove_rule(self._rules[rule.alert_id])
+            self._rules[rule.alert_id] = rule
+            pair_indexes = self._indexes.setdefault((rule.asset, rule.vs_currency), {})
+            pair_indexes.setdefault(rule.metric, _MetricIndex()).add(rule)
+
+    def remove_alert(self, alert_id: int):
+        with self._lock:
+            rule = self._rules.get(alert_id)
+            if rule is not None:
+                self._remove_rule(rule)
+
+    def _remove_rule(self, rule: _AlertRule):
+        del self._rules[rule.alert_id]
+        pair_indexes = self._indexes[(rule.asset, rule.vs_currency)]
+        metric_index = pair_indexes[rule.metric]
+        metric_index.remove(rule)
+        if metric_index.is_empty():
+            del pair_indexes[rule.metric]
+
+    def on_tick(self, price: float, timestamp: datetime, asset: str = DEFAULT_ASSET,
+                vs_currency: str = DEFAULT_VS_CURRENCY, high: Optional[float] = None) -> list[TriggeredAlert]:
+        """
+        Applies a tick to the alerts of the pair.
+
+        :param price: The new price
+        :param timestamp: When the price was fetched
+        :param high: The 90 days high of the pair, needed by the dip alerts
+        :return: The alerts that fired
+        """
+        timestamp = to_utc_naive(timestamp)
+        triggered_alerts = []
+        with self._lock:
+            for metric, metric_index in self._indexes.get((asset, vs_currency), {}).items():
+                value = self._metric_value(metric, price, timestamp, asset, vs_currency, high)
+                if value is None:
+                    continue
+
+                for _, alert_id, is_trigger in metric_index.crossed(value):
+                    rule = self._rules[alert_id]
+                    if not is_trigger:
+                        rule.armed = True
+                    elif rule.armed and not rule.is_cooling_down(timestamp):
+                        rule.armed = False
+                        rule.last_triggered_at = timestamp
+                        triggered_alerts.append(TriggeredAlert(
+                            alert_id=alert_id, email=rule.email, kind=rule.kind, threshold=rule.threshold,
+                            window_minutes=rule.window_minutes, asset=asset, vs_currency=vs_currency, price=price,
+                            value=value, triggered_at=timestamp))
+        return triggered_alerts
+
+    def _metric_value(self, metric, price: float, timestamp: datetime, asset: str, vs_currency: str,
+                      high: Optional[float]) -> Optional[float]:
+        if metric == "price":
+            return price
+        if metric == "dip":
+            return max((1 - price / high) * 100, 0.0) if high else None
+
+        if self.recent_prices is None:
+            return None
+        _, window_minutes = metric
+        reference_price = self.recent_prices.get(asset, vs_currency).price_at_or_before(
+            to_epoch_ms(timestamp - timedelta(minutes=window_minutes)))
+        return abs(price / reference_price - 1) * 100 if reference_price else None
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.database.model.price_alert import PriceAlert
+from app.database.price_alert_repository import PriceAlertRepository
+from app.integration.email_outbox import EmailOutbox
+from app.service.price_alert_engine import PriceAlertEngine, TriggeredAlert
+
+
+class PriceAlertService:
+    """
+    Manages the stored price alerts, keeps the alert engine in sync with them and notifies the fired alerts.
+
+    Notifications go through the email outbox, so a burst of alerts never holds the tick on the mail server.
+    """
+
+    def __init__(self, repository: PriceAlertRepository, alert_engine: PriceAlertEngine,
+                 email_outbox: EmailOutbox, sync_interval_seconds: Optional[float] = None):
+        """
+        :param sync_interval_seconds: How often the ticks re-read the stored alerts, for a process that does not serve
+            the alert endpoints itself. None when every change goes through this service
+        """
+        self.repository = repository
+        self.alert_engine = alert_engine
+        self.email_outbox = email_outbox
+        self.sync_interval_seconds = sync_interval_seconds
+        self._synced_at = time.monotonic()
+
+    def load_alerts(self) -> int:
+        """
+        Indexes the active alerts stored in the database. Called at startup.
+
+        :return: The number of loaded alerts
+        """
+        alerts = self.repository.get_active_alerts()
+        self.alert_engine.load(alerts)
+        print(f"Loaded {len(alerts)} price alerts")
+        return len(alerts)
+
+    def sync_alerts(self) -> int:
+        """
+        Indexes the alerts created and removes the ones deleted by another process since the last sync.
+
+        :return: The number of indexed alerts
+        """
+        # Reset first, so a failing database is retried once per interval and not on every tick
+        self._synced_at = time.monotonic()
+        self.alert_engine.sync(self.repository.get_active_alerts())
+        return len(self.alert_engine)
+
+    async def create_alert(self, **values) -> PriceAlert:
+        alert = await asyncio.to_thread(self.repository.create_alert, **values)
+        self.alert_engine.add_alert(alert)
+        return alert
+
+    async def get_alerts(self, email: str) -> list[PriceAlert]:
+        return await asyncio.to_thread(self.repository.get_alerts, email)
+
+    async def get_alert(self, alert_id: int, email: str) -> Optional[PriceAlert]:
+        """
+        :return: The alert, or None when it does not exist or belongs to another subscriber
+        """
+        alert = await asyncio.to_thread(self.repository.get_alert, alert_id)
+        return alert if alert is not None and alert.email == email else None
+
+    async def delete_alert(self, alert_id: int, email: str) -> bool:
+        """
+        :return: Whether the alert was deleted, False when it does not exist or belongs to another subscriber
+        """
+        deleted = await asyncio.to_thread(self.repository.delete_alert, alert_id, email)
+        if deleted:
+            self.alert_engine.remove_alert(alert_id)
+        return deleted
+
+    def on_tick(self, price: float, timestamp: datetime, asset: str = DEFAULT_ASSET,
+                vs_currency: str = DEFAULT_VS_CURRENCY, high: Optional[float] = None) -> list[TriggeredAlert]:
+        """
+        Evaluates the alerts of the pair against a new tick, queues the emails of the ones that fired and stores when
+        they fired.
+
+        :param price: The new price
+        :param timestamp: When the price was fetched
+        :param high: The 90 days high of the pair, needed by the dip alerts
+        :return: The alerts that fired
+        """
+        if (self.sync_interval_seconds is not None
+                and time.monotonic() - self._synced_at >= self.sync_interval_seconds):
+            try:
+                self.sync_alerts()
+            except Exception as e:
+                print(f"An error happened while syncing the price alerts: {e}")
+        triggered_alerts = self.alert_engine.on_tick(price, timestamp, asset, vs_currency, high)
+        if not triggered_alerts:
+            return triggered_alerts
+
+        for triggered_alert in triggered_alerts:
+            print(f"Price alert {triggered_alert.alert_id} fired for {triggered_alert.email}")
+            self.email_outbox.send_email(_alert_message(triggered_alert), f"{triggered_alert.asset} price alert",
+                                         triggered_alert.email)
+        self.repository.mark_triggered([triggered_alert.alert_id for triggered_alert in triggered_alerts],
+                                       triggered_alerts[0].triggered_at)
+        return triggered_alerts
+
+
+def _alert_message(alert: TriggeredAlert) -> str:
+    pair = f"{alert.asset}/{alert.vs_currency}"
+    if alert.kind == "above":
+        return f"The {pair} price rose above {alert.threshold}, it is now {alert.price}."
+    if alert.kind == "below":
+        return f"The {pair} price fell below {alert.threshold}, it is now {alert.price}."
+    if alert.kind == "dip_from_high":
+        return (f"The {pair} price is {alert.value:.2f}% below its 90 days high, it is now {alert.price}. "
+                f"Your alert was set at {alert.threshold}%.")
+    return (f"The {pair} price moved {alert.value:.2f}% within {alert.window_minutes} minutes, it is now "
+            f"{alert.price}. Your alert was set at {alert.threshold}%.")
@@ -0,0 +1,29 @@
+from typing import Iterable
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.price_bulk_loader import BulkLoadResult, PriceBulkLoader
+
+
+class PriceBackfillService:
+    """
+    Loads historical prices in bulk, then rebuilds the daily summaries of the loaded days.
+
+    It runs in the backfill command, not in the API processes, whose cached closed days expire on their own.
+    """
+
+    def __init__(self, bulk_loader: PriceBulkLoader, repository: BitcoinRepository):
+        self.bulk_loader = bulk_loader
+        self.repository = repository
+
+    def backfill(self, rows: Iterable[tuple]) -> BulkLoadResult:
+        """
+        Loads the prices and rebuilds the summaries of every day they cover with one set-based pass per pair.
+
+        :param rows: The (asset, vs_currency, timestamp, price) rows to load, timestamps in naive UTC
+        :return: How many prices were loaded and the days they cover
+        """
+        result = self.bulk_loader.load(rows)
+        for (asset, vs_currency), (first_day, last_day) in result.day_ranges.items():
+            summary_count = self.repository.rebuild_summaries(first_day, last_day, asset, vs_currency)
+            print(f"Rebuilt {summary_count} {asset}/{vs_currency} summaries from {first_day} to {last_day}")
+        return result
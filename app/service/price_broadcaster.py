@@ -0,0 +1,140 @@
+import asyncio
+import json
+from datetime import date, datetime
+from threading import Lock
+from typing import Optional
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.service.candle_aggregator import to_utc_naive
+
+
+class EncodedTick:
+    """
+    A tick serialized once for every subscriber, as the JSON text of a WebSocket message and as an SSE event.
+    """
+
+    __slots__ = ("asset", "vs_currency", "json", "sse")
+
+    def __init__(self, asset: str, vs_currency: str, payload: dict):
+        self.asset = asset
+        self.vs_currency = vs_currency
+        self.json = json.dumps(payload, separators=(",", ":"))
+        self.sse = f"event: tick\ndata: {self.json}\n\n".encode()
+
+
+class Subscription:
+    """
+    The queue of one stream client. When the client falls behind and the queue is full, the oldest tick is dropped,
+    so a slow consumer only ever lags by max_queue_size ticks and never holds the others back.
+    """
+
+    def __init__(self, broadcaster: "PriceBroadcaster", asset: Optional[str], vs_currency: Optional[str],
+                 max_queue_size: int):
+        self.asset = asset
+        self.vs_currency = vs_currency
+        self.dropped_count = 0
+        self._broadcaster = broadcaster
+        self._queue: asyncio.Queue[Optional[EncodedTick]] = asyncio.Queue(max_queue_size)
+
+    def matches(self, tick: EncodedTick) -> bool:
+        return ((self.asset is None or self.asset == tick.asset)
+                and (self.vs_currency is None or self.vs_currency == tick.vs_currency))
+
+    def offer(self, tick: Optional[EncodedTick]):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped_count += 1
+        self._queue.put_nowait(tick)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[EncodedTick]:
+        """
+        Waits for the next tick.
+
+        :return: The tick, or None once the broadcaster is closed
+        :raises asyncio.TimeoutError: If no tick arrived within the timeout
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self):
+        self._broadcaster.unsubscribe(self)
+
+
+class PriceBroadcaster:
+    """
+    Fans every new tick out to the live stream clients.
+
+    Ticks are published from the ingestion thread and encoded once, then handed to the subscription queues on the
+    event loop, so pushing a tick costs the same whatever the number of clients.
+    """
+
+    def __init__(self, max_queue_size: int = 32):
+        self.max_queue_size = max_queue_size
+        self.published_count = 0
+        self._lock = Lock()
+        self._subscriptions: set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, asset: Optional[str] = None, vs_currency: Optional[str] = None) -> Subscription:
+        """
+        Registers a client. Must be called from within the event loop.
+
+        :param asset: Only stream the ticks of this asset, all assets when None
+        :param vs_currency: Only stream the ticks quoted in this currency, all currencies when None
+        """
+        subscription = Subscription(self, asset, vs_currency, self.max_queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, price: float, timestamp: datetime, asset: str = DEFAULT_ASSET,
+                vs_currency: str = DEFAULT_VS_CURRENCY, summary: Optional[tuple[date, float, float]] = None):
+        """
+        Pushes a tick to the subscribed clients. Safe to call from any thread, it never waits for the clients.
+
+        :param price: The new price
+        :param timestamp: When the price was fetched
+        :param summary: The (day, max_price, min_price) of the current day, including this tick
+        """
+        with self._lock:
+            loop = self._loop
+            if not self._subscriptions or loop is None or loop.is_closed():
+                return
+
+        payload = {"asset": asset, "vs_currency": vs_currency, "price": price,
+                   "timestamp": to_utc_naive(timestamp).strftime("%Y-%m-%d %H:%M:%S")}
+        if summary is not None:
+            day, max_price, min_price = summary
+            payload["summary"] = {"date": day.isoformat(), "max_price": max_price, "min_price": min_price}
+        tick = EncodedTick(asset, vs_currency, payload)
+        self.published_count += 1
+        try:
+            loop.call_soon_threadsafe(self._dispatch, tick)
+        except RuntimeError:
+            # The loop was closed in between, there is nobody left to push to
+            pass
+
+    def close(self):
+        """
+        Ends every stream, e.g. at shutdown. Must be called from within the event loop.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.offer(None)
+
+    def _dispatch(self, tick: EncodedTick):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(tick):
+                subscription.offer(tick)
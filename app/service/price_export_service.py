@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+EXPORT_COLUMNS = ("asset", "vs_currency", "timestamp", "price")
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class PriceExportService:
+    """
+    Streams the prices of a time range as CSV, NDJSON or Parquet, optionally gzipped.
+
+    Prices are read through a server side cursor and encoded chunk_rows at a time, so memory stays flat whatever the
+    size of the range and the first bytes are sent before the whole range is read.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], chunk_rows: int = 10_000):
+        self.session_factory = session_factory
+        self.chunk_rows = chunk_rows
+
+    def export(self, start: Optional[datetime], end: datetime, file_format: str, compress: bool = False,
+               asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> Iterator[bytes]:
+        """
+        :param start: Lower bound of the timestamp, inclusive. None exports from the oldest price
+        :param end: Upper bound of the timestamp, exclusive
+        :param file_format: csv, ndjson or parquet
+        :param compress: Whether to gzip the output
+        :return: The chunks of the file
+        """
+        if file_format not in EXPORT_MEDIA_TYPES:
+            raise ValueError(f"Export format should be one of {tuple(EXPORT_MEDIA_TYPES)}!")
+
+        # Its own session, opened once streaming starts and closed with the iterator, not with the request
+        repository = BitcoinRepository(self.session_factory())
+        rows = repository.iter_prices(start, end, self.chunk_rows, asset, vs_currency)
+        encode = {"csv": _encode_csv, "ndjson": _encode_ndjson, "parquet": _encode_parquet}[file_format]
+        chunks = encode(_chunked(rows, self.chunk_rows))
+        return _gzip(chunks) if compress else chunks
+
+
+def _chunked(rows: Iterable[tuple], chunk_rows: int) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_rows)):
+        yield chunk
+
+
+def _format_timestamp(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _encode_csv(chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+    for chunk in chunks:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows((asset, vs_currency, _format_timestamp(timestamp), repr(price))
+                                     for asset, vs_currency, timestamp, price in chunk)
+        yield buffer.getvalue().encode()
+
+
+def _encode_ndjson(chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(json.dumps({"asset": asset, "vs_currency": vs_currency,
+                                  "timestamp": _format_timestamp(timestamp), "price": price}) + "\n"
+                      for asset, vs_currency, timestamp, price in chunk).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    A write-only file collecting what the Parquet writer wrote since the last drain. Its position keeps growing, as
+    the writer records the offsets of the row groups in the footer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _encode_parquet(chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("asset", pa.string()), ("vs_currency", pa.string()),
+                        ("timestamp", pa.timestamp("us", tz="UTC")), ("price", pa.float64())])
+    sink = _ChunkSink()
+    # Each chunk is written as its own row group and sent right away
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            assets, vs_currencies, timestamps, prices = zip(*chunk)
+            writer.write_batch(pa.record_batch([pa.array(assets, pa.string()), pa.array(vs_currencies, pa.string()),
+                                                pa.array(timestamps, pa.timestamp("us")).cast(schema.field(2).type),
+                                                pa.array(prices, pa.float64())], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,88 @@
+from collections import deque
+from datetime import date, timedelta
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+
+class SlidingWindowExtrema:
+    """
+    Exact maximum and minimum of the values seen over the last window_days days, in amortized O(1) per value.
+
+    Each extreme is kept in a monotonic deque of (day, value): a value is dropped as soon as a newer one is at least as
+    extreme, since it can never be the answer again, and the oldest entries leave once their day is out of the window.
+    Values must be added in day order.
+    """
+
+    __slots__ = ("window_days", "_maxima", "_minima", "_lock")
+
+    def __init__(self, window_days: int = 90):
+        self.window_days = window_days
+        self._maxima: deque[tuple[date, float]] = deque()
+        self._minima: deque[tuple[date, float]] = deque()
+        self._lock = Lock()
+
+    def add(self, day: date, high: float, low: float):
+        """
+        Adds the high and low of a period of the given day, e.g. a daily summary or a single tick.
+        """
+        with self._lock:
+            while self._maxima and self._maxima[-1][1] <= high:
+                self._maxima.pop()
+            self._maxima.append((day, high))
+
+            while self._minima and self._minima[-1][1] >= low:
+                self._minima.pop()
+            self._minima.append((day, low))
+
+            self._evict(day)
+
+    def get(self, today: date) -> tuple[Optional[float], Optional[float]]:
+        """
+        Returns the (high, low) of the window ending today, or (None, None) when it holds no value.
+        """
+        with self._lock:
+            self._evict(today)
+            high = self._maxima[0][1] if self._maxima else None
+            low = self._minima[0][1] if self._minima else None
+            return high, low
+
+    def _evict(self, today: date):
+        first_day = today - timedelta(days=self.window_days)
+        while self._maxima and self._maxima[0][0] < first_day:
+            self._maxima.popleft()
+        while self._minima and self._minima[0][0] < first_day:
+            self._minima.popleft()
+
+
+class PriceExtremes:
+    """
+    Process-wide sliding window extremes of every (asset, vs_currency) pair.
+
+    The window of a pair is built once from the stored daily summaries, then only fed with the new ticks.
+    """
+
+    def __init__(self, window_days: int = 90):
+        self.window_days = window_days
+        self._lock = Lock()
+        self._windows: dict[tuple[str, str], SlidingWindowExtrema] = {}
+
+    def get_or_build(self, pair: tuple[str, str],
+                     load_daily_extremes: Callable[[], Iterable[tuple[date, float, float]]]) -> SlidingWindowExtrema:
+        """
+        Returns the window of the pair, building it on first use.
+
+        :param pair: The (asset, vs_currency) pair
+        :param load_daily_extremes: Returns the (day, high, low) of each stored day of the window, oldest first
+        """
+        window = self._windows.get(pair)
+        if window is not None:
+            return window
+
+        with self._lock:
+            window = self._windows.get(pair)
+            if window is None:
+                window = SlidingWindowExtrema(self.window_days)
+                for day, high, low in load_daily_extremes():
+                    window.add(day, high, low)
+                self._windows[pair] = window
+            return window
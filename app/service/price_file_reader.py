@@ -0,0 +1,128 @@
+import csv
+import gzip
+import re
+from datetime import datetime, timezone
+from typing import Iterator, Optional, TextIO
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.service.candle_aggregator import to_utc_naive
+
+FILE_FORMATS = ("json", "csv")
+CHUNK_SIZE = 1 << 16
+
+_PRICES_KEY = re.compile(r'"prices"\s*:\s*\[')
+_NUMBER = r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?"
+# One [timestamp_ms, price] entry and the separator that follows it, a comma or the end of the array
+_PRICE_ENTRY = re.compile(rf"\s*\[\s*({_NUMBER})\s*,\s*({_NUMBER}|null)\s*\]\s*([,\]])")
+_ARRAY_END = re.compile(r"\s*\]")
+
+
+def open_price_file(path: str) -> TextIO:
+    """
+    Opens a price file as text, transparently decompressing the .gz ones.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    file_format = name.rsplit(".", 1)[-1].lower()
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Cannot detect the format of {path}, expected a .json or .csv file")
+    return file_format
+
+
+def iter_price_file(file: TextIO, file_format: str, asset: str = DEFAULT_ASSET,
+                    vs_currency: str = DEFAULT_VS_CURRENCY) -> Iterator[tuple[str, str, datetime, float]]:
+    """
+    Streams the (asset, vs_currency, timestamp, price) rows of a price file, in constant memory.
+
+    :param file_format: json for a CoinGecko market_chart dump, csv for a file with a header
+    :param asset: The asset of the rows that do not name one
+    :param vs_currency: The currency of the rows that do not name one
+    """
+    if file_format == "json":
+        for timestamp, price in iter_market_chart_prices(file):
+            yield asset, vs_currency, timestamp, price
+    elif file_format == "csv":
+        yield from iter_csv_prices(file, asset, vs_currency)
+    else:
+        raise ValueError(f"File format should be one of {FILE_FORMATS}!")
+
+
+def iter_market_chart_prices(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[datetime, float]]:
+    """
+    Streams the (timestamp, price) entries of the prices array of a CoinGecko market_chart dump.
+
+    The file is read chunk by chunk and only the entries of the prices array are parsed, so a dump of any size is
+    read with a buffer of about one chunk. Entries with a null price are skipped.
+
+    :raises ValueError: If the file has no prices array or it is malformed
+    """
+    buffer = ""
+    while True:
+        match = _PRICES_KEY.search(buffer)
+        if match is not None:
+            buffer = buffer[match.end():]
+            break
+        chunk = file.read(chunk_size)
+        if not chunk:
+            raise ValueError("No prices array found in the market_chart file")
+        # Keeps enough of the previous chunk for a key split across two chunks
+        buffer = buffer[-32:] + chunk
+
+    position = 0
+    while True:
+        match = _PRICE_ENTRY.match(buffer, position)
+        if match is None:
+            if position == 0 and _ARRAY_END.match(buffer):
+                return
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError("The prices array of the market_chart file is malformed or truncated")
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        timestamp_ms, price, separator = match.groups()
+        position = match.end()
+        if price != "null":
+            yield _from_epoch(float(timestamp_ms) / 1000), float(price)
+        if separator == "]":
+            return
+
+
+def iter_csv_prices(file: TextIO, asset: str = DEFAULT_ASSET,
+                    vs_currency: str = DEFAULT_VS_CURRENCY) -> Iterator[tuple[str, str, datetime, float]]:
+    """
+    Streams the rows of a CSV file with a timestamp and a price column, and optionally asset and vs_currency ones.
+
+    Timestamps are ISO datetimes, UTC when naive, or epoch seconds or milliseconds.
+    """
+    reader = csv.DictReader(file)
+    if reader.fieldnames is None or not {"timestamp", "price"} <= set(reader.fieldnames):
+        raise ValueError("The CSV file needs a header with at least the timestamp and price columns")
+
+    for row in reader:
+        if not row["price"]:
+            continue
+        yield (row.get("asset") or asset, row.get("vs_currency") or vs_currency, _parse_timestamp(row["timestamp"]),
+               float(row["price"]))
+
+
+def _parse_timestamp(value: str) -> datetime:
+    epoch: Optional[float] = None
+    try:
+        epoch = float(value)
+    except ValueError:
+        pass
+    if epoch is None:
+        return to_utc_naive(datetime.fromisoformat(value))
+    # Epochs in milliseconds are past the year 5000 when read as seconds
+    return _from_epoch(epoch / 1000 if epoch > 1e11 else epoch)
+
+
+def _from_epoch(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """
+    Converts a timestamp to epoch milliseconds. Naive timestamps are UTC, like the stored ones.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // timedelta(milliseconds=1)
+
+
+class PriceRingBuffer:
+    """
+    Fixed capacity ring buffer of the recent (timestamp, price) ticks of one pair, backed by two packed numpy arrays.
+
+    Timestamps are epoch milliseconds (int64) and prices float64, about 16 bytes per tick instead of an ORM object.
+    Ticks are kept in time order, once full the oldest one is overwritten. Every change bumps version, so readers can
+    memoize what they compute from the arrays.
+    """
+
+    __slots__ = ("capacity", "version", "_timestamps", "_prices", "_start", "_size", "_lock")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("The capacity must be positive!")
+        self.capacity = capacity
+        self.version = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._prices = np.zeros(capacity, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: datetime, price: float) -> bool:
+        """
+        Appends a tick. A tick older than the latest one is ignored, so the arrays stay sorted.
+
+        :return: Whether the tick was appended
+        """
+        timestamp_ms = to_epoch_ms(timestamp)
+        with self._lock:
+            if self._size and timestamp_ms < self._timestamps[(self._start + self._size - 1) % self.capacity]:
+                return False
+            end = (self._start + self._size) % self.capacity
+            self._timestamps[end] = timestamp_ms
+            self._prices[end] = price
+            if self._size < self.capacity:
+                self._size += 1
+            else:
+                self._start = (self._start + 1) % self.capacity
+            self.version += 1
+            return True
+
+    def extend(self, timestamps_ms: Iterable[int], prices: Iterable[float]):
+        """
+        Bulk appends ticks already sorted by time and newer than the buffered ones, e.g. when hydrating at startup.
+        Only the latest capacity ticks are kept.
+        """
+        new_timestamps = np.asarray(timestamps_ms, dtype=np.int64)[-self.capacity:]
+        new_prices = np.asarray(prices, dtype=np.float64)[-self.capacity:]
+        with self._lock:
+            timestamps, current_prices = self._unrolled()
+            timestamps = np.concatenate((timestamps, new_timestamps))[-self.capacity:]
+            current_prices = np.concatenate((current_prices, new_prices))[-self.capacity:]
+            self._size = len(timestamps)
+            self._start = 0
+            self._timestamps[:self._size] = timestamps
+            self._prices[:self._size] = current_prices
+            self.version += 1
+
+    def trim_older_than(self, cutoff: datetime) -> int:
+        """
+        Drops the ticks older than the cutoff.
+
+        :return: The number of dropped ticks
+        """
+        cutoff_ms = to_epoch_ms(cutoff)
+        with self._lock:
+            timestamps, _ = self._unrolled()
+            removed_count = int(np.searchsorted(timestamps, cutoff_ms, side="left"))
+            if removed_count:
+                self._start = (self._start + removed_count) % self.capacity
+                self._size -= removed_count
+                self.version += 1
+            return removed_count
+
+    def to_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns contiguous copies of the buffered timestamps (epoch ms) and prices, oldest first.
+        """
+        with self._lock:
+            timestamps, prices = self._unrolled()
+            return timestamps.copy(), prices.copy()
+
+    def price_at_or_before(self, timestamp_ms: int) -> Optional[float]:
+        """
+        Returns the price of the last tick at or before the given time, found by bisection without copying the arrays.
+        """
+        with self._lock:
+            low, high = 0, self._size
+            while low < high:
+                middle = (low + high) // 2
+                if self._timestamps[(self._start + middle) % self.capacity] <= timestamp_ms:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == 0:
+                return None
+            return float(self._prices[(self._start + low - 1) % self.capacity])
+
+    def latest(self) -> Optional[tuple[int, float]]:
+        with self._lock:
+            if not self._size:
+                return None
+            end = (self._start + self._size - 1) % self.capacity
+            return int(self._timestamps[end]), float(self._prices[end])
+
+    def _unrolled(self) -> tuple[np.ndarray, np.ndarray]:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._timestamps[self._start:end], self._prices[self._start:end]
+        wrapped_end = end - self.capacity
+        return (np.concatenate((self._timestamps[self._start:], self._timestamps[:wrapped_end])),
+                np.concatenate((self._prices[self._start:], self._prices[:wrapped_end])))
+
+
+class RecentPrices:
+    """
+    The ring buffers of every (asset, vs_currency) pair, holding the raw ticks of the retention window in memory.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = Lock()
+        self._buffers: dict[tuple[str, str], PriceRingBuffer] = {}
+
+    def get(self, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> PriceRingBuffer:
+        pair = (asset, vs_currency)
+        buffer = self._buffers.get(pair)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.setdefault(pair, PriceRingBuffer(self.capacity))
+        return buffer
+
+    def find(self, asset: str = DEFAULT_ASSET, vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[PriceRingBuffer]:
+        """
+        Like get, without creating a buffer for a pair that was never tracked, e.g. one a request asked for.
+        """
+        return self._buffers.get((asset, vs_currency))
+
+    def append(self, price: float, timestamp: datetime, asset: str = DEFAULT_ASSET,
+               vs_currency: str = DEFAULT_VS_CURRENCY):
+        self.get(asset, vs_currency).append(timestamp, price)
+
+    def trim_older_than(self, cutoff: datetime) -> int:
+        with self._lock:
+            buffers = list(self._buffers.values())
+        return sum(buffer.trim_older_than(cutoff) for buffer in buffers)
+
+    def hydrate(self, repository: BitcoinRepository, start: datetime, end: Optional[datetime] = None) -> int:
+        """
+        Loads the stored ticks of every pair since start, streamed from the database so no ORM object is built.
+
+        :param repository: The repository to stream the prices from
+        :param start: The beginning of the window to load, usually now minus the retention
+        :param end: The end of the window, exclusive. Defaults to now
+        :return: The number of loaded ticks
+        """
+        end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+        loaded_count = 0
+        pair, timestamps, prices = None, [], []
+        # iter_prices is ordered by pair then timestamp, so each pair is loaded with one bulk extend
+        for asset, vs_currency, timestamp, price in repository.iter_prices(start, end):
+            if (asset, vs_currency) != pair:
+                if pair is not None:
+                    self.get(*pair).extend(timestamps, prices)
+                pair, timestamps, prices = (asset, vs_currency), [], []
+            timestamps.append(to_epoch_ms(timestamp))
+            prices.append(price)
+            loaded_count += 1
+
+        if pair is not None:
+            self.get(*pair).extend(timestamps, prices)
+        print(f"Loaded {loaded_count} recent prices in memory")
+        return loaded_count
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.service.candle_aggregator import CANDLE_INTERVALS, CandleAggregator
+
+
+@dataclass(frozen=True)
+class RollupTier:
+    interval: str
+    resolution_seconds: int
+    retention_days: Optional[int]
+
+
+# Raw ticks are kept for the price retention window. Coarser tiers outlive them, hourly and daily bars forever.
+ROLLUP_TIERS = [
+    RollupTier("1m", CANDLE_INTERVALS["1m"], 90),
+    RollupTier("5m", CANDLE_INTERVALS["5m"], 730),
+    RollupTier("1h", CANDLE_INTERVALS["1h"], None),
+    RollupTier("1d", CANDLE_INTERVALS["1d"], None),
+]
+
+
+class PriceRollupService:
+    """
+    Compacts raw ticks into coarser candle tiers before the retention removes them, and picks the tier that answers
+    a range query.
+    """
+
+    def __init__(self, repository: BitcoinRepository, raw_retention_days: int = 90,
+                 tiers: Optional[list[RollupTier]] = None):
+        self.repository = repository
+        self.raw_retention_days = raw_retention_days
+        self.tiers = sorted(tiers or ROLLUP_TIERS, key=lambda tier: tier.resolution_seconds)
+
+    def roll_up_prices_older_than(self, cutoff: datetime) -> int:
+        """
+        Builds the candles of every tier outliving the raw ticks from the ticks older than the cutoff.
+
+        The ticks are streamed one day at a time through a candle aggregator, so memory stays bounded.
+        Candles built from the complete raw ticks overwrite those saved by the live aggregator, which may be partial
+        when the process restarted in the middle of a bucket. Running it twice over the same range is harmless.
+
+        :param cutoff: Ticks before this are about to be removed. Must be aligned on a day
+        :return: The number of candles saved
+        """
+        rollup_intervals = {tier.interval: tier.resolution_seconds for tier in self.tiers
+                            if tier.retention_days is None or tier.retention_days > self.raw_retention_days}
+        oldest_timestamp = self.repository.get_oldest_price_timestamp()
+        if not rollup_intervals or oldest_timestamp is None or oldest_timestamp >= cutoff:
+            return 0
+
+        saved_count = 0
+        day_start = datetime.combine(oldest_timestamp.date(), datetime.min.time())
+        while day_start < cutoff:
+            day_end = min(day_start + timedelta(days=1), cutoff)
+            candle_aggregator = CandleAggregator(rollup_intervals)
+            candles = []
+            for asset, vs_currency, timestamp, price in self.repository.iter_prices(day_start, day_end):
+                candles.extend(candle_aggregator.add_tick(price, timestamp, asset, vs_currency))
+            candles.extend(candle_aggregator.drain_open_candles())
+
+            self.repository.save_candles(candles, merge=False)
+            saved_count += len(candles)
+            day_start = day_end
+
+        print(f"Rolled up {saved_count} candles from prices older than {cutoff}")
+        return saved_count
+
+    def apply_candle_retention(self, now: datetime):
+        for tier in self.tiers:
+            if tier.retention_days is not None:
+                self.repository.delete_candles_older_than(tier.interval, now - timedelta(days=tier.retention_days))
+
+    def choose_tier(self, start: datetime, resolution_seconds: int, now: datetime) -> RollupTier:
+        """
+        Picks the coarsest tier that still meets the requested resolution and holds data back to start.
+
+        When no tier that fine still covers start, the finest tier that does is used.
+
+        :param start: The beginning of the queried range
+        :param resolution_seconds: The coarsest acceptable spacing between two points
+        :param now: The current time, used to know which tiers still hold data at start
+        """
+        covering_tiers = [tier for tier in self.tiers
+                          if tier.retention_days is None or start >= now - timedelta(days=tier.retention_days)]
+        if not covering_tiers:
+            return self.tiers[-1]
+
+        fine_enough_tiers = [tier for tier in covering_tiers if tier.resolution_seconds <= resolution_seconds]
+        return fine_enough_tiers[-1] if fine_enough_tiers else covering_tiers[0]
@@ -0,0 +1,139 @@
+import re
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.database.model.bitcoin_price import DEFAULT_ASSET, DEFAULT_VS_CURRENCY
+from app.service.price_ring_buffer import RecentPrices
+
+DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400}
+MAX_MEMOIZED_RESULTS = 1024
+CHANGE_PERIODS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+
+
+def parse_duration(duration: str) -> int:
+    """
+    Parses a duration such as 15m, 24h or 7d into seconds.
+
+    :raises ValueError: If the duration is malformed
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", duration.strip())
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid duration {duration}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+@dataclass(frozen=True)
+class WindowStats:
+    window_seconds: int
+    tick_count: int
+    sma: Optional[float]
+    ema: Optional[float]
+    volatility: Optional[float]
+    max_drawdown: Optional[float]
+
+
+@dataclass(frozen=True)
+class PriceStats:
+    price: float
+    timestamp_ms: int
+    windows: list[WindowStats]
+    changes: dict[str, Optional[float]]
+
+
+class PriceStatsService:
+    """
+    Computes rolling statistics of the recent ticks of a pair with vectorized numpy operations.
+
+    Results are memoized per (pair, metric, window) along with the version of the ring buffer they were computed
+    from, so they are recomputed only after a new tick. Only the tracked pairs, the ones with ticks in memory, are
+    memoized.
+    """
+
+    def __init__(self, recent_prices: RecentPrices):
+        self.recent_prices = recent_prices
+        self._lock = Lock()
+        self._memo: dict[tuple, tuple[int, object]] = {}
+
+    def get_stats(self, window_seconds: list[int], asset: str = DEFAULT_ASSET,
+                  vs_currency: str = DEFAULT_VS_CURRENCY) -> Optional[PriceStats]:
+        """
+        Returns the statistics of the pair over each window, ending at the latest tick.
+
+        :param window_seconds: The windows to compute the SMA, EMA, volatility and max drawdown over
+        :return: The statistics, or None when no tick is in memory
+        """
+        buffer = self.recent_prices.find(asset, vs_currency)
+        if buffer is None:
+            return None
+        # Read before the arrays, so results are at worst recomputed once more, never served stale
+        version = buffer.version
+        timestamps, prices = self._memoized(version, (asset, vs_currency, "arrays"), buffer.to_arrays)
+        if not len(prices):
+            return None
+
+        windows = [self._memoized(version, (asset, vs_currency, "window", seconds),
+                                  lambda seconds=seconds: _compute_window_stats(timestamps, prices, seconds))
+                   for seconds in window_seconds]
+        changes = self._memoized(version, (asset, vs_currency, "changes"),
+                                 lambda: _compute_changes(timestamps, prices))
+        return PriceStats(price=float(prices[-1]), timestamp_ms=int(timestamps[-1]), windows=windows, changes=changes)
+
+    def _memoized(self, version: int, key: tuple, compute: Callable):
+        with self._lock:
+            memoized = self._memo.get(key)
+        if memoized is not None and memoized[0] == version:
+            return memoized[1]
+
+        value = compute()
+        with self._lock:
+            if len(self._memo) >= MAX_MEMOIZED_RESULTS:
+                self._memo.clear()
+            self._memo[key] = (version, value)
+        return value
+
+
+def _window_slice(timestamps: np.ndarray, window_seconds: int) -> slice:
+    start_index = int(np.searchsorted(timestamps, timestamps[-1] - window_seconds * 1000, side="left"))
+    return slice(start_index, len(timestamps))
+
+
+def _compute_window_stats(timestamps: np.ndarray, prices: np.ndarray, window_seconds: int) -> WindowStats:
+    window_prices = prices[_window_slice(timestamps, window_seconds)]
+    tick_count = len(window_prices)
+
+    log_returns = np.diff(np.log(window_prices))
+    running_max = np.maximum.accumulate(window_prices)
+
+    return WindowStats(window_seconds=window_seconds, tick_count=tick_count,
+                       sma=float(window_prices.mean()),
+                       ema=_ema(window_prices),
+                       volatility=float(log_returns.std(ddof=1)) if len(log_returns) > 1 else None,
+                       max_drawdown=float((window_prices / running_max - 1).min()))
+
+
+def _ema(prices: np.ndarray) -> float:
+    """
+    The last value of the exponential moving average whose span is the whole window, seeded with its first price.
+
+    The recursion ema = alpha * price + (1 - alpha) * ema is unrolled into one weighted sum.
+    """
+    tick_count = len(prices)
+    alpha = 2 / (tick_count + 1)
+    decay = (1 - alpha) ** np.arange(tick_count - 1, -1, -1, dtype=np.float64)
+    weights = alpha * decay
+    weights[0] = decay[0]
+    return float(np.dot(weights, prices))
+
+
+def _compute_changes(timestamps: np.ndarray, prices: np.ndarray) -> dict[str, Optional[float]]:
+    """
+    The percent change of the latest price against the last price at or before each period ago. A period older than
+    the buffered ticks has no change.
+    """
+    reference_indexes = np.searchsorted(timestamps, timestamps[-1] - np.array(list(CHANGE_PERIODS.values())) * 1000,
+                                        side="right") - 1
+    return {name: float((prices[-1] / prices[index] - 1) * 100) if index >= 0 else None
+            for name, index in zip(CHANGE_PERIODS, reference_indexes)}
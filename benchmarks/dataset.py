@@ -0,0 +1,87 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import insert
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import Base, DatabaseManager
+from app.database.model.bitcoin_candle import BitcoinCandle
+from app.database.price_bulk_loader import PriceBulkLoader
+from app.service.candle_aggregator import Candle, CandleAggregator
+from app.service.price_backfill_service import PriceBackfillService
+
+DEFAULT_PAIRS = [("bitcoin", "usd")]
+START_PRICES = {"bitcoin": 60_000.0, "ethereum": 3_000.0}
+CANDLE_BATCH_SIZE = 20_000
+
+
+def random_walk(start: datetime, days: float, interval_seconds: int, pairs: list[tuple[str, str]], seed: int = 42,
+                volatility: float = 0.0008) -> Iterator[tuple[str, str, datetime, float]]:
+    """
+    Generates a geometric random walk of (asset, vs_currency, timestamp, price) ticks, ordered by pair then timestamp.
+    The same arguments always give the same ticks.
+
+    :param start: The timestamp of the first tick of each pair
+    :param days: How many days of ticks to generate per pair
+    :param interval_seconds: The time between two ticks
+    :param volatility: Standard deviation of the log return between two ticks
+    """
+    tick_count = int(days * 86400 // interval_seconds)
+    for pair_index, (asset, vs_currency) in enumerate(pairs):
+        generator = random.Random(seed + pair_index)
+        log_price = math.log(START_PRICES.get(asset, 100.0))
+        for tick in range(tick_count):
+            log_price += generator.gauss(0, volatility)
+            yield asset, vs_currency, start + timedelta(seconds=tick * interval_seconds), round(math.exp(log_price), 2)
+
+
+def build_dataset(db_manager: DatabaseManager, days: float, interval_seconds: int,
+                  pairs: list[tuple[str, str]] = DEFAULT_PAIRS, seed: int = 42) -> dict:
+    """
+    Recreates the tables and fills them with a random walk ending now, with the daily summaries and the candles it
+    implies, the way a backfill followed by live ticks would.
+
+    :return: The description of the dataset, written in the benchmark results
+    """
+    Base.metadata.drop_all(bind=db_manager.engine)
+    db_manager.create_tables()
+
+    end = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    candle_aggregator = CandleAggregator()
+    candles: list[Candle] = []
+    candle_count = 0
+
+    def save_candles(batch: list[Candle]):
+        # The tables are empty, so the candles are inserted without the lookup save_candles does for merging
+        if batch:
+            with db_manager.engine.begin() as connection:
+                connection.execute(insert(BitcoinCandle.__table__), [
+                    {"asset": candle.asset, "vs_currency": candle.vs_currency, "interval": candle.interval,
+                     "open_time": candle.open_time, "open_price": candle.open_price, "high_price": candle.high_price,
+                     "low_price": candle.low_price, "close_price": candle.close_price,
+                     "tick_count": candle.tick_count} for candle in batch])
+
+    def ticks_with_candles():
+        nonlocal candles, candle_count
+        for asset, vs_currency, timestamp, price in random_walk(start, days, interval_seconds, pairs, seed):
+            candles.extend(candle_aggregator.add_tick(price, timestamp, asset, vs_currency))
+            if len(candles) >= CANDLE_BATCH_SIZE:
+                save_candles(candles)
+                candle_count += len(candles)
+                candles = []
+            yield asset, vs_currency, timestamp, price
+
+    backfill_service = PriceBackfillService(PriceBulkLoader(db_manager.get_engine(),
+                                                            db_manager.get_partition_manager()),
+                                            BitcoinRepository(db_manager.get_session()))
+    result = backfill_service.backfill(ticks_with_candles())
+    candles.extend(candle_aggregator.drain_open_candles())
+    save_candles(candles)
+    candle_count += len(candles)
+
+    return {"days": days, "interval_seconds": interval_seconds, "pairs": [list(pair) for pair in pairs],
+            "seed": seed, "price_count": result.loaded_count, "candle_count": candle_count,
+            "start": start.isoformat(), "end": end.isoformat()}
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks.timing import compare, measure, measure_async
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Times the repository methods, the endpoints and the tick path on a synthetic dataset.")
+    parser.add_argument("--database-url",
+                        help="Database to benchmark, dropped and refilled. Defaults to a temporary SQLite file")
+    parser.add_argument("--days", type=float, default=90, help="Days of synthetic prices per pair")
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between two synthetic ticks")
+    parser.add_argument("--pairs", default="bitcoin/usd",
+                        help="Comma separated asset/vs_currency pairs, the first one is benchmarked")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs of each benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs of each benchmark before the timed ones")
+    parser.add_argument("--output", help="Where to write the JSON results, stdout when omitted")
+    parser.add_argument("--baseline", help="Results of a previous run to compare the medians with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown of a median above which it is reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when a benchmark regressed against the baseline")
+    return parser.parse_args(argv)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _dataset_key(dataset: dict) -> tuple:
+    return tuple(dataset.get(key) for key in ("days", "interval_seconds", "pairs", "seed"))
+
+
+def _quiet(function):
+    # The services print a line per tick and per query, which would dominate the timings
+    def quiet_function():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    return quiet_function
+
+
+def benchmark_repository(db_manager, pair: tuple[str, str], dataset: dict, repeat: int, warmup: int) -> dict:
+    from app.database.bitcoin_repository import BitcoinRepository
+
+    repository = BitcoinRepository(db_manager.get_session())
+    asset, vs_currency = pair
+    end = datetime.fromisoformat(dataset["end"])
+    start = datetime.fromisoformat(dataset["start"])
+    today = date.today()
+    middle = start + (end - start) / 2
+    # The key of a page in the middle of the range, to check deep pages cost the same as the first one
+    middle_price = repository.get_prices_page(middle, None, 1, None, asset, vs_currency)[0]
+    middle_key = (middle_price.timestamp, middle_price.id)
+    next_timestamp = [end]
+
+    def insert_price():
+        next_timestamp[0] += timedelta(seconds=1)
+        repository.insert_prices([{"price": 60_000.0, "timestamp": next_timestamp[0], "asset": asset,
+                                   "vs_currency": vs_currency}])
+
+    benchmarks = {
+        "get_latest_price": lambda: repository.get_latest_price(asset, vs_currency),
+        "get_summary_by_day": lambda: repository.get_summary_by_day(today - timedelta(days=1), asset, vs_currency),
+        "get_all_summaries": lambda: repository.get_all_summaries(asset, vs_currency),
+        "get_summaries_page": lambda: repository.get_summaries_page(None, None, 1000, None, asset, vs_currency),
+        "get_prices_page.first": lambda: repository.get_prices_page(start, None, 500, None, asset, vs_currency),
+        "get_prices_page.deep": lambda: repository.get_prices_page(start, None, 500, middle_key, asset, vs_currency),
+        "get_candles.1m": lambda: repository.get_candles("1m", end - timedelta(hours=24), end, 1440, asset,
+                                                         vs_currency),
+        "get_candles.1h": lambda: repository.get_candles("1h", start, end, 10_000, asset, vs_currency),
+        "get_max_historic_price": lambda: repository.get_max_historic_price(today - timedelta(days=90), today, asset,
+                                                                            vs_currency),
+        "iter_prices.1d": lambda: sum(1 for _ in repository.iter_prices(end - timedelta(days=1), end, 5_000, asset,
+                                                                        vs_currency)),
+        "insert_prices": insert_price,
+        "update_summary": lambda: repository.update_summary(60_000.0, today, asset, vs_currency),
+    }
+    return {f"repository.{name}": measure(_quiet(function), repeat, warmup) for name, function in benchmarks.items()}
+
+
+async def benchmark_endpoints(app, pair: tuple[str, str], dataset: dict, repeat: int, warmup: int) -> dict:
+    import httpx
+
+    asset, vs_currency = pair
+    end = datetime.fromisoformat(dataset["end"])
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    params = {"asset": asset, "vs_currency": vs_currency}
+    day_range = {"from": (end - timedelta(days=1)).isoformat(), "to": end.isoformat()}
+    requests = {
+        "prices.latest": ("/bitcoin/prices/latest", {}),
+        "prices.high_low": ("/bitcoin/prices/high-low", {}),
+        "prices.page": ("/bitcoin/prices", {"from": dataset["start"], "limit": 500}),
+        "prices.summary": (f"/bitcoin/prices/summary/{yesterday}", {}),
+        "prices.summaries": ("/bitcoin/prices/summaries", {}),
+        "candles.1m": ("/bitcoin/candles", {"interval": "1m", "limit": 1440, **day_range}),
+        "history.90d": ("/bitcoin/history", {"from": dataset["start"], "to": dataset["end"]}),
+        "stats": ("/bitcoin/stats", {"windows": "1h,24h,7d,30d"}),
+        "export.1d.csv": ("/bitcoin/export", {"format": "csv", **day_range}),
+    }
+
+    results = {}
+    # In process, the requests go through the whole ASGI stack without a socket
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for name, (path, query) in requests.items():
+            async def request():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    response = await client.get(path, params={**params, **query})
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+
+            results[f"endpoint.{name}"] = await measure_async(request, repeat, warmup)
+    return results
+
+
+def benchmark_tick_path(db_manager, pair: tuple[str, str], repeat: int, warmup: int) -> dict:
+    from app.database.bitcoin_repository import BitcoinRepository
+    from app.integration.email_sender_integration import EmailSenderIntegration
+    from app.service.bitcoin_service import BitcoinService
+    from app.service.candle_aggregator import CandleAggregator
+    from app.service.market_snapshot import MarketSnapshot
+    from app.service.price_ring_buffer import RecentPrices
+
+    asset, vs_currency = pair
+    bitcoin_service = BitcoinService(BitcoinRepository(db_manager.get_session()), date.today(),
+                                     EmailSenderIntegration(), market_snapshot=MarketSnapshot(),
+                                     candle_aggregator=CandleAggregator(), recent_prices=RecentPrices(1000))
+    price = [60_000.0]
+    ticks = itertools.count()
+
+    def update_price():
+        # Every other tick is a new high, so half of the ticks also write the summary
+        price[0] += 1.0 if next(ticks) % 2 == 0 else -0.5
+        bitcoin_service.update_price(price[0], asset, vs_currency)
+
+    return {"tick.update_price": measure(_quiet(update_price), repeat, warmup),
+            "tick.update_summary": measure(_quiet(lambda: bitcoin_service.update_summary(price[0], asset, vs_currency)),
+                                           repeat, warmup)}
+
+
+def run(args) -> dict:
+    pairs = [tuple(pair.strip().split("/", 1)) for pair in args.pairs.split(",") if pair.strip()]
+    if not pairs or any(len(pair) != 2 for pair in pairs):
+        raise ValueError("Pairs should be written asset/vs_currency")
+
+    # The app builds its database manager on import, so the url is set first
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import __version__ as sqlalchemy_version
+
+    from benchmarks.dataset import build_dataset
+
+    # Keeps stdout for the JSON results, should the app log anything on import
+    with contextlib.redirect_stdout(sys.stderr):
+        from app.dependencies import db_manager, recent_prices
+        from app.main import app, bitcoin_repository
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = build_dataset(db_manager, args.days, args.interval, pairs, args.seed)
+        recent_prices.hydrate(bitcoin_repository, datetime.fromisoformat(dataset["start"]))
+    print(f"Loaded {dataset['price_count']} prices and {dataset['candle_count']} candles", file=sys.stderr)
+
+    results = benchmark_repository(db_manager, pairs[0], dataset, args.repeat, args.warmup)
+    results.update(asyncio.run(benchmark_endpoints(app, pairs[0], dataset, args.repeat, args.warmup)))
+    results.update(benchmark_tick_path(db_manager, pairs[0], args.repeat, args.warmup))
+
+    return {"meta": {"created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     "git_commit": _git_commit(), "python": platform.python_version(),
+                     "sqlalchemy": sqlalchemy_version, "platform": platform.platform(),
+                     "dialect": db_manager.engine.dialect.name, "driver": db_manager.engine.dialect.driver,
+                     "repeat": args.repeat, "warmup": args.warmup},
+            "dataset": dataset,
+            "results": results}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        args.database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+        report = run(args)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if _dataset_key(baseline.get("dataset", {})) != _dataset_key(report["dataset"]):
+            print("The baseline was run on a different dataset, its timings are not comparable", file=sys.stderr)
+        report["comparison"] = compare(report["results"], baseline.get("results", {}), args.threshold)
+        regressions = [name for name, comparison in report["comparison"].items() if comparison["regression"]]
+        for name in regressions:
+            comparison = report["comparison"][name]
+            print(f"Regression: {name} median {comparison['median_ms']} ms, was {comparison['baseline_median_ms']} ms",
+                  file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
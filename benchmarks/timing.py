@@ -0,0 +1,60 @@
+import gc
+import statistics
+import time
+from typing import Awaitable, Callable
+
+
+def summarize(durations_ms: list[float]) -> dict:
+    ordered = sorted(durations_ms)
+    return {"runs": len(ordered),
+            "min_ms": round(ordered[0], 4),
+            "median_ms": round(statistics.median(ordered), 4),
+            "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 4),
+            "mean_ms": round(statistics.fmean(ordered), 4),
+            "max_ms": round(ordered[-1], 4)}
+
+
+def measure(function: Callable[[], object], repeat: int, warmup: int = 1) -> dict:
+    """
+    Times repeat calls of function after warmup untimed ones.
+    """
+    for _ in range(warmup):
+        function()
+    # Starts from a clean heap, so a collection of the warmup garbage does not land in the timed runs
+    gc.collect()
+    durations_ms = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        durations_ms.append((time.perf_counter() - started_at) * 1000)
+    return summarize(durations_ms)
+
+
+async def measure_async(function: Callable[[], Awaitable[object]], repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        await function()
+    gc.collect()
+    durations_ms = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await function()
+        durations_ms.append((time.perf_counter() - started_at) * 1000)
+    return summarize(durations_ms)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    """
+    Compares the median of each benchmark with the baseline.
+
+    :param threshold: Relative slowdown of the median above which a benchmark is a regression, e.g. 0.2 for 20%
+    :return: For each benchmark found in both, its baseline and current medians, their ratio and whether it regressed
+    """
+    comparison = {}
+    for name, stats in results.items():
+        baseline_stats = baseline.get(name)
+        if baseline_stats is None or not baseline_stats.get("median_ms"):
+            continue
+        ratio = stats["median_ms"] / baseline_stats["median_ms"]
+        comparison[name] = {"baseline_median_ms": baseline_stats["median_ms"], "median_ms": stats["median_ms"],
+                            "ratio": round(ratio, 3), "regression": ratio > 1 + threshold}
+    return comparison
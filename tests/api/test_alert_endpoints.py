@@ -0,0 +1,98 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_price_alert_service
+from app.main import app
+
+client = TestClient(app)
+
+
+def _alert(alert_id=1, kind="above", threshold=100_000.0, window_minutes=None, last_triggered_at=None):
+    return SimpleNamespace(id=alert_id, email="john@example.com", asset="bitcoin", vs_currency="usd", kind=kind,
+                           threshold=threshold, window_minutes=window_minutes, cooldown_seconds=3600,
+                           hysteresis_percent=1.0, active=True, last_triggered_at=last_triggered_at)
+
+
+@pytest.fixture
+def mock_alert_service():
+    mock_service = AsyncMock()
+    app.dependency_overrides[get_price_alert_service] = lambda: mock_service
+    yield mock_service
+    app.dependency_overrides.clear()
+
+
+def test_create_alert(mock_alert_service):
+    mock_alert_service.create_alert.return_value = _alert()
+
+    response = client.post("/bitcoin/alerts", json={"email": "john@example.com", "kind": "above",
+                                                    "threshold": 100_000, "hysteresis_percent": 1})
+
+    assert response.status_code == 201
+    assert response.json()["id"] == 1
+    assert response.json()["last_triggered_at"] is None
+    values = mock_alert_service.create_alert.call_args.kwargs
+    assert values["kind"] == "above"
+    assert values["cooldown_seconds"] == 3600
+
+
+@pytest.mark.parametrize("body", [
+    {"email": "not-an-email", "kind": "above", "threshold": 100},
+    {"email": "john@example.com", "kind": "sideways", "threshold": 100},
+    {"email": "john@example.com", "kind": "above", "threshold": -1},
+    {"email": "john@example.com", "kind": "move_within", "threshold": 5},
+    {"email": "john@example.com", "kind": "dip_from_high", "threshold": 150},
+])
+def test_create_alert_rejects_invalid_alerts(mock_alert_service, body):
+    response = client.post("/bitcoin/alerts", json=body)
+
+    assert response.status_code == 422
+    mock_alert_service.create_alert.assert_not_called()
+
+
+def test_get_alerts_by_email(mock_alert_service):
+    mock_alert_service.get_alerts.return_value = [
+        _alert(), _alert(2, "move_within", 5.0, 15, datetime(2025, 1, 1, 12, 0))]
+
+    response = client.get("/bitcoin/alerts?email=john@example.com")
+
+    assert response.status_code == 200
+    assert [alert["window_minutes"] for alert in response.json()] == [None, 15]
+    assert response.json()[1]["last_triggered_at"] == "2025-01-01 12:00:00"
+    mock_alert_service.get_alerts.assert_called_once_with("john@example.com")
+
+
+def test_get_alerts_requires_an_email(mock_alert_service):
+    response = client.get("/bitcoin/alerts")
+
+    assert response.status_code == 422
+    mock_alert_service.get_alerts.assert_not_called()
+
+
+def test_get_alert_not_found(mock_alert_service):
+    mock_alert_service.get_alert.return_value = None
+
+    response = client.get("/bitcoin/alerts/1?email=jane@example.com")
+
+    assert response.status_code == 404
+    mock_alert_service.get_alert.assert_called_once_with(1, "jane@example.com")
+
+
+def test_get_and_delete_alert_require_an_email(mock_alert_service):
+    assert client.get("/bitcoin/alerts/1").status_code == 422
+    assert client.delete("/bitcoin/alerts/1").status_code == 422
+    mock_alert_service.get_alert.assert_not_called()
+    mock_alert_service.delete_alert.assert_not_called()
+
+
+def test_delete_alert(mock_alert_service):
+    mock_alert_service.delete_alert.return_value = True
+
+    assert client.delete("/bitcoin/alerts/1?email=john@example.com").status_code == 204
+    mock_alert_service.delete_alert.assert_called_once_with(1, "john@example.com")
+
+    mock_alert_service.delete_alert.return_value = False
+    assert client.delete("/bitcoin/alerts/1?email=john@example.com").status_code == 404
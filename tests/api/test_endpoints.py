@@ -1,13 +1,20 @@
-from datetime import datetime, date
-from unittest.mock import MagicMock
+import gzip
+from datetime import datetime, date, timezone
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
+from app.database.bitcoin_repository import BitcoinRepository
 from app.database.database_manager import Base
 from app.database.database_manager import DatabaseManager
-from app.dependencies import get_bitcoin_service, get_session
+from app.dependencies import (get_bitcoin_service, get_price_export_service, get_price_stats_service, get_read_session,
+                              get_session, summary_cache)
 from app.main import app
+from app.service.candle_aggregator import Candle
+from app.service.price_export_service import PriceExportService
+from app.service.price_extremes import PriceExtremes
+from app.service.price_stats_service import PriceStats, WindowStats
 
 client = TestClient(app)
 
@@ -36,6 +43,7 @@ def test_db():
         return db_manager.get_session()
 
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_read_session] = override_get_session
 
     yield db_manager.get_session()
 
@@ -50,17 +58,19 @@ def test_db():
 
 @pytest.fixture
 def mock_bitcoin_service(mocker, test_db):
-    mock_service = MagicMock()
+    mock_service = AsyncMock()
     app.dependency_overrides[get_bitcoin_service] = lambda: mock_service
+    summary_cache.clear()
     yield mock_service
 
     app.dependency_overrides.clear()
+    summary_cache.clear()
 
 
 @pytest.mark.asyncio
 async def test_get_latest_bitcoin_price_success(mock_bitcoin_service):
     mock_price = MockBitcoinPrice(id=1, price=50000.0, timestamp=datetime(2025, 4, 6, 12, 0, 0))
-    mock_bitcoin_service.get_latest_price.return_value = mock_price
+    mock_bitcoin_service.get_latest_price_async.return_value = mock_price
 
     response = client.get("/bitcoin/prices/latest")
 
@@ -74,17 +84,27 @@ async def test_get_latest_bitcoin_price_success(mock_bitcoin_service):
 
 @pytest.mark.asyncio
 async def test_get_latest_bitcoin_price_not_found(mock_bitcoin_service):
-    mock_bitcoin_service.get_latest_price.return_value = None
+    mock_bitcoin_service.get_latest_price_async.return_value = None
 
     response = client.get("/bitcoin/prices/latest")
 
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Error fetching latest price: 404: No prices found"}
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No prices found"}
+
+
+@pytest.mark.asyncio
+async def test_get_latest_price_of_an_untracked_pair_not_found(mock_bitcoin_service):
+    mock_bitcoin_service.get_latest_price_async.return_value = None
+
+    response = client.get("/bitcoin/prices/latest?asset=dogecoin&vs_currency=brl")
+
+    assert response.status_code == 404
+    mock_bitcoin_service.get_latest_price_async.assert_called_once_with("dogecoin", "brl")
 
 
 @pytest.mark.asyncio
 async def test_get_latest_bitcoin_price_error(mock_bitcoin_service):
-    mock_bitcoin_service.get_latest_price.side_effect = Exception("Database error")
+    mock_bitcoin_service.get_latest_price_async.side_effect = Exception("Database error")
 
     response = client.get("/bitcoin/prices/latest")
 
@@ -95,7 +115,7 @@ async def test_get_latest_bitcoin_price_error(mock_bitcoin_service):
 @pytest.mark.asyncio
 async def test_get_summary_by_day_success(mock_bitcoin_service):
     mock_summary = MockSummary(id=1, max_price=51000.0, min_price=49000.0, day=date(2025, 4, 6))
-    mock_bitcoin_service.get_summary_by_date.return_value = mock_summary
+    mock_bitcoin_service.get_summary_by_date_async.return_value = mock_summary
 
     response = client.get("/bitcoin/prices/summary/2025-04-06")
 
@@ -110,7 +130,7 @@ async def test_get_summary_by_day_success(mock_bitcoin_service):
 
 @pytest.mark.asyncio
 async def test_get_summary_by_day_not_found(mock_bitcoin_service):
-    mock_bitcoin_service.get_summary_by_date.return_value = None
+    mock_bitcoin_service.get_summary_by_date_async.return_value = None
 
     response = client.get("/bitcoin/prices/summary/2025-04-06")
 
@@ -124,6 +144,39 @@ async def test_get_summary_by_day_not_found(mock_bitcoin_service):
     }
 
 
+@pytest.mark.asyncio
+async def test_get_summary_by_day_closed_day_is_cached_and_revalidated(mock_bitcoin_service):
+    mock_bitcoin_service.get_summary_by_date_async.return_value = MockSummary(id=1, max_price=51000.0,
+                                                                              min_price=49000.0, day=date(2025, 4, 6))
+
+    response = client.get("/bitcoin/prices/summary/2025-04-06")
+
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    etag = response.headers["etag"]
+
+    not_modified_response = client.get("/bitcoin/prices/summary/2025-04-06", headers={"If-None-Match": etag})
+
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.content == b""
+    assert not_modified_response.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_summary_by_day_not_found_and_current_day_are_not_cached(mock_bitcoin_service):
+    mock_bitcoin_service.get_summary_by_date_async.return_value = None
+
+    response = client.get("/bitcoin/prices/summary/2025-04-06")
+
+    assert response.headers["cache-control"] == "no-cache"
+
+    today = datetime.now(timezone.utc).date()
+    mock_bitcoin_service.get_summary_by_date_async.return_value = MockSummary(id=2, max_price=1.0, min_price=1.0,
+                                                                              day=today)
+    response = client.get(f"/bitcoin/prices/summary/{today.isoformat()}")
+
+    assert response.headers["cache-control"] == "no-cache"
+
+
 @pytest.mark.asyncio
 async def test_get_summary_by_day_invalid_date(mock_bitcoin_service):
     response = client.get("/bitcoin/prices/summary/invalid-date")
@@ -138,7 +191,7 @@ async def test_get_all_summaries_success(mock_bitcoin_service):
         MockSummary(id=1, max_price=51000.0, min_price=49000.0, day=date(2025, 4, 6)),
         MockSummary(id=2, max_price=52000.0, min_price=50000.0, day=date(2025, 4, 7))
     ]
-    mock_bitcoin_service.get_all_summaries.return_value = mock_summaries
+    mock_bitcoin_service.get_summaries_page_async.return_value = (mock_summaries, None)
 
     response = client.get("/bitcoin/prices/summaries")
 
@@ -149,31 +202,250 @@ async def test_get_all_summaries_success(mock_bitcoin_service):
     ]
 
 
+@pytest.mark.asyncio
+async def test_get_summaries_page_with_filters_and_cursor(mock_bitcoin_service):
+    mock_bitcoin_service.get_summaries_page_async.return_value = (
+        [MockSummary(id=1, max_price=51000.0, min_price=49000.0, day=date(2025, 4, 6))], date(2025, 4, 6))
+
+    response = client.get("/bitcoin/prices/summaries?from=2025-04-01&to=2025-04-10&limit=1")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "max_price": 51000.0, "min_price": 49000.0, "date": "2025-04-06"}]
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    mock_bitcoin_service.get_summaries_page_async.assert_called_once_with(date(2025, 4, 1), date(2025, 4, 10), 1,
+                                                                          None, "bitcoin", "usd")
+
+    next_cursor = response.headers["x-next-cursor"]
+    mock_bitcoin_service.get_summaries_page_async.return_value = (
+        [MockSummary(id=2, max_price=52000.0, min_price=50000.0, day=date(2025, 4, 7))], None)
+    response = client.get(f"/bitcoin/prices/summaries?after={next_cursor}")
+
+    assert "x-next-cursor" not in response.headers
+    assert response.headers["cache-control"] == "no-cache"
+    mock_bitcoin_service.get_summaries_page_async.assert_called_with(None, None, 1000, date(2025, 4, 6),
+                                                                     "bitcoin", "usd")
+
+
+@pytest.mark.asyncio
+async def test_get_summaries_page_invalid_cursor(mock_bitcoin_service):
+    response = client.get("/bitcoin/prices/summaries?after=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
 @pytest.mark.asyncio
 async def test_get_all_summaries_empty(mock_bitcoin_service):
-    mock_bitcoin_service.get_all_summaries.return_value = []
+    mock_bitcoin_service.get_summaries_page_async.return_value = ([], None)
 
     response = client.get("/bitcoin/prices/summaries")
 
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Error fetching summary: 404: No summaries found!"}
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No summaries found!"}
+
+
+@pytest.mark.asyncio
+async def test_get_all_summaries_empty_range(mock_bitcoin_service):
+    mock_bitcoin_service.get_summaries_page_async.return_value = ([], None)
+
+    response = client.get("/bitcoin/prices/summaries?from=2020-01-01&to=2020-01-31")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No summaries found!"}
+    mock_bitcoin_service.get_summaries_page_async.assert_called_once_with(date(2020, 1, 1), date(2020, 1, 31), 1000,
+                                                                          None, "bitcoin", "usd")
 
 
 @pytest.mark.asyncio
 async def test_get_all_summaries_none(mock_bitcoin_service):
-    mock_bitcoin_service.get_all_summaries.return_value = None
+    mock_bitcoin_service.get_summaries_page_async.return_value = (None, None)
 
     response = client.get("/bitcoin/prices/summaries")
 
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Error fetching summary: 404: No summaries found!"}
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No summaries found!"}
 
 
 @pytest.mark.asyncio
 async def test_get_all_summaries_error(mock_bitcoin_service):
-    mock_bitcoin_service.get_all_summaries.side_effect = Exception("Database error")
+    mock_bitcoin_service.get_summaries_page_async.side_effect = Exception("Database error")
 
     response = client.get("/bitcoin/prices/summaries")
 
     assert response.status_code == 500
     assert response.json() == {"detail": "Error fetching summary: Database error"}
+
+
+@pytest.mark.asyncio
+async def test_get_candles_success(mock_bitcoin_service):
+    mock_bitcoin_service.get_candles_async.return_value = [
+        Candle("bitcoin", "usd", "5m", datetime(2025, 4, 6, 12, 0), 100.0, 120.0, 90.0, 110.0, 5)
+    ]
+
+    response = client.get("/bitcoin/candles?interval=5m&from=2025-04-06T00:00:00&to=2025-04-07T00:00:00")
+
+    assert response.status_code == 200
+    assert response.json() == [{"open_time": "2025-04-06 12:00:00", "open": 100.0, "high": 120.0, "low": 90.0,
+                                "close": 110.0, "tick_count": 5}]
+    mock_bitcoin_service.get_candles_async.assert_called_once_with("5m", datetime(2025, 4, 6), datetime(2025, 4, 7), 1000,
+                                                             "bitcoin", "usd")
+
+
+@pytest.mark.asyncio
+async def test_get_candles_invalid_interval(mock_bitcoin_service):
+    response = client.get("/bitcoin/candles?interval=3m")
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_prices_page(mock_bitcoin_service):
+    mock_prices = [MockBitcoinPrice(id=1, price=50000.0, timestamp=datetime(2025, 4, 6, 12, 0, 0)),
+                   MockBitcoinPrice(id=2, price=50100.0, timestamp=datetime(2025, 4, 6, 12, 1, 0))]
+    mock_bitcoin_service.get_prices_page_async.return_value = (mock_prices, (datetime(2025, 4, 6, 12, 1, 0), 2))
+
+    response = client.get("/bitcoin/prices?limit=2")
+
+    assert response.status_code == 200
+    assert response.json()["items"] == [
+        {"id": 1, "price": 50000.0, "timestamp": "2025-04-06 12:00:00"},
+        {"id": 2, "price": 50100.0, "timestamp": "2025-04-06 12:01:00"}
+    ]
+
+    next_cursor = response.json()["next_cursor"]
+    mock_bitcoin_service.get_prices_page_async.return_value = ([], None)
+
+    response = client.get(f"/bitcoin/prices?limit=2&after={next_cursor}")
+
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
+    mock_bitcoin_service.get_prices_page_async.assert_called_with(None, None, 2, (datetime(2025, 4, 6, 12, 1, 0), 2),
+                                                            "bitcoin", "usd")
+
+
+@pytest.mark.asyncio
+async def test_get_prices_page_invalid_cursor(mock_bitcoin_service):
+    response = client.get("/bitcoin/prices?after=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.asyncio
+async def test_get_history(mock_bitcoin_service):
+    mock_bitcoin_service.get_history_async.return_value = ("1h", [
+        Candle("bitcoin", "usd", "1h", datetime(2025, 4, 6, 12, 0), 100.0, 120.0, 90.0, 110.0, 60)
+    ])
+
+    response = client.get("/bitcoin/history?from=2025-04-01T00:00:00&to=2025-04-11T00:00:00&limit=240")
+
+    assert response.status_code == 200
+    assert response.json() == {"interval": "1h", "candles": [
+        {"open_time": "2025-04-06 12:00:00", "open": 100.0, "high": 120.0, "low": 90.0, "close": 110.0,
+         "tick_count": 60}]}
+    mock_bitcoin_service.get_history_async.assert_called_once_with(datetime(2025, 4, 1), datetime(2025, 4, 11), 3600, 240,
+                                                             "bitcoin", "usd")
+
+
+@pytest.mark.asyncio
+async def test_get_history_defaults_to_now(mock_bitcoin_service):
+    mock_bitcoin_service.get_history_async.return_value = ("1d", [])
+
+    response = client.get("/bitcoin/history?from=2025-04-01T00:00:00")
+
+    assert response.status_code == 200
+    assert response.json() == {"interval": "1d", "candles": []}
+
+
+def test_get_stats():
+    mock_stats_service = MagicMock()
+    mock_stats_service.get_stats.return_value = PriceStats(
+        price=110.0, timestamp_ms=1743940800000,
+        windows=[WindowStats(window_seconds=3600, tick_count=60, sma=105.0, ema=107.0, volatility=0.01,
+                             max_drawdown=-0.05)],
+        changes={"1h": 10.0, "24h": None, "7d": None, "30d": None})
+    app.dependency_overrides[get_price_stats_service] = lambda: mock_stats_service
+
+    response = client.get("/bitcoin/stats?windows=1h")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "price": 110.0,
+        "timestamp": "2025-04-06 12:00:00",
+        "windows": [{"window": "1h", "tick_count": 60, "sma": 105.0, "ema": 107.0, "volatility": 0.01,
+                     "max_drawdown": -0.05}],
+        "changes": {"1h": 10.0, "24h": None, "7d": None, "30d": None}
+    }
+    mock_stats_service.get_stats.assert_called_once_with([3600], "bitcoin", "usd")
+
+
+def test_get_stats_not_found():
+    mock_stats_service = MagicMock()
+    mock_stats_service.get_stats.return_value = None
+    app.dependency_overrides[get_price_stats_service] = lambda: mock_stats_service
+
+    response = client.get("/bitcoin/stats?asset=dogecoin")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No prices found"}
+
+
+def test_get_stats_invalid_window():
+    response = client.get("/bitcoin/stats?windows=1h,3w")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid duration 3w"}
+
+
+@pytest.mark.asyncio
+async def test_get_high_low(mock_bitcoin_service):
+    mock_bitcoin_service.get_price_extremes_async.return_value = (52000.0, 48000.0)
+    mock_bitcoin_service.price_extremes = PriceExtremes()
+
+    response = client.get("/bitcoin/prices/high-low")
+
+    assert response.status_code == 200
+    assert response.json() == {"high": 52000.0, "low": 48000.0, "window_days": 90}
+
+
+@pytest.mark.asyncio
+async def test_get_high_low_not_found(mock_bitcoin_service):
+    mock_bitcoin_service.get_price_extremes_async.return_value = (None, None)
+
+    response = client.get("/bitcoin/prices/high-low")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No prices found"}
+
+
+@pytest.fixture
+def export_db(tmp_path):
+    # A file database, the export is read from a worker thread with its own connection
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'export.db'}")
+    db_manager.create_tables()
+    app.dependency_overrides[get_price_export_service] = lambda: PriceExportService(db_manager.get_session)
+    yield db_manager
+    app.dependency_overrides.clear()
+    db_manager.engine.dispose()
+
+
+def test_export_prices_as_gzipped_csv(export_db):
+    BitcoinRepository(export_db.get_session()).insert_prices(
+        [{"price": 100.0, "timestamp": datetime(2024, 1, 1, 0, 0), "asset": "bitcoin", "vs_currency": "usd"},
+         {"price": 101.0, "timestamp": datetime(2024, 1, 2, 0, 0), "asset": "bitcoin", "vs_currency": "usd"}])
+
+    response = client.get("/bitcoin/export?from=2024-01-01T00:00:00&to=2024-01-02T00:00:00&gzip=true")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="bitcoin_usd_prices.csv.gz"'
+    assert gzip.decompress(response.content).decode().splitlines() == [
+        "asset,vs_currency,timestamp,price", "bitcoin,usd,2024-01-01T00:00:00.000000Z,100.0"]
+
+
+def test_export_prices_rejects_an_empty_range(export_db):
+    response = client.get("/bitcoin/export?from=2024-01-02T00:00:00&to=2024-01-01T00:00:00&format=ndjson")
+
+    assert response.status_code == 400
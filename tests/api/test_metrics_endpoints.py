@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_get_metrics():
+    client.get("/system/pool")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert 'http_request_duration_seconds_count{method="GET",route="/system/pool",status="200"}' in response.text
+    assert "# TYPE db_query_duration_seconds histogram" in response.text
+    assert 'db_pool_checkouts_total{pool="sync"}' in response.text
+    assert "email_outbox_pending 0" in response.text
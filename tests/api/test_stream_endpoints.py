@@ -0,0 +1,61 @@
+import json
+import time
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.api.stream_endpoints import _sse_events
+from app.dependencies import get_price_broadcaster
+from app.main import app
+from app.service.price_broadcaster import PriceBroadcaster
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def broadcaster():
+    price_broadcaster = PriceBroadcaster()
+    app.dependency_overrides[get_price_broadcaster] = lambda: price_broadcaster
+    yield price_broadcaster
+    app.dependency_overrides.clear()
+
+
+def _wait_for_subscribers(broadcaster: PriceBroadcaster, count: int):
+    deadline = time.monotonic() + 5
+    while broadcaster.subscriber_count < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_websocket_stream_pushes_ticks(broadcaster):
+    with client.websocket_connect("/bitcoin/stream?vs_currency=usd") as websocket:
+        _wait_for_subscribers(broadcaster, 1)
+        broadcaster.publish(3.0, datetime(2025, 1, 1, 12, 0), "ethereum", "eur")
+        broadcaster.publish(100.0, datetime(2025, 1, 1, 12, 0), summary=(date(2025, 1, 1), 110.0, 90.0))
+
+        tick = websocket.receive_json()
+
+    assert tick["price"] == 100.0
+    assert tick["summary"] == {"date": "2025-01-01", "max_price": 110.0, "min_price": 90.0}
+    _wait_for_subscribers(broadcaster, 0)
+    assert broadcaster.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_sse_events_push_ticks_until_the_stream_is_closed():
+    broadcaster = PriceBroadcaster()
+    request = MagicMock(spec=Request)
+    request.is_disconnected = AsyncMock(return_value=False)
+    events = _sse_events(request, broadcaster, None, None)
+
+    assert await anext(events) == b"retry: 3000\n\n"
+    broadcaster.publish(100.0, datetime(2025, 1, 1, 12, 0))
+    event = await anext(events)
+    broadcaster.close()
+
+    assert event.startswith(b"event: tick\ndata: ")
+    assert json.loads(event.decode().split("data: ")[1])["price"] == 100.0
+    assert [event async for event in events] == []
+    assert broadcaster.subscriber_count == 0
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.api import system_endpoints
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import DatabaseManager
+from app.main import app
+from app.metrics.instruments import registry
+
+client = TestClient(app)
+
+
+def test_get_pool_stats():
+    response = client.get("/system/pool")
+
+    assert response.status_code == 200
+    pool_stats = response.json()
+    assert pool_stats["sync"]["checkouts"] >= 0
+    assert "avg_hold_ms" in pool_stats["sync"]
+
+
+def test_get_pool_stats_includes_the_replica_pools(tmp_path, monkeypatch):
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'primary.db'}",
+                                 read_database_urls=f"sqlite:///{tmp_path / 'primary.db'}")
+    db_manager.create_tables()
+    db_manager.check_replicas()
+    BitcoinRepository(db_manager.get_read_session()).get_latest_price()
+    monkeypatch.setattr(system_endpoints, "db_manager", db_manager)
+    monkeypatch.setattr(dependencies, "db_manager", db_manager)
+
+    response = client.get("/system/pool")
+
+    assert response.status_code == 200
+    assert response.json()["replicas"]["replica0"]["checkouts"] >= 1
+    assert 'db_pool_checkouts_total{pool="replica0"}' in registry.render()
+    db_manager.engine.dispose()
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import Base, DatabaseManager
+from benchmarks.dataset import build_dataset, random_walk
+from benchmarks.timing import compare, measure
+
+
+@pytest.fixture(scope="function")
+def db_manager():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    yield db_manager
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def test_random_walk_is_reproducible():
+    start = datetime(2024, 1, 1)
+    ticks = list(random_walk(start, 1, 60, [("bitcoin", "usd"), ("ethereum", "eur")], seed=7))
+
+    assert ticks == list(random_walk(start, 1, 60, [("bitcoin", "usd"), ("ethereum", "eur")], seed=7))
+    assert ticks != list(random_walk(start, 1, 60, [("bitcoin", "usd"), ("ethereum", "eur")], seed=8))
+    assert len(ticks) == 2 * 1440
+    assert ticks[0][:3] == ("bitcoin", "usd", start)
+    assert ticks[1440][:3] == ("ethereum", "eur", start)
+    assert ticks[1439][2] == start + timedelta(minutes=1439)
+    assert all(price > 0 for _, _, _, price in ticks)
+
+
+def test_build_dataset_with_summaries_and_candles(db_manager):
+    dataset = build_dataset(db_manager, 2, 300)
+
+    assert dataset["price_count"] == 576
+    # 1m and 5m candles for every tick, an hourly one for every hour and 2 or 3 daily ones
+    assert 576 * 2 + 48 + 2 <= dataset["candle_count"] <= 576 * 2 + 49 + 3
+    repository = BitcoinRepository(db_manager.get_session())
+    summaries = repository.get_all_summaries()
+    assert len(summaries) in (2, 3)
+    assert all(summary.min_price <= summary.max_price for summary in summaries)
+    end = datetime.fromisoformat(dataset["end"])
+    assert len(repository.get_candles("1h", end - timedelta(days=3), end, 100)) in (48, 49)
+
+
+def test_measure():
+    calls = []
+
+    stats = measure(lambda: calls.append(None), repeat=5, warmup=2)
+
+    assert len(calls) == 7
+    assert stats["runs"] == 5
+    assert 0 <= stats["min_ms"] <= stats["median_ms"] <= stats["p95_ms"] <= stats["max_ms"]
+
+
+def test_compare_flags_the_medians_slower_than_the_threshold():
+    results = {"fast": {"median_ms": 1.1}, "slow": {"median_ms": 1.5}, "new": {"median_ms": 1.0}}
+    baseline = {"fast": {"median_ms": 1.0}, "slow": {"median_ms": 1.0}, "removed": {"median_ms": 1.0}}
+
+    comparison = compare(results, baseline, threshold=0.2)
+
+    assert comparison == {"fast": {"baseline_median_ms": 1.0, "median_ms": 1.1, "ratio": 1.1, "regression": False},
+                          "slow": {"baseline_median_ms": 1.0, "median_ms": 1.5, "ratio": 1.5, "regression": True}}
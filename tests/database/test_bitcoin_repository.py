@@ -4,11 +4,13 @@ from typing import Optional
 
 import pytest
 import pytz
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
-from app.database.bitcoin_repository import BitcoinRepository
+from app.database.bitcoin_repository import BitcoinRepository, _upsert_summaries
 from app.database.database_manager import DatabaseManager, Base
 from app.database.model.bitcoin_price import BitcoinPrice
+from app.service.candle_aggregator import Candle
 
 
 @pytest.fixture(scope="function")
@@ -150,3 +152,162 @@ def test_get_max_historic_price(db_session: Session):
 
     assert max_historic_price is not None
     assert max_historic_price == 1500
+
+
+def test_prices_and_summaries_are_kept_per_asset_and_currency(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    day = date(2025, 1, 1)
+
+    repository.insert_prices([{"price": 100, "timestamp": datetime(2025, 1, 1, 12, 0), "asset": "bitcoin",
+                               "vs_currency": "usd"},
+                              {"price": 90, "timestamp": datetime(2025, 1, 1, 12, 0), "asset": "bitcoin",
+                               "vs_currency": "eur"},
+                              {"price": 3, "timestamp": datetime(2025, 1, 1, 12, 0), "asset": "ethereum",
+                               "vs_currency": "usd"}])
+    repository.update_summary(100, day)
+    repository.update_summary(90, day, "bitcoin", "eur")
+    repository.update_summary(3, day, "ethereum", "usd")
+
+    assert repository.get_latest_price().price == 100
+    assert repository.get_latest_price("bitcoin", "eur").price == 90
+    assert repository.get_latest_price("ethereum", "usd").price == 3
+    assert repository.get_latest_price("ethereum", "eur") is None
+    assert repository.get_summary_by_day(day, "bitcoin", "eur").max_price == 90
+    assert repository.get_summary_by_day(day, "ethereum", "usd").max_price == 3
+    assert len(repository.get_all_summaries()) == 1
+
+
+def test_save_and_get_candles(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    open_time = datetime(2025, 1, 1, 12, 0)
+
+    repository.save_candles([Candle("bitcoin", "usd", "1m", open_time, 100, 120, 90, 110, 4),
+                             Candle("bitcoin", "usd", "1m", open_time + timedelta(minutes=1), 110, 115, 105, 112, 2),
+                             Candle("bitcoin", "usd", "5m", open_time, 100, 120, 90, 112, 6)])
+    repository.save_candles([Candle("bitcoin", "usd", "1m", open_time + timedelta(minutes=1), 111, 130, 108, 125, 3)])
+
+    candles = repository.get_candles("1m", open_time, open_time + timedelta(hours=1), 100)
+
+    assert [candle.open_time for candle in candles] == [open_time, open_time + timedelta(minutes=1)]
+    assert candles[1].open_price == 110
+    assert candles[1].high_price == 130
+    assert candles[1].low_price == 105
+    assert candles[1].close_price == 125
+    assert candles[1].tick_count == 5
+
+
+def test_get_prices_page_uses_keyset_pagination(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    start = datetime(2025, 1, 1, 12, 0)
+
+    repository.insert_prices([{"price": 100 + minute, "timestamp": start + timedelta(minutes=minute)}
+                              for minute in range(5)])
+    # Same timestamp as the third price, the id breaks the tie
+    repository.insert_price(999, start + timedelta(minutes=2))
+
+    first_page = repository.get_prices_page(start, None, 3)
+    last_price = first_page[-1]
+    second_page = repository.get_prices_page(start, None, 3, (last_price.timestamp, last_price.id))
+
+    assert [price.price for price in first_page] == [100, 101, 102]
+    assert [price.price for price in second_page] == [999, 103, 104]
+    assert repository.get_prices_page(start + timedelta(minutes=3), start + timedelta(minutes=3), 10)[0].price == 103
+
+
+def test_delete_prices_older_than_in_batches(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    cutoff = datetime(2025, 1, 1)
+
+    repository.insert_prices([{"price": 100, "timestamp": cutoff - timedelta(minutes=minute)}
+                              for minute in range(1, 8)])
+    repository.insert_price(200, cutoff)
+
+    deleted_count = repository.delete_prices_older_than(cutoff, batch_size=3)
+
+    prices = repository.get_all_prices()
+
+    assert deleted_count == 7
+    assert [price.price for price in prices] == [200]
+
+
+def test_get_summaries_page(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    for offset in range(4):
+        repository.update_summary(100 + offset, date(2025, 4, 6) + timedelta(days=offset))
+    repository.update_summary(5, date(2025, 4, 7), "ethereum")
+
+    first_page = repository.get_summaries_page(date(2025, 4, 7), date(2025, 4, 9), 2)
+    second_page = repository.get_summaries_page(date(2025, 4, 7), date(2025, 4, 9), 2, after=first_page[-1].day)
+
+    assert [summary.day for summary in first_page] == [date(2025, 4, 7), date(2025, 4, 8)]
+    assert [summary.day for summary in second_page] == [date(2025, 4, 9)]
+
+
+def test_rebuild_summaries(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    repository.insert_prices([
+        {"price": 100.0, "timestamp": datetime(2024, 1, 1, 0, 0), "asset": "bitcoin", "vs_currency": "usd"},
+        {"price": 120.0, "timestamp": datetime(2024, 1, 1, 23, 59), "asset": "bitcoin", "vs_currency": "usd"},
+        {"price": 90.0, "timestamp": datetime(2024, 1, 2, 12, 0), "asset": "bitcoin", "vs_currency": "usd"},
+        {"price": 80.0, "timestamp": datetime(2024, 1, 3, 12, 0), "asset": "bitcoin", "vs_currency": "usd"},
+        {"price": 5.0, "timestamp": datetime(2024, 1, 1, 12, 0), "asset": "ethereum", "vs_currency": "usd"},
+    ])
+    repository.update_summary(1_000.0, date(2024, 1, 1))
+    repository.update_summary(80.0, date(2024, 1, 3))
+
+    assert repository.rebuild_summaries(date(2024, 1, 1), date(2024, 1, 2)) == 2
+
+    summaries = repository.get_summaries_page(None, None, 10)
+    assert [(summary.day, summary.max_price, summary.min_price) for summary in summaries] == [
+        (date(2024, 1, 1), 120.0, 100.0), (date(2024, 1, 2), 90.0, 90.0), (date(2024, 1, 3), 80.0, 80.0)]
+    assert repository.get_summary_by_day(date(2024, 1, 1), "ethereum", "usd") is None
+
+
+def test_get_prices_after_id_follows_the_stored_prices(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    start = datetime(2025, 1, 1, 12, 0)
+    assert repository.get_last_price_id() is None
+    repository.insert_prices([{"price": 100 + minute, "timestamp": start + timedelta(minutes=minute)}
+                              for minute in range(5)])
+    last_id = repository.get_last_price_id()
+
+    prices = repository.get_prices_after_id(last_id - 3, start, 2)
+
+    assert [price.id for price in prices] == [last_id - 2, last_id - 1]
+    assert [price.price for price in repository.get_prices_after_id(last_id - 3, start + timedelta(minutes=4), 10)] \
+           == [104]
+    assert repository.get_prices_after_id(last_id, start, 10) == []
+
+
+def test_update_summaries_upserts_many_days_and_pairs_at_once(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    day = date(2025, 4, 6)
+    repository.update_summary(100, day)
+
+    written_count = repository.update_summaries([
+        {"price": 120, "day": day},
+        {"price": 90, "day": day},
+        {"price": 110, "day": day},
+        {"price": 5, "day": day, "asset": "ethereum", "vs_currency": "eur"},
+        {"price": 80, "day": day + timedelta(days=1)},
+    ])
+
+    assert written_count == 3
+    summary = repository.get_summary_by_day(day)
+    assert (summary.min_price, summary.max_price) == (90, 120)
+    ethereum_summary = repository.get_summary_by_day(day, "ethereum", "eur")
+    assert (ethereum_summary.min_price, ethereum_summary.max_price) == (5, 5)
+    next_summary = repository.get_summary_by_day(day + timedelta(days=1))
+    assert (next_summary.min_price, next_summary.max_price) == (80, 80)
+    assert repository.update_summaries([]) == 0
+
+
+def test_summary_upsert_keeps_the_greatest_and_least_prices_on_postgres():
+    statement = _upsert_summaries("postgresql", [{"asset": "bitcoin", "vs_currency": "usd", "day": date(2025, 4, 6),
+                                                  "min_price": 90.0, "max_price": 120.0}])
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (asset, vs_currency, day) DO UPDATE" in sql
+    assert "max_price = greatest(bitcoin_summary.max_price, excluded.max_price)" in sql
+    assert "least(coalesce(bitcoin_summary.min_price, excluded.min_price), excluded.min_price)" in sql
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import inspect
+
+from app.cli import create_schema
+from app.database.database_manager import DatabaseManager
+
+
+def test_nothing_is_created_before_first_use(tmp_path):
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'bitcoin.db'}")
+
+    assert not db_manager.is_connected()
+    assert not (tmp_path / "bitcoin.db").exists()
+    # The scoped session can be handed out before the engine exists
+    db_manager.get_scoped_session()
+    assert not db_manager.is_connected()
+
+    db_manager.get_session().close()
+
+    assert db_manager.is_connected()
+    assert inspect(db_manager.engine).get_table_names() == []
+    db_manager.engine.dispose()
+
+
+def test_missing_database_url_fails_on_first_use(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    db_manager = DatabaseManager()
+
+    with pytest.raises(ValueError, match="DATABASE_URL"):
+        db_manager.get_session()
+
+
+def test_create_schema_command_creates_the_tables(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'bitcoin.db'}"
+    monkeypatch.setenv("DATABASE_URL", database_url)
+
+    create_schema.main([])
+
+    db_manager = DatabaseManager(database_url=database_url)
+    assert {"bitcoin_prices", "bitcoin_summary", "bitcoin_candles", "price_alerts", "email_outbox", "job_leases"} \
+           <= set(inspect(db_manager.engine).get_table_names())
+    db_manager.engine.dispose()
+
+
+def test_importing_the_app_neither_connects_nor_starts_threads(tmp_path):
+    # In a fresh interpreter, the other tests already imported the app in this one
+    code = ("import threading\n"
+            "import app.main\n"
+            "assert not app.main.db_manager.is_connected()\n"
+            "assert threading.active_count() == 1\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            env={**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'bitcoin.db'}"})
+
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / "bitcoin.db").exists()
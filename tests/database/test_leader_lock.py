@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.database.database_manager import Base, DatabaseManager
+from app.database.leader_lock import AdvisoryLeaderLock, LeaseLeaderLock
+
+
+@pytest.fixture(scope="function")
+def db_manager(tmp_path):
+    # A file database, so the locks of the test see each other like the processes would
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'bitcoin.db'}")
+    db_manager.create_tables()
+    yield db_manager
+
+    Base.metadata.drop_all(bind=db_manager.engine)
+    db_manager.engine.dispose()
+
+
+def test_only_one_process_holds_the_lease(db_manager):
+    leader = db_manager.get_leader_lock("ingestion")
+    follower = db_manager.get_leader_lock("ingestion")
+
+    assert isinstance(leader, LeaseLeaderLock)
+    assert leader.acquire() is True
+    assert follower.acquire() is False
+    # Renewing keeps the lease
+    assert leader.acquire() is True
+    assert follower.acquire() is False
+    # Other jobs have their own lease
+    assert db_manager.get_leader_lock("reports").acquire() is True
+
+
+def test_released_lease_is_taken_over_at_once(db_manager):
+    leader = db_manager.get_leader_lock("ingestion")
+    follower = db_manager.get_leader_lock("ingestion")
+    leader.acquire()
+
+    leader.release()
+
+    assert follower.acquire() is True
+    assert leader.acquire() is False
+
+
+def test_expired_lease_is_taken_over(db_manager):
+    leader = LeaseLeaderLock(db_manager.engine, "ingestion", lease_seconds=-1)
+    follower = LeaseLeaderLock(db_manager.engine, "ingestion")
+    leader.acquire()
+
+    # The leader stopped renewing, e.g. it crashed
+    assert follower.acquire() is True
+    assert leader.acquire() is False
+
+
+def test_advisory_lock_is_postgres_only():
+    with pytest.raises(ValueError):
+        AdvisoryLeaderLock(create_engine("sqlite:///:memory:"), "ingestion")
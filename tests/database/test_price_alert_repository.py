@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database.database_manager import Base, DatabaseManager
+from app.database.price_alert_repository import PriceAlertRepository
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    db_manager.create_tables()
+
+    session = db_manager.get_session()
+    yield session
+
+    session.close()
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def test_create_and_get_alert(db_session: Session):
+    repository = PriceAlertRepository(db_session)
+
+    alert = repository.create_alert(email="john@example.com", kind="above", threshold=100_000.0)
+    stored_alert = repository.get_alert(alert.id)
+
+    assert stored_alert.email == "john@example.com"
+    assert stored_alert.asset == "bitcoin"
+    assert stored_alert.vs_currency == "usd"
+    assert stored_alert.cooldown_seconds == 3600
+    assert stored_alert.active is True
+    assert repository.get_alert(alert.id + 1) is None
+
+
+def test_get_alerts_by_email(db_session: Session):
+    repository = PriceAlertRepository(db_session)
+    repository.create_alert(email="john@example.com", kind="above", threshold=100_000.0)
+    repository.create_alert(email="jane@example.com", kind="below", threshold=50_000.0)
+    repository.create_alert(email="john@example.com", kind="dip_from_high", threshold=10.0)
+
+    assert [alert.kind for alert in repository.get_alerts("john@example.com")] == ["above", "dip_from_high"]
+    assert len(repository.get_alerts()) == 3
+
+
+def test_get_active_alerts(db_session: Session):
+    repository = PriceAlertRepository(db_session)
+    repository.create_alert(email="john@example.com", kind="above", threshold=100_000.0)
+    repository.create_alert(email="jane@example.com", kind="below", threshold=50_000.0, active=False)
+
+    assert [alert.email for alert in repository.get_active_alerts()] == ["john@example.com"]
+
+
+def test_delete_alert(db_session: Session):
+    repository = PriceAlertRepository(db_session)
+    alert = repository.create_alert(email="john@example.com", kind="above", threshold=100_000.0)
+
+    assert repository.delete_alert(alert.id, "jane@example.com") is False
+    assert repository.delete_alert(alert.id) is True
+    assert repository.delete_alert(alert.id) is False
+    assert repository.get_alerts() == []
+
+
+def test_mark_triggered(db_session: Session):
+    repository = PriceAlertRepository(db_session)
+    first_alert = repository.create_alert(email="john@example.com", kind="above", threshold=100_000.0)
+    second_alert = repository.create_alert(email="jane@example.com", kind="below", threshold=50_000.0)
+    triggered_at = datetime(2025, 1, 1, 12, 0)
+
+    repository.mark_triggered([first_alert.id], triggered_at)
+
+    assert repository.get_alert(first_alert.id).last_triggered_at == triggered_at
+    assert repository.get_alert(second_alert.id).last_triggered_at is None
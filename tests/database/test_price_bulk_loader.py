@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import Base, DatabaseManager
+from app.database.price_bulk_loader import PriceBulkLoader
+
+
+@pytest.fixture(scope="function")
+def db_manager():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    db_manager.create_tables()
+    yield db_manager
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def test_load_in_batches_and_track_the_days_of_each_pair(db_manager):
+    start = datetime(2024, 1, 1, 23, 0)
+    rows = [("bitcoin", "usd", start + timedelta(minutes=30 * index), 100.0 + index) for index in range(5)]
+    rows.append(("ethereum", "eur", datetime(2024, 3, 1), 3.0))
+    bulk_loader = PriceBulkLoader(db_manager.get_engine(), batch_size=2)
+
+    result = bulk_loader.load(iter(rows))
+
+    assert not bulk_loader.use_copy
+    assert result.loaded_count == 6
+    assert result.day_ranges == {("bitcoin", "usd"): (date(2024, 1, 1), date(2024, 1, 2)),
+                                 ("ethereum", "eur"): (date(2024, 3, 1), date(2024, 3, 1))}
+    repository = BitcoinRepository(db_manager.get_session())
+    assert repository.get_latest_price().price == 104.0
+    assert repository.get_latest_price("ethereum", "eur").price == 3.0
+
+
+def test_load_nothing(db_manager):
+    result = PriceBulkLoader(db_manager.get_engine()).load([])
+
+    assert result.loaded_count == 0
+    assert result.day_ranges == {}
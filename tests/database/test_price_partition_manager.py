@@ -0,0 +1,58 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.database.price_partition_manager import PricePartitionManager, partition_day, partition_name
+
+
+def _create_partition_manager() -> PricePartitionManager:
+    engine = MagicMock()
+    engine.dialect.name = "postgresql"
+
+    return PricePartitionManager(engine)
+
+
+def test_partition_name_and_day():
+    assert partition_name(date(2025, 4, 6)) == "bitcoin_prices_p20250406"
+    assert partition_day("bitcoin_prices_p20250406") == date(2025, 4, 6)
+    assert partition_day("bitcoin_prices_default") is None
+    assert partition_day("bitcoin_summary") is None
+
+
+def test_partitioning_requires_postgres():
+    engine = MagicMock()
+    engine.dialect.name = "sqlite"
+
+    with pytest.raises(ValueError):
+        PricePartitionManager(engine)
+
+
+def test_ensure_partitions_creates_one_partition_per_day():
+    partition_manager = _create_partition_manager()
+    connection = partition_manager.engine.begin.return_value.__enter__.return_value
+
+    partition_manager.ensure_partitions(date(2025, 4, 6), date(2025, 4, 8))
+
+    statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+    assert statements == [
+        "CREATE TABLE IF NOT EXISTS bitcoin_prices_p20250406 PARTITION OF bitcoin_prices "
+        "FOR VALUES FROM ('2025-04-06') TO ('2025-04-07')",
+        "CREATE TABLE IF NOT EXISTS bitcoin_prices_p20250407 PARTITION OF bitcoin_prices "
+        "FOR VALUES FROM ('2025-04-07') TO ('2025-04-08')",
+        "CREATE TABLE IF NOT EXISTS bitcoin_prices_p20250408 PARTITION OF bitcoin_prices "
+        "FOR VALUES FROM ('2025-04-08') TO ('2025-04-09')",
+    ]
+
+
+def test_drop_partitions_older_than_only_drops_whole_expired_days():
+    partition_manager = _create_partition_manager()
+    partition_manager.list_partitions = MagicMock(return_value={
+        "bitcoin_prices_p20250106": date(2025, 1, 6),
+        "bitcoin_prices_p20250105": date(2025, 1, 5),
+        "bitcoin_prices_p20250107": date(2025, 1, 7),
+    })
+
+    dropped_partitions = partition_manager.drop_partitions_older_than(datetime(2025, 1, 7, 10, 0))
+
+    assert dropped_partitions == ["bitcoin_prices_p20250105", "bitcoin_prices_p20250106"]
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import pytz
+from sqlalchemy.orm import Session
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import DatabaseManager, Base
+from app.database.price_write_buffer import PriceWriteBuffer
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    db_manager.create_tables()
+
+    session = db_manager.get_session()
+    yield session
+
+    session.close()
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def test_insert_prices(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    now = datetime.now(pytz.UTC)
+
+    repository.insert_prices([{"price": 100, "timestamp": now - timedelta(minutes=1)},
+                              {"price": 200, "timestamp": now}])
+
+    prices = repository.get_all_prices()
+
+    assert len(prices) == 2
+    assert repository.get_latest_price().price == 200
+
+
+def test_flush_when_batch_size_is_reached(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=3, max_age_seconds=60)
+
+    price_write_buffer.add(100)
+    price_write_buffer.add(101)
+
+    assert price_write_buffer.pending_count() == 2
+    assert len(repository.get_all_prices()) == 0
+
+    price_write_buffer.add(102)
+
+    assert price_write_buffer.pending_count() == 0
+    assert len(repository.get_all_prices()) == 3
+
+
+def test_flush_when_max_age_is_reached(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=100, max_age_seconds=0)
+
+    price_write_buffer.add(100)
+
+    assert price_write_buffer.pending_count() == 0
+    assert len(repository.get_all_prices()) == 1
+
+
+def test_stop_job_flushes_pending_prices(db_session: Session):
+    repository = BitcoinRepository(db_session)
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=100, max_age_seconds=60)
+    price_write_buffer.start_job()
+
+    price_write_buffer.add(100)
+    price_write_buffer.add(101)
+    price_write_buffer.stop_job()
+
+    assert price_write_buffer.pending_count() == 0
+    assert len(repository.get_all_prices()) == 2
+
+
+def test_drop_oldest_when_buffer_is_full():
+    repository = MagicMock(spec=BitcoinRepository)
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=2, max_age_seconds=60, max_buffer_size=2,
+                                          overflow_policy="drop_oldest")
+    repository.insert_prices.side_effect = Exception("Database down")
+
+    price_write_buffer.add(100)
+    price_write_buffer.add(101)
+    price_write_buffer.add(102)
+
+    assert price_write_buffer.pending_count() == 2
+    assert price_write_buffer.dropped_count == 1
+
+    repository.insert_prices.side_effect = None
+    price_write_buffer.flush()
+
+    flushed_prices = [row["price"] for row in repository.insert_prices.call_args.args[0]]
+    assert flushed_prices == [101, 102]
+
+
+def test_block_policy_raises_when_buffer_cannot_be_flushed():
+    repository = MagicMock(spec=BitcoinRepository)
+    repository.insert_prices.side_effect = Exception("Database down")
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=2, max_age_seconds=60, max_buffer_size=2,
+                                          flush_retries=2, retry_backoff_seconds=0)
+
+    price_write_buffer.add(100)
+    price_write_buffer.add(101)
+
+    with pytest.raises(BufferError):
+        price_write_buffer.add(102)
+
+    assert price_write_buffer.pending_count() == 2
+    # The flush of the second add, then the first attempt and the two retries of the third one
+    assert repository.insert_prices.call_count == 4
+
+
+def test_block_policy_keeps_the_price_when_a_retried_flush_succeeds():
+    repository = MagicMock(spec=BitcoinRepository)
+    repository.insert_prices.side_effect = [Exception("Database down"), Exception("Database down"), [1, 2]]
+    price_write_buffer = PriceWriteBuffer(repository, max_batch_size=2, max_age_seconds=60, max_buffer_size=2,
+                                          retry_backoff_seconds=0)
+
+    price_write_buffer.add(100)
+    price_write_buffer.add(101)
+    price_write_buffer.add(102)
+
+    flushed_prices = [row["price"] for row in repository.insert_prices.call_args.args[0]]
+    assert flushed_prices == [100, 101]
+    assert price_write_buffer.pending_count() == 1
@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, text
+
+from app.database.query_metrics import QueryMetrics
+from app.metrics.registry import Counter, Histogram
+
+
+def _create_query_metrics(slow_query_seconds: float) -> tuple:
+    engine = create_engine("sqlite:///:memory:")
+    histogram = Histogram("db_query_duration_seconds", "Duration", ("operation", "table"))
+    slow_query_counter = Counter("db_slow_queries_total", "Slow queries", ("operation", "table"))
+    QueryMetrics(engine, slow_query_seconds, histogram, slow_query_counter)
+    return engine, histogram, slow_query_counter
+
+
+def test_statements_are_timed_by_operation_and_table():
+    engine, histogram, slow_query_counter = _create_query_metrics(slow_query_seconds=10)
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE prices (price FLOAT)"))
+        connection.execute(text("INSERT INTO prices (price) VALUES (:price)"), [{"price": 1.0}, {"price": 2.0}])
+        connection.execute(text("SELECT max(price) FROM prices")).scalar()
+        connection.execute(text("SELECT max(price) FROM prices")).scalar()
+
+    assert histogram.count("CREATE", "prices") == 1
+    assert histogram.count("INSERT", "prices") == 1
+    assert histogram.count("SELECT", "prices") == 2
+    assert slow_query_counter.value("SELECT", "prices") == 0
+
+
+def test_slow_queries_are_counted_and_logged(capsys):
+    engine, histogram, slow_query_counter = _create_query_metrics(slow_query_seconds=0)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1 FROM (SELECT 2) AS numbers WHERE 1 = :one"), {"one": 1})
+
+    assert slow_query_counter.value("SELECT", "") == 1
+    assert "Slow query" in capsys.readouterr().out
+
+
+def test_slow_query_log_is_rate_limited_per_operation_and_table(capsys):
+    engine, histogram, slow_query_counter = _create_query_metrics(slow_query_seconds=0)
+
+    with engine.connect() as connection:
+        for _ in range(3):
+            connection.execute(text("SELECT 1"))
+
+    assert slow_query_counter.value("SELECT", "") == 3
+    assert capsys.readouterr().out.count("Slow query") == 1
@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import DatabaseManager
+from app.database.async_bitcoin_repository import AsyncBitcoinRepository
+from app.database.replica_router import ReplicaRouter
+
+
+@pytest.fixture(scope="function")
+def db_manager(tmp_path):
+    # Two separate databases stand in for the primary and its replica, so the test sees where each query went
+    replica_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'replica.db'}")
+    replica_manager.create_tables()
+    BitcoinRepository(replica_manager.get_session()).insert_price(50.0)
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'primary.db'}",
+                                 read_database_urls=f"sqlite:///{tmp_path / 'replica.db'}")
+    db_manager.create_tables()
+    BitcoinRepository(db_manager.get_session()).insert_price(100.0)
+    db_manager.check_replicas()
+    yield db_manager
+
+    db_manager.engine.dispose()
+    replica_manager.engine.dispose()
+
+
+def test_read_session_reads_from_the_replica_and_writes_to_the_primary(db_manager):
+    repository = BitcoinRepository(db_manager.get_read_session())
+
+    assert repository.get_latest_price().price == 50.0
+    repository.update_summary(120.0, date(2025, 4, 6))
+
+    # Once it wrote, the session reads its own writes from the primary
+    assert repository.get_summary_by_day(date(2025, 4, 6)).max_price == 120.0
+    assert repository.get_latest_price().price == 100.0
+    assert BitcoinRepository(db_manager.get_session()).get_summary_by_day(date(2025, 4, 6)).max_price == 120.0
+
+
+def test_jobs_sessions_stay_on_the_primary(db_manager):
+    assert BitcoinRepository(db_manager.get_session()).get_latest_price().price == 100.0
+    assert BitcoinRepository(db_manager.get_scoped_session()).get_latest_price().price == 100.0
+
+
+@pytest.mark.asyncio
+async def test_async_read_session_reads_from_the_replica(db_manager):
+    async with db_manager.get_async_read_session() as session:
+        assert (await AsyncBitcoinRepository(session).get_latest_price()).price == 50.0
+    assert db_manager.get_pool_stats()["async_replica0"]["checkouts"] >= 1
+    await db_manager.dispose_async_engine()
+
+
+def test_reads_fall_back_to_the_primary_without_a_healthy_replica(tmp_path):
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'primary.db'}",
+                                 read_database_urls=f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    db_manager.create_tables()
+    BitcoinRepository(db_manager.get_session()).insert_price(100.0)
+
+    db_manager.check_replicas()
+
+    assert db_manager.replica_router.health() == [False]
+    assert BitcoinRepository(db_manager.get_read_session()).get_latest_price().price == 100.0
+    assert db_manager.replica_router.fallback_count == 1
+    db_manager.engine.dispose()
+
+
+def test_router_round_robins_over_the_healthy_replicas():
+    engines = [create_engine("sqlite://") for _ in range(3)]
+    router = ReplicaRouter(engines, check_interval_seconds=3600)
+    # Replica 1 lags too far behind
+    router.check = lambda index: index != 1
+
+    router.check_all()
+
+    assert [router.choose() for _ in range(4)] == [0, 2, 0, 2]
+    assert router.health() == [True, False, True]
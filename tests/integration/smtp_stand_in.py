@@ -0,0 +1,82 @@
+import socketserver
+import threading
+import time
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        stand_in = self.server
+        stand_in.connection_count += 1
+        self._reply("220 localhost stand-in SMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO", "RSET", "NOOP"):
+                recipients = []
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                time.sleep(stand_in.delay_seconds)
+                if stand_in.failures_left > 0:
+                    stand_in.failures_left -= 1
+                    self._reply("451 Try again later")
+                else:
+                    self._reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in stand_in.refused_recipients:
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data_lines = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    data_lines.append(data_line.decode())
+                stand_in.messages.append((recipients, "".join(data_lines)))
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _reply(self, reply: str):
+        self.wfile.write(f"{reply}\r\n".encode())
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """
+    A minimal local SMTP server recording the delivered messages, without STARTTLS nor AUTH.
+
+    failures_left makes the next transactions fail with a temporary error, refused_recipients are rejected with a
+    permanent one.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.port = self.server_address[1]
+        self.messages: list[tuple[list[str], str]] = []
+        self.connection_count = 0
+        self.failures_left = 0
+        self.delay_seconds = 0.0
+        self.refused_recipients: set[str] = set()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
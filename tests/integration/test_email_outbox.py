@@ -0,0 +1,119 @@
+import os
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.database.database_manager import Base, DatabaseManager
+from app.database.email_outbox_repository import EmailOutboxRepository
+from app.integration.email_outbox import EmailOutbox
+from app.integration.email_sender_integration import EmailSenderIntegration
+from tests.integration.smtp_stand_in import SmtpStandIn
+
+
+class TestEmailOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.smtp_server = SmtpStandIn().__enter__()
+        os.environ["SENDER_EMAIL"] = "alerts@example.com"
+        os.environ["SENDER_EMAIL_PASSWORD"] = ""
+        os.environ["SMTP_ADDRESS"] = "127.0.0.1"
+        os.environ["SMTP_PORT"] = str(self.smtp_server.port)
+        os.environ["SMTP_STARTTLS"] = "false"
+
+        self.email_sender = EmailSenderIntegration()
+
+    def tearDown(self):
+        self.email_sender.close()
+        self.smtp_server.__exit__()
+        os.environ.pop("SMTP_STARTTLS")
+
+    def test_queueing_does_not_wait_for_the_mail_server(self):
+        self.smtp_server.delay_seconds = 1.0
+        outbox = EmailOutbox(self.email_sender)
+
+        started_at = time.monotonic()
+        for index in range(20):
+            outbox.send_email("Bitcoin is up", "bitcoin price alert", f"user{index}@example.com")
+
+        self.assertLess(time.monotonic() - started_at, 0.5)
+        self.assertEqual(outbox.pending_count(), 20)
+        self.assertEqual(self.smtp_server.connection_count, 0)
+
+    def test_same_message_is_batched_over_one_session(self):
+        outbox = EmailOutbox(self.email_sender, max_recipients=2)
+        outbox.enqueue("Bitcoin is up", "bitcoin price alert", [f"user{index}@example.com" for index in range(5)])
+        outbox.send_email("Bitcoin is down", "bitcoin price alert", "other@example.com")
+
+        self.assertEqual(outbox.drain(), 6)
+
+        self.assertEqual(self.smtp_server.connection_count, 1)
+        self.assertEqual([recipients for recipients, _ in self.smtp_server.messages],
+                         [["user0@example.com", "user1@example.com"], ["user2@example.com", "user3@example.com"],
+                          ["user4@example.com"], ["other@example.com"]])
+        self.assertIn("To: undisclosed-recipients:;", self.smtp_server.messages[0][1])
+        self.assertIn("To: other@example.com", self.smtp_server.messages[3][1])
+
+    def test_failed_delivery_is_retried_after_a_backoff(self):
+        self.smtp_server.failures_left = 1
+        outbox = EmailOutbox(self.email_sender, retry_backoff_seconds=0.2)
+        outbox.send_email("Bitcoin is up", "bitcoin price alert", "john@example.com")
+
+        self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(outbox.pending_count(), 1)
+
+        time.sleep(0.25)
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.retried_count, 1)
+        self.assertEqual(self.smtp_server.messages[0][0], ["john@example.com"])
+
+    def test_gives_up_after_max_attempts(self):
+        self.smtp_server.failures_left = 3
+        outbox = EmailOutbox(self.email_sender, max_attempts=2, retry_backoff_seconds=0)
+        outbox.send_email("Bitcoin is up", "bitcoin price alert", "john@example.com")
+
+        outbox.drain()
+        outbox.drain()
+
+        self.assertEqual(outbox.failed_count, 1)
+        self.assertEqual(outbox.pending_count(), 0)
+        self.assertEqual(self.smtp_server.messages, [])
+
+    def test_refused_recipient_is_not_retried(self):
+        self.smtp_server.refused_recipients = {"unknown@example.com"}
+        outbox = EmailOutbox(self.email_sender)
+        outbox.enqueue("Bitcoin is up", "bitcoin price alert", ["john@example.com", "unknown@example.com"])
+
+        self.assertEqual(outbox.drain(), 1)
+
+        self.assertEqual(outbox.failed_count, 1)
+        self.assertEqual(outbox.pending_count(), 0)
+        self.assertEqual(self.smtp_server.messages[0][0], ["john@example.com"])
+
+    def test_background_sender_delivers_queued_emails(self):
+        outbox = EmailOutbox(self.email_sender, batch_delay_seconds=0, poll_seconds=0.05)
+        outbox.start_job()
+        outbox.send_email("Bitcoin is up", "bitcoin price alert", "john@example.com")
+
+        deadline = time.monotonic() + 5
+        while not self.smtp_server.messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+        outbox.stop_job()
+
+        self.assertEqual(self.smtp_server.messages[0][0], ["john@example.com"])
+        self.assertEqual(outbox.sent_count, 1)
+
+    def test_persistent_outbox_sends_pending_emails_after_a_restart(self):
+        db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+        db_manager.create_tables()
+        repository = EmailOutboxRepository(db_manager.get_session())
+        EmailOutbox(MagicMock(spec=EmailSenderIntegration), repository).send_email(
+            "Bitcoin is up", "bitcoin price alert", "john@example.com")
+
+        outbox = EmailOutbox(self.email_sender, repository)
+        self.assertEqual(outbox.load_pending(), 1)
+        self.assertEqual(outbox.drain(), 1)
+
+        self.assertEqual(self.smtp_server.messages[0][0], ["john@example.com"])
+        self.assertEqual(repository.get_pending_emails(), [])
+        Base.metadata.drop_all(bind=db_manager.engine)
@@ -3,6 +3,8 @@ import unittest
 from email.mime.text import MIMEText
 
 from app.integration.email_sender_integration import EmailSenderIntegration
+from app.metrics.instruments import email_send_duration
+from tests.integration.smtp_stand_in import SmtpStandIn
 
 
 class TestEmailSenderIntegration(unittest.TestCase):
@@ -28,3 +30,22 @@ class TestEmailSenderIntegration(unittest.TestCase):
         self.assertEqual(email_message["From"], "test_sender@example.com")
         self.assertEqual(email_message["To"], destination)
         self.assertEqual(email_message.get_payload(), message)
+
+    def test_send_batch_reuses_one_session(self):
+        with SmtpStandIn() as smtp_server:
+            os.environ["SMTP_ADDRESS"] = "127.0.0.1"
+            os.environ["SMTP_PORT"] = str(smtp_server.port)
+            os.environ["SMTP_STARTTLS"] = "false"
+            os.environ["SENDER_EMAIL_PASSWORD"] = ""
+            email_sender = EmailSenderIntegration()
+            os.environ.pop("SMTP_STARTTLS")
+            sent_count = email_send_duration.count("sent")
+
+            email_sender.send_batch("First", "Subject", ["first@example.com"])
+            email_sender.send_batch("Second", "Subject", ["second@example.com", "third@example.com"])
+            email_sender.close()
+
+        self.assertEqual(smtp_server.connection_count, 1)
+        self.assertEqual(email_send_duration.count("sent"), sent_count + 2)
+        self.assertEqual([recipients for recipients, _ in smtp_server.messages],
+                         [["first@example.com"], ["second@example.com", "third@example.com"]])
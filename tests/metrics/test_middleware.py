@@ -0,0 +1,32 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.metrics.middleware import MetricsMiddleware
+from app.metrics.registry import Histogram
+
+
+def _create_client() -> tuple[TestClient, Histogram]:
+    histogram = Histogram("http_request_duration_seconds", "Duration", ("method", "route", "status"))
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, histogram=histogram)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    return TestClient(app), histogram
+
+
+def test_requests_are_labelled_by_route_template():
+    client, histogram = _create_client()
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/0")
+    client.get("/unknown/path")
+
+    assert histogram.count("GET", "/items/{item_id}", "200") == 2
+    assert histogram.count("GET", "/items/{item_id}", "404") == 1
+    assert histogram.count("GET", "unmatched", "404") == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from app.metrics.registry import MetricsRegistry
+
+
+def test_render_counters_and_callbacks():
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors\nby kind", ("kind",))
+    registry.gauge_callback("queue_size", "Queued items", lambda: 3)
+    registry.counter_callback("sent_total", "Sent items", lambda: {("a",): 1, ("b",): 2.5}, ("pool",))
+    counter.inc("timeout")
+    counter.inc("timeout", amount=2)
+    counter.inc('say "hi"\\')
+
+    assert registry.render() == (
+        "# HELP errors_total Errors\\nby kind\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{kind="timeout"} 3\n'
+        'errors_total{kind="say \\"hi\\"\\\\"} 1\n'
+        "# HELP queue_size Queued items\n"
+        "# TYPE queue_size gauge\n"
+        "queue_size 3\n"
+        "# HELP sent_total Sent items\n"
+        "# TYPE sent_total counter\n"
+        'sent_total{pool="a"} 1\n'
+        'sent_total{pool="b"} 2.5\n')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("duration_seconds", "Duration", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/prices")
+
+    assert histogram.count("/prices") == 4
+    assert histogram.count("/other") == 0
+    assert registry.render().splitlines()[2:] == [
+        'duration_seconds_bucket{route="/prices",le="0.1"} 2',
+        'duration_seconds_bucket{route="/prices",le="1"} 3',
+        'duration_seconds_bucket{route="/prices",le="+Inf"} 4',
+        'duration_seconds_sum{route="/prices"} 3.65',
+        'duration_seconds_count{route="/prices"} 4']
+
+
+def test_failing_callback_is_skipped():
+    registry = MetricsRegistry()
+    registry.gauge_callback("broken", "Broken", lambda: 1 / 0)
+    registry.counter("ok_total", "Ok").inc()
+
+    assert registry.render() == "# HELP ok_total Ok\n# TYPE ok_total counter\nok_total 1\n"
+
+
+def test_failing_callback_is_logged_once_a_minute(capsys):
+    registry = MetricsRegistry()
+    registry.gauge_callback("broken", "Broken", lambda: 1 / 0)
+
+    registry.render()
+    registry.render()
+
+    assert capsys.readouterr().out.count("broken metric") == 1
+
+
+def test_register_twice():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors")
+    registry.gauge_callback("size", "Size", lambda: 1)
+
+    with pytest.raises(ValueError):
+        registry.histogram("errors_total", "Errors")
+    registry.gauge_callback("size", "Size", lambda: 2)
+    assert "size 2\n" in registry.render()
@@ -1,16 +1,98 @@
 from unittest.mock import MagicMock
 
+import httpx
+import pytest
+
+from app.metrics.instruments import price_fetch_duration, price_fetch_errors, price_fetch_retries
 from app.service.bitcoin_price_api_service import BitcoinPriceApiService
 from app.service.bitcoin_service import BitcoinService
 
+COIN_GECKO_URL = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
+
+
+def _create_api_service(handler, max_retries=3):
+    bitcoin_service = MagicMock(spec=BitcoinService)
+    bitcoin_service.update_prices.return_value = None
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    return BitcoinPriceApiService(bitcoin_service, COIN_GECKO_URL, client, max_retries=max_retries,
+                                  backoff_factor=0), bitcoin_service
+
+
+@pytest.mark.asyncio
+async def test_get_latest_price():
+    api_integration_service, bitcoin_service = _create_api_service(
+        lambda request: httpx.Response(200, json={"bitcoin": {"usd": 50000.0}}))
+
+    bitcoin_value = await api_integration_service.fetch_latest_price()
+
+    assert bitcoin_value == {("bitcoin", "usd"): 50000.0}
+    assert api_integration_service.last_fetch_latency is not None
+    bitcoin_service.update_prices.assert_called_once_with({("bitcoin", "usd"): 50000.0})
+
+
+@pytest.mark.asyncio
+async def test_get_latest_price_retries_after_rate_limit():
+    responses = iter([httpx.Response(429, headers={"Retry-After": "0"}),
+                      httpx.Response(503),
+                      httpx.Response(200, json={"bitcoin": {"usd": 42000.0}})])
+    api_integration_service, bitcoin_service = _create_api_service(lambda request: next(responses))
+    retries, fetches = price_fetch_retries.value(), price_fetch_duration.count()
+
+    bitcoin_value = await api_integration_service.fetch_latest_price()
+
+    assert bitcoin_value == {("bitcoin", "usd"): 42000.0}
+    assert price_fetch_retries.value() == retries + 2
+    assert price_fetch_duration.count() == fetches + 1
+    bitcoin_service.update_prices.assert_called_once_with({("bitcoin", "usd"): 42000.0})
+
+
+@pytest.mark.asyncio
+async def test_get_latest_price_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    api_integration_service, bitcoin_service = _create_api_service(handler, max_retries=2)
+    errors = price_fetch_errors.value("ConnectTimeout")
+
+    bitcoin_value = await api_integration_service.fetch_latest_price()
+
+    assert bitcoin_value is None
+    assert len(calls) == 3
+    assert price_fetch_errors.value("ConnectTimeout") == errors + 1
+    bitcoin_service.update_prices.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_configured_pairs_in_a_single_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"bitcoin": {"usd": 50000.0, "eur": 46000.0},
+                                         "ethereum": {"usd": 3000.0}})
 
-def test_get_latest_price():
-    coin_gecko_url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
     bitcoin_service = MagicMock(spec=BitcoinService)
-    bitcoin_service.update_price.return_value = None
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    api_integration_service = BitcoinPriceApiService(bitcoin_service, COIN_GECKO_URL, client,
+                                                     assets=["bitcoin", "ethereum"], vs_currencies=["usd", "eur"])
+
+    prices = await api_integration_service.fetch_latest_price()
+
+    assert len(requests) == 1
+    assert requests[0].url.params["ids"] == "bitcoin,ethereum"
+    assert requests[0].url.params["vs_currencies"] == "usd,eur"
+    assert prices == {("bitcoin", "usd"): 50000.0, ("bitcoin", "eur"): 46000.0, ("ethereum", "usd"): 3000.0}
+    bitcoin_service.update_prices.assert_called_once_with(prices)
 
-    api_integration_service = BitcoinPriceApiService(bitcoin_service, coin_gecko_url)
 
-    bitcoin_value = api_integration_service.fetch_latest_price()
+def test_retry_delay_uses_retry_after_header():
+    api_integration_service, _ = _create_api_service(lambda request: httpx.Response(200))
+    api_integration_service.backoff_factor = 1
 
-    assert bitcoin_value is not None
+    assert api_integration_service._retry_delay(0, httpx.Response(429, headers={"Retry-After": "7"})) == 7
+    assert api_integration_service._retry_delay(3) == 8
+    assert api_integration_service._retry_delay(10) == api_integration_service.max_backoff
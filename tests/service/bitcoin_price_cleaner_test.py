@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.price_partition_manager import PricePartitionManager
+from app.jobs.bitcoin_price_cleaner_job import BitcoinPriceCleaner
+from app.service.price_ring_buffer import RecentPrices
+from app.service.price_rollup_service import PriceRollupService
+
+
+def test_retention_runs_when_the_job_starts():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_partition_manager = MagicMock(spec=PricePartitionManager)
+    cleaner = BitcoinPriceCleaner(mock_repo, mock_partition_manager)
+
+    cleaner.start_job()
+    cleaner.stop_job()
+
+    # The upcoming partitions exist even when the process never lives a whole day
+    mock_partition_manager.ensure_partitions.assert_called_once()
+    mock_partition_manager.drop_partitions_older_than.assert_called_once()
+
+
+def test_recent_prices_are_kept_when_the_rollup_fails():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_rollup_service = MagicMock(spec=PriceRollupService)
+    mock_rollup_service.roll_up_prices_older_than.side_effect = Exception("Database down")
+    recent_prices = RecentPrices(10)
+    recent_prices.append(100.0, datetime.now(timezone.utc) - timedelta(days=100))
+    cleaner = BitcoinPriceCleaner(mock_repo, retention_days=90, rollup_service=mock_rollup_service,
+                                  recent_prices=recent_prices)
+
+    cleaner.apply_retention()
+
+    mock_repo.delete_prices_older_than.assert_not_called()
+    assert len(recent_prices.get()) == 1
+
+    mock_rollup_service.roll_up_prices_older_than.side_effect = None
+    cleaner.apply_retention()
+
+    mock_repo.delete_prices_older_than.assert_called_once()
+    assert len(recent_prices.get()) == 0
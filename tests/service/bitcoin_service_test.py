@@ -1,9 +1,20 @@
-from datetime import date
-from unittest.mock import MagicMock
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
 
+import pytest
+
+from app.database.async_bitcoin_repository import AsyncBitcoinRepository
 from app.database.bitcoin_repository import BitcoinRepository
+from app.database.model.bitcoin_summary import utc_today
+from app.database.price_write_buffer import PriceWriteBuffer
 from app.integration.email_sender_integration import EmailSenderIntegration
 from app.service.bitcoin_service import BitcoinService
+from app.service.candle_aggregator import CandleAggregator
+from app.service.market_snapshot import MarketSnapshot
+from app.service.price_extremes import PriceExtremes
+from app.service.price_ring_buffer import RecentPrices
+from app.service.summary_cache import SummaryCache
 
 
 def test_create_new_summary_cache():
@@ -25,7 +36,7 @@ def test_create_new_summary_cache():
     bitcoin_service.update_summary(100)
     cached_summary = bitcoin_service.get_cached_summary()
 
-    assert cached_summary['current_date'] == date.today()
+    assert cached_summary['current_date'] == utc_today()
     assert cached_summary['min_price'] == 100
     assert cached_summary['max_price'] == 100
 
@@ -37,7 +48,7 @@ def test_update_max_price_from_summary_cache():
     mock_email_sender = MagicMock(spec=EmailSenderIntegration)
     mock_email_sender.send_email.return_value = None
 
-    cache_date = date.today()
+    cache_date = utc_today()
 
     bitcoin_service: BitcoinService = BitcoinService(mock_repo, cache_date, mock_email_sender)
 
@@ -57,7 +68,7 @@ def test_update_min_price_from_summary_cache():
     mock_email_sender = MagicMock(spec=EmailSenderIntegration)
     mock_email_sender.send_email.return_value = None
 
-    cache_date = date.today()
+    cache_date = utc_today()
 
     bitcoin_service: BitcoinService = BitcoinService(mock_repo, cache_date, mock_email_sender)
 
@@ -68,3 +79,358 @@ def test_update_min_price_from_summary_cache():
     assert cached_summary['current_date'] == cache_date
     assert cached_summary['min_price'] == 50
     assert cached_summary['max_price'] == 100
+
+
+def test_latest_price_and_summary_are_served_from_market_snapshot():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [10]
+    mock_repo.get_summary_by_day.return_value = None
+
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender,
+                                                     market_snapshot=MarketSnapshot())
+
+    bitcoin_service.update_price(100)
+    bitcoin_service.update_price(120)
+    mock_repo.get_summary_by_day.reset_mock()
+
+    latest_price = bitcoin_service.get_latest_price()
+    summary = bitcoin_service.get_summary_by_date(utc_today())
+
+    assert latest_price.price == 120
+    assert latest_price.id == 10
+    assert summary.min_price == 100
+    assert summary.max_price == 120
+    mock_repo.get_latest_price.assert_not_called()
+    mock_repo.get_summary_by_day.assert_not_called()
+
+
+def test_latest_price_falls_back_to_repository_on_cold_start():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.get_latest_price.return_value = MagicMock(id=1, price=50.0, timestamp=datetime(2025, 4, 6, 12, 0))
+
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+    market_snapshot = MarketSnapshot()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender,
+                                                     market_snapshot=market_snapshot)
+
+    assert bitcoin_service.get_latest_price().price == 50.0
+    assert market_snapshot.get_latest_price().price == 50.0
+
+
+def test_update_prices_inserts_every_pair_in_one_batch():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1, 2]
+    mock_repo.get_max_historic_price.return_value = None
+
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 3.0})
+
+    mock_repo.insert_prices.assert_called_once()
+    inserted_rows = mock_repo.insert_prices.call_args.args[0]
+    assert [(row["asset"], row["vs_currency"], row["price"]) for row in inserted_rows] == [
+        ("bitcoin", "usd", 100.0), ("ethereum", "eur", 3.0)]
+    assert bitcoin_service.get_cached_summary("ethereum", "eur")['max_price'] == 3.0
+    assert bitcoin_service.get_cached_summary()['max_price'] == 100.0
+
+
+def test_update_prices_writes_the_changed_summaries_in_one_upsert():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1, 2]
+    mock_repo.get_summaries_page.return_value = []
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration))
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 3.0})
+
+    # Only ethereum moved out of its cached min and max
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 4.0})
+
+    assert mock_repo.update_summaries.call_count == 2
+    assert mock_repo.update_summaries.call_args.args[0] == [
+        {"price": 4.0, "day": utc_today(), "asset": "ethereum", "vs_currency": "eur"}]
+    mock_repo.update_summary.assert_not_called()
+
+
+def test_closed_candles_are_saved_and_open_candle_is_served():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1]
+    mock_repo.get_candles.return_value = []
+
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+    candle_aggregator = CandleAggregator({"1m": 60})
+    candle_aggregator.add_tick(100, datetime(2000, 1, 1), "bitcoin", "usd")
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender,
+                                                     candle_aggregator=candle_aggregator)
+
+    bitcoin_service.update_price(120)
+
+    closed_candles = mock_repo.save_candles.call_args.args[0]
+    assert [candle.open_time for candle in closed_candles] == [datetime(2000, 1, 1)]
+
+    candles = bitcoin_service.get_candles("1m", datetime(2000, 1, 1), datetime(2100, 1, 1), 100)
+
+    assert len(candles) == 1
+    assert candles[0].close_price == 120
+
+
+def test_get_prices_page_returns_key_of_next_page():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    prices = [MagicMock(id=price_id, timestamp=datetime(2025, 4, 6, 12, price_id)) for price_id in range(3)]
+    mock_repo.get_prices_page.return_value = prices
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration))
+
+    page, next_key = bitcoin_service.get_prices_page(None, None, 2)
+
+    assert page == prices[:2]
+    assert next_key == (datetime(2025, 4, 6, 12, 1), 1)
+    mock_repo.get_prices_page.assert_called_once_with(None, None, 3, None, "bitcoin", "usd")
+
+    mock_repo.get_prices_page.return_value = prices[:1]
+    page, next_key = bitcoin_service.get_prices_page(None, None, 2)
+
+    assert next_key is None
+
+
+@pytest.mark.asyncio
+async def test_async_reads_use_async_repository_and_seed_snapshot():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_async_repo = MagicMock(spec=AsyncBitcoinRepository)
+    mock_async_repo.get_latest_price = AsyncMock(
+        return_value=MagicMock(id=1, price=50.0, timestamp=datetime(2025, 4, 6, 12, 0)))
+    mock_async_repo.get_prices_page = AsyncMock(return_value=[])
+    market_snapshot = MarketSnapshot()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     market_snapshot=market_snapshot,
+                                                     async_repository=mock_async_repo)
+
+    assert (await bitcoin_service.get_latest_price_async()).price == 50.0
+    assert (await bitcoin_service.get_latest_price_async()).price == 50.0
+    assert await bitcoin_service.get_prices_page_async(None, None, 2) == ([], None)
+    mock_async_repo.get_latest_price.assert_awaited_once_with("bitcoin", "usd")
+    mock_repo.get_latest_price.assert_not_called()
+    mock_repo.get_prices_page.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_reads_fall_back_to_sync_repository():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.get_all_summaries.return_value = ["summary"]
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration))
+
+    assert await bitcoin_service.get_all_summaries_async() == ["summary"]
+    mock_repo.get_all_summaries.assert_called_once_with("bitcoin", "usd")
+
+
+def test_closed_day_summaries_are_cached_but_not_current_day_nor_missing_ones():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    closed_day = utc_today() - timedelta(days=1)
+    mock_repo.get_summary_by_day.return_value = MagicMock(id=1, max_price=120.0, min_price=100.0, day=closed_day)
+    summary_cache = SummaryCache()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     summary_cache=summary_cache)
+
+    assert bitcoin_service.get_summary_by_date(closed_day).max_price == 120.0
+    assert bitcoin_service.get_summary_by_date(closed_day).max_price == 120.0
+    assert mock_repo.get_summary_by_day.call_count == 1
+
+    bitcoin_service.get_summary_by_date(utc_today())
+    bitcoin_service.get_summary_by_date(utc_today())
+    assert mock_repo.get_summary_by_day.call_count == 3
+
+    mock_repo.get_summary_by_day.return_value = None
+    bitcoin_service.get_summary_by_date(closed_day - timedelta(days=1))
+    bitcoin_service.get_summary_by_date(closed_day - timedelta(days=1))
+    assert mock_repo.get_summary_by_day.call_count == 5
+
+
+def test_cached_closed_day_summaries_expire_so_a_backfill_shows_up():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    closed_day = utc_today() - timedelta(days=1)
+    mock_repo.get_summary_by_day.return_value = MagicMock(id=1, max_price=120.0, min_price=100.0, day=closed_day)
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     summary_cache=SummaryCache(ttl_seconds=0))
+
+    bitcoin_service.get_summary_by_date(closed_day)
+    mock_repo.get_summary_by_day.return_value = MagicMock(id=1, max_price=130.0, min_price=90.0, day=closed_day)
+
+    assert bitcoin_service.get_summary_by_date(closed_day).max_price == 130.0
+
+
+# At any time of the day, the local day of at least one of these zones differs from the UTC day
+@pytest.mark.parametrize("time_zone", ["Etc/GMT-14", "Etc/GMT+12"])
+def test_summaries_use_the_utc_day_whatever_the_local_time_zone(monkeypatch, time_zone):
+    monkeypatch.setenv("TZ", time_zone)
+    time.tzset()
+    try:
+        mock_repo = MagicMock(spec=BitcoinRepository)
+        utc_day = datetime.now(timezone.utc).date()
+        yesterday = utc_day - timedelta(days=1)
+        bitcoin_service: BitcoinService = BitcoinService(mock_repo, yesterday,
+                                                         MagicMock(spec=EmailSenderIntegration),
+                                                         summary_cache=SummaryCache())
+
+        bitcoin_service.update_prices({("bitcoin", "usd"): 100.0})
+
+        assert mock_repo.update_summaries.call_args.args[0][0]["day"] == utc_day
+        assert bitcoin_service.get_cached_summary()["current_date"] == utc_day
+
+        mock_repo.get_summary_by_day.return_value = MagicMock(id=1, max_price=1.0, min_price=1.0, day=yesterday)
+        bitcoin_service.get_summary_by_date(yesterday)
+        bitcoin_service.get_summary_by_date(yesterday)
+        bitcoin_service.get_summary_by_date(utc_day)
+        bitcoin_service.get_summary_by_date(utc_day)
+        # The closed UTC day is cached, the current one is not
+        assert mock_repo.get_summary_by_day.call_count == 3
+    finally:
+        monkeypatch.delenv("TZ", raising=False)
+        time.tzset()
+
+
+def test_summaries_page_of_closed_range_is_cached():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    days = [date(2025, 4, 6) + timedelta(days=offset) for offset in range(3)]
+    mock_repo.get_summaries_page.return_value = [MagicMock(id=index, max_price=1.0, min_price=1.0, day=day)
+                                                 for index, day in enumerate(days)]
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     summary_cache=SummaryCache())
+
+    page, next_day = bitcoin_service.get_summaries_page(None, date(2025, 4, 30), 2)
+    cached_page, cached_next_day = bitcoin_service.get_summaries_page(None, date(2025, 4, 30), 2)
+
+    assert [summary.day for summary in page] == days[:2]
+    assert next_day == days[1]
+    assert (cached_page, cached_next_day) == (page, next_day)
+    mock_repo.get_summaries_page.assert_called_once_with(None, date(2025, 4, 30), 3, None, "bitcoin", "usd")
+
+    bitcoin_service.get_summaries_page(None, None, 2)
+    bitcoin_service.get_summaries_page(None, None, 2)
+    assert mock_repo.get_summaries_page.call_count == 3
+
+
+def test_update_prices_appends_to_recent_prices():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1, 2]
+    mock_repo.get_max_historic_price.return_value = None
+    recent_prices = RecentPrices(10)
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     recent_prices=recent_prices)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 3.0})
+
+    assert recent_prices.get().to_arrays()[1].tolist() == [100.0]
+    assert recent_prices.get("ethereum", "eur").to_arrays()[1].tolist() == [3.0]
+
+
+def test_dip_notification_reads_the_sliding_90_days_high_and_low(monkeypatch):
+    monkeypatch.setenv("BITCOIN_PRICE_DIP_MIN_THRESHOLD", "0.1")
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.get_summaries_page.return_value = [
+        MagicMock(day=utc_today() - timedelta(days=100), max_price=500.0, min_price=10.0),
+        MagicMock(day=utc_today() - timedelta(days=10), max_price=200.0, min_price=150.0)]
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+    price_extremes = PriceExtremes()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender,
+                                                     price_extremes=price_extremes)
+
+    bitcoin_service.update_summary(160)
+    bitcoin_service.notify_email_bitcoin_price_dip()
+
+    assert bitcoin_service.get_price_extremes() == (200.0, 150.0)
+    mock_email_sender.send_email.assert_not_called()
+
+    bitcoin_service.update_summary(140)
+    bitcoin_service.notify_email_bitcoin_price_dip()
+
+    assert bitcoin_service.get_price_extremes() == (200.0, 140.0)
+    mock_email_sender.send_email.assert_called_once()
+
+    other_bitcoin_service = BitcoinService(mock_repo, utc_today(), mock_email_sender, price_extremes=price_extremes)
+    assert other_bitcoin_service.get_price_extremes() == (200.0, 140.0)
+    mock_repo.get_summaries_page.assert_called_once()
+    mock_repo.get_max_historic_price.assert_not_called()
+
+
+def test_update_prices_evaluates_price_alerts_with_the_90_days_high():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1]
+    mock_repo.get_summaries_page.return_value = [
+        MagicMock(day=utc_today() - timedelta(days=10), max_price=200.0, min_price=150.0)]
+    mock_alert_service = MagicMock()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     alert_service=mock_alert_service)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 160.0})
+
+    price, _, asset, vs_currency, high = mock_alert_service.on_tick.call_args.args
+    assert (price, asset, vs_currency, high) == (160.0, "bitcoin", "usd", 200.0)
+
+
+def test_update_prices_publishes_ticks_with_the_current_summary():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.return_value = [1]
+    mock_repo.get_summary_by_day.return_value = None
+    mock_broadcaster = MagicMock()
+
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     market_snapshot=MarketSnapshot(),
+                                                     price_broadcaster=mock_broadcaster)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0})
+    bitcoin_service.update_prices({("bitcoin", "usd"): 90.0})
+
+    price, _, asset, vs_currency = mock_broadcaster.publish.call_args.args
+    assert (price, asset, vs_currency) == (90.0, "bitcoin", "usd")
+    assert mock_broadcaster.publish.call_args.kwargs["summary"] == (utc_today(), 100.0, 90.0)
+
+
+def test_price_the_write_buffer_rejects_goes_no_further():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.get_summaries_page.return_value = []
+    mock_price_writer = MagicMock(spec=PriceWriteBuffer)
+    mock_price_writer.add.side_effect = [None, BufferError("Price write buffer is full and could not be flushed")]
+    market_snapshot = MarketSnapshot()
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                                     mock_price_writer, market_snapshot)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 3.0})
+
+    # Only the buffered price is summarized and served
+    assert [row["asset"] for row in mock_repo.update_summaries.call_args.args[0]] == ["bitcoin"]
+    assert market_snapshot.get_latest_price().price == 100.0
+    assert market_snapshot.get_latest_price("ethereum", "eur") is None
+
+
+def test_failed_batch_insert_leaves_every_pair_untouched():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.insert_prices.side_effect = ConnectionError("database is down")
+    mock_email_sender = MagicMock(spec=EmailSenderIntegration)
+    market_snapshot = MarketSnapshot()
+    candle_aggregator = CandleAggregator({"1m": 60})
+    recent_prices = RecentPrices(10)
+    bitcoin_service: BitcoinService = BitcoinService(mock_repo, utc_today(), mock_email_sender,
+                                                     market_snapshot=market_snapshot,
+                                                     candle_aggregator=candle_aggregator,
+                                                     recent_prices=recent_prices)
+
+    bitcoin_service.update_prices({("bitcoin", "usd"): 100.0, ("ethereum", "eur"): 3.0})
+
+    mock_repo.update_summaries.assert_not_called()
+    mock_repo.save_candles.assert_not_called()
+    assert market_snapshot.get_latest_price() is None
+    assert market_snapshot.get_latest_price("ethereum", "eur") is None
+    assert len(recent_prices.get()) == 0 and len(recent_prices.get("ethereum", "eur")) == 0
+    assert bitcoin_service.get_cached_summary()['max_price'] == 0
+    mock_email_sender.send_email.assert_not_called()
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+from app.service.candle_aggregator import CandleAggregator, bucket_start
+
+
+def test_bucket_start():
+    timestamp = datetime(2025, 4, 6, 12, 7, 42)
+
+    assert bucket_start(timestamp, 60) == datetime(2025, 4, 6, 12, 7)
+    assert bucket_start(timestamp, 300) == datetime(2025, 4, 6, 12, 5)
+    assert bucket_start(timestamp, 3600) == datetime(2025, 4, 6, 12, 0)
+    assert bucket_start(timestamp, 86400) == datetime(2025, 4, 6)
+    assert bucket_start(datetime(2025, 4, 6, 12, 7, 42, tzinfo=timezone.utc), 60) == datetime(2025, 4, 6, 12, 7)
+
+
+def test_add_tick_builds_open_candle():
+    candle_aggregator = CandleAggregator({"1m": 60})
+
+    for second, price in [(0, 100), (10, 120), (20, 90), (59, 110)]:
+        closed_candles = candle_aggregator.add_tick(price, datetime(2025, 4, 6, 12, 0, second), "bitcoin", "usd")
+        assert closed_candles == []
+
+    candle = candle_aggregator.get_open_candle("1m", "bitcoin", "usd")
+
+    assert candle.open_time == datetime(2025, 4, 6, 12, 0)
+    assert (candle.open_price, candle.high_price, candle.low_price, candle.close_price) == (100, 120, 90, 110)
+    assert candle.tick_count == 4
+
+
+def test_add_tick_closes_candles_of_every_interval_crossed():
+    candle_aggregator = CandleAggregator({"1m": 60, "5m": 300})
+
+    candle_aggregator.add_tick(100, datetime(2025, 4, 6, 12, 3, 30), "bitcoin", "usd")
+    closed_candles = candle_aggregator.add_tick(101, datetime(2025, 4, 6, 12, 4, 30), "bitcoin", "usd")
+
+    assert [(candle.interval, candle.open_time) for candle in closed_candles] == [
+        ("1m", datetime(2025, 4, 6, 12, 3))]
+
+    closed_candles = candle_aggregator.add_tick(102, datetime(2025, 4, 6, 12, 5, 0), "bitcoin", "usd")
+
+    assert [(candle.interval, candle.open_time, candle.tick_count) for candle in closed_candles] == [
+        ("1m", datetime(2025, 4, 6, 12, 4), 1), ("5m", datetime(2025, 4, 6, 12, 0), 2)]
+
+
+def test_candles_are_kept_per_pair():
+    candle_aggregator = CandleAggregator({"1m": 60})
+
+    candle_aggregator.add_tick(100, datetime(2025, 4, 6, 12, 0), "bitcoin", "usd")
+    candle_aggregator.add_tick(3, datetime(2025, 4, 6, 12, 0), "ethereum", "usd")
+
+    assert candle_aggregator.get_open_candle("1m", "bitcoin", "usd").close_price == 100
+    assert candle_aggregator.get_open_candle("1m", "ethereum", "usd").close_price == 3
+    assert len(candle_aggregator.drain_open_candles()) == 2
+    assert candle_aggregator.get_open_candle("1m", "bitcoin", "usd") is None
@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.database.database_manager import DatabaseManager
+from app.database.leader_lock import LeaseLeaderLock
+from app.jobs.leader_election_job import LeaderElection
+
+
+def _election(lock):
+    db_manager = MagicMock(spec=DatabaseManager)
+    db_manager.get_leader_lock.return_value = lock
+    return LeaderElection(db_manager, "ingestion", AsyncMock(), AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_while_the_lock_is_held():
+    lock = MagicMock(spec=LeaseLeaderLock)
+    lock.acquire.side_effect = [False, True, True, False]
+    election = _election(lock)
+
+    assert [await election.elect() for _ in range(4)] == [False, True, True, False]
+
+    election.on_elected.assert_awaited_once()
+    election.on_demoted.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failing_database_demotes_the_leader():
+    lock = MagicMock(spec=LeaseLeaderLock)
+    lock.acquire.side_effect = [True, ConnectionError("database is down")]
+    election = _election(lock)
+
+    assert await election.elect() is True
+    assert await election.elect() is False
+    election.on_demoted.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stopping_the_leader_stops_the_jobs_then_releases_the_lock():
+    lock = MagicMock(spec=LeaseLeaderLock)
+    lock.acquire.return_value = True
+    election = _election(lock)
+
+    election.start_job()
+    await election.stop_job()
+
+    election.on_elected.assert_awaited_once()
+    election.on_demoted.assert_awaited_once()
+    lock.release.assert_called_once()
+    assert election.is_leader is False
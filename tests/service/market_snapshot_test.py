@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+from app.service.market_snapshot import DailySummary, MarketSnapshot, PriceTick
+
+
+def test_update_sets_latest_price_and_summary():
+    market_snapshot = MarketSnapshot()
+    day = date(2025, 4, 6)
+
+    market_snapshot.update(100, datetime(2025, 4, 6, 12, 0), day, price_id=1)
+    market_snapshot.update(50, datetime(2025, 4, 6, 12, 1), day, price_id=2)
+    market_snapshot.update(75, datetime(2025, 4, 6, 12, 2), day)
+
+    latest_price = market_snapshot.get_latest_price()
+    summary = market_snapshot.get_summary(day)
+
+    assert latest_price == PriceTick(id=0, price=75, timestamp=datetime(2025, 4, 6, 12, 2))
+    assert summary.min_price == 50
+    assert summary.max_price == 100
+    assert market_snapshot.get_summary(date(2025, 4, 5)) is None
+
+
+def test_update_rolls_summary_over_on_new_day():
+    market_snapshot = MarketSnapshot()
+
+    market_snapshot.update(100, datetime(2025, 4, 6, 23, 59), date(2025, 4, 6))
+    market_snapshot.update(200, datetime(2025, 4, 7, 0, 0), date(2025, 4, 7))
+
+    assert market_snapshot.get_summary(date(2025, 4, 6)) is None
+    assert market_snapshot.get_summary(date(2025, 4, 7)) == DailySummary(id=0, max_price=200, min_price=200,
+                                                                         day=date(2025, 4, 7))
+
+
+def test_seed_summary_merges_with_ticks_already_seen():
+    market_snapshot = MarketSnapshot()
+    day = date(2025, 4, 6)
+
+    market_snapshot.update(100, datetime(2025, 4, 6, 12, 0), day)
+    market_snapshot.seed_summary(DailySummary(id=7, max_price=90, min_price=40, day=day))
+
+    assert market_snapshot.get_summary(day) == DailySummary(id=7, max_price=100, min_price=40, day=day)
+
+
+def test_seed_latest_price_does_not_override_ingested_price():
+    market_snapshot = MarketSnapshot()
+
+    market_snapshot.update(100, datetime(2025, 4, 6, 12, 0), date(2025, 4, 6), price_id=2)
+    market_snapshot.seed_latest_price(PriceTick(id=1, price=90, timestamp=datetime(2025, 4, 6, 11, 59)))
+
+    assert market_snapshot.get_latest_price().price == 100
@@ -0,0 +1,142 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.service.price_alert_engine import PriceAlertEngine
+from app.service.price_ring_buffer import RecentPrices
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+def _alert(alert_id, kind, threshold, window_minutes=None, cooldown_seconds=0, hysteresis_percent=0.0,
+           asset="bitcoin", vs_currency="usd"):
+    return SimpleNamespace(id=alert_id, email=f"user{alert_id}@example.com", asset=asset, vs_currency=vs_currency,
+                           kind=kind, threshold=threshold, window_minutes=window_minutes,
+                           cooldown_seconds=cooldown_seconds, hysteresis_percent=hysteresis_percent,
+                           last_triggered_at=None)
+
+
+def _fired_ids(engine, prices, start=START, **kwargs):
+    fired = []
+    for index, price in enumerate(prices):
+        fired.append([alert.alert_id for alert in engine.on_tick(price, start + timedelta(minutes=index), **kwargs)])
+    return fired
+
+
+def test_above_and_below_fire_when_crossed():
+    engine = PriceAlertEngine()
+    engine.load([_alert(1, "above", 110.0), _alert(2, "below", 90.0)])
+
+    assert _fired_ids(engine, [100.0, 105.0, 110.0, 95.0, 89.0]) == [[], [], [1], [], [2]]
+
+
+def test_first_tick_only_sets_the_baseline():
+    engine = PriceAlertEngine()
+    engine.add_alert(_alert(1, "above", 100.0))
+
+    assert _fired_ids(engine, [150.0, 160.0]) == [[], []]
+
+
+def test_hysteresis_rearms_only_after_moving_back_past_the_band():
+    engine = PriceAlertEngine()
+    engine.add_alert(_alert(1, "above", 100.0, hysteresis_percent=5.0))
+
+    # Oscillating around the threshold fires once, until the price falls below 95
+    fired = _fired_ids(engine, [99.0, 101.0, 99.0, 101.0, 94.0, 101.0])
+
+    assert fired == [[], [1], [], [], [], [1]]
+
+
+def test_cooldown_suppresses_repeated_triggers():
+    engine = PriceAlertEngine()
+    engine.add_alert(_alert(1, "below", 100.0, cooldown_seconds=600))
+
+    # One tick per minute, the second crossing is within the 10 minutes cooldown
+    fired = _fired_ids(engine, [101.0, 99.0, 101.0, 99.0] + [101.0] * 10 + [99.0])
+
+    assert sum(fired, []) == [1, 1]
+    assert fired[1] == [1] and fired[-1] == [1]
+
+
+def test_dip_from_high():
+    engine = PriceAlertEngine()
+    engine.add_alert(_alert(1, "dip_from_high", 10.0))
+
+    assert _fired_ids(engine, [95.0, 91.0, 89.0], high=100.0) == [[], [], [1]]
+
+
+def test_move_within_compares_with_the_price_window_minutes_ago():
+    recent_prices = RecentPrices(100)
+    engine = PriceAlertEngine(recent_prices)
+    engine.add_alert(_alert(1, "move_within", 5.0, window_minutes=3))
+
+    fired = []
+    for index, price in enumerate([100.0, 100.0, 101.0, 102.0, 104.0, 107.0]):
+        timestamp = START + timedelta(minutes=index)
+        recent_prices.append(price, timestamp)
+        fired.append([alert.alert_id for alert in engine.on_tick(price, timestamp)])
+
+    # 104 is 4% above 100 three minutes before, 107 is 5.9% above 101
+    assert fired == [[], [], [], [], [], [1]]
+
+
+def test_alerts_of_other_pairs_are_not_evaluated():
+    engine = PriceAlertEngine()
+    engine.add_alert(_alert(1, "above", 100.0, vs_currency="eur"))
+
+    assert _fired_ids(engine, [90.0, 110.0]) == [[], []]
+    assert _fired_ids(engine, [90.0, 110.0], vs_currency="eur") == [[], [1]]
+
+
+def test_removed_alert_no_longer_fires():
+    engine = PriceAlertEngine()
+    engine.load([_alert(1, "above", 100.0), _alert(2, "above", 100.0)])
+    engine.remove_alert(1)
+
+    assert len(engine) == 1
+    assert _fired_ids(engine, [90.0, 110.0]) == [[], [2]]
+
+
+def test_matches_brute_force_over_a_random_walk():
+    random.seed(11)
+    alerts = [_alert(alert_id, random.choice(["above", "below"]), random.uniform(80, 120),
+                     hysteresis_percent=random.choice([0.0, 1.0, 3.0]))
+              for alert_id in range(200)]
+    engine = PriceAlertEngine()
+    engine.load(alerts)
+
+    armed = {alert.id: True for alert in alerts}
+    price = previous_price = 100.0
+    for tick in range(2000):
+        price = max(previous_price + random.uniform(-2, 2), 1.0)
+        expected = []
+        for alert in alerts:
+            band = alert.threshold * alert.hysteresis_percent / 100
+            if tick > 0 and alert.kind == "above":
+                if previous_price < alert.threshold <= price and armed[alert.id]:
+                    armed[alert.id] = False
+                    expected.append(alert.id)
+                elif price <= alert.threshold - band < previous_price:
+                    armed[alert.id] = True
+            elif tick > 0:
+                if price <= alert.threshold < previous_price and armed[alert.id]:
+                    armed[alert.id] = False
+                    expected.append(alert.id)
+                elif previous_price < alert.threshold + band <= price:
+                    armed[alert.id] = True
+
+        fired = engine.on_tick(price, START + timedelta(minutes=tick))
+        assert sorted(alert.alert_id for alert in fired) == sorted(expected)
+        previous_price = price
+
+
+def test_sync_adds_and_removes_alerts_and_keeps_the_state_of_the_others():
+    engine = PriceAlertEngine()
+    engine.load([_alert(1, "above", 110.0), _alert(2, "below", 90.0)])
+    assert _fired_ids(engine, [100.0, 115.0]) == [[], [1]]
+
+    engine.sync([_alert(1, "above", 110.0), _alert(3, "above", 120.0)])
+
+    assert len(engine) == 2
+    # Alert 1 is still above its threshold so it does not fire again, the new alert 3 starts from this tick
+    assert _fired_ids(engine, [116.0, 121.0, 89.0], start=START + timedelta(minutes=2)) == [[], [3], []]
@@ -0,0 +1,73 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.database.database_manager import DatabaseManager
+from app.database.price_alert_repository import PriceAlertRepository
+from app.integration.email_outbox import EmailOutbox
+from app.service.price_alert_engine import PriceAlertEngine
+from app.service.price_alert_service import PriceAlertService
+
+
+def test_triggered_alerts_are_emailed_and_marked():
+    alert = SimpleNamespace(id=1, email="john@example.com", asset="bitcoin", vs_currency="usd", kind="above",
+                            threshold=100.0, window_minutes=None, cooldown_seconds=0, hysteresis_percent=0.0,
+                            last_triggered_at=None)
+    mock_repo = MagicMock(spec=PriceAlertRepository)
+    mock_repo.get_active_alerts.return_value = [alert]
+    mock_email_outbox = MagicMock(spec=EmailOutbox)
+    alert_service = PriceAlertService(mock_repo, PriceAlertEngine(), mock_email_outbox)
+
+    assert alert_service.load_alerts() == 1
+    alert_service.on_tick(90.0, datetime(2025, 1, 1, 12, 0))
+    mock_email_outbox.send_email.assert_not_called()
+
+    triggered_alerts = alert_service.on_tick(110.0, datetime(2025, 1, 1, 12, 1))
+
+    assert [triggered_alert.alert_id for triggered_alert in triggered_alerts] == [1]
+    message, _, destination = mock_email_outbox.send_email.call_args.args
+    assert "rose above 100.0" in message
+    assert destination == "john@example.com"
+    mock_repo.mark_triggered.assert_called_once_with([1], datetime(2025, 1, 1, 12, 1))
+
+
+def test_ticks_sync_the_alerts_once_per_interval():
+    alert = SimpleNamespace(id=1, email="john@example.com", asset="bitcoin", vs_currency="usd", kind="above",
+                            threshold=100.0, window_minutes=None, cooldown_seconds=0, hysteresis_percent=0.0,
+                            last_triggered_at=None)
+    mock_repo = MagicMock(spec=PriceAlertRepository)
+    mock_repo.get_active_alerts.return_value = []
+    alert_engine = PriceAlertEngine()
+    alert_service = PriceAlertService(mock_repo, alert_engine, MagicMock(spec=EmailOutbox), sync_interval_seconds=0)
+
+    mock_repo.get_active_alerts.return_value = [alert]
+    alert_service.on_tick(90.0, datetime(2025, 1, 1, 12, 0))
+    assert len(alert_engine) == 1
+
+    alert_service.sync_interval_seconds = 3600
+    mock_repo.get_active_alerts.return_value = []
+    alert_service.on_tick(90.0, datetime(2025, 1, 1, 12, 1))
+    assert len(alert_engine) == 1
+    assert mock_repo.get_active_alerts.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_alerts_of_another_subscriber_are_neither_read_nor_deleted(tmp_path):
+    # A file database, the repository is called from worker threads
+    db_manager = DatabaseManager(database_url=f"sqlite:///{tmp_path / 'alerts.db'}")
+    db_manager.create_tables()
+    alert_engine = PriceAlertEngine()
+    alert_service = PriceAlertService(PriceAlertRepository(db_manager.get_session()), alert_engine,
+                                      MagicMock(spec=EmailOutbox))
+    alert = await alert_service.create_alert(email="john@example.com", kind="above", threshold=100.0)
+
+    assert await alert_service.get_alert(alert.id, "jane@example.com") is None
+    assert await alert_service.delete_alert(alert.id, "jane@example.com") is False
+
+    assert (await alert_service.get_alert(alert.id, "john@example.com")).email == "john@example.com"
+    assert len(alert_engine) == 1
+    assert await alert_service.delete_alert(alert.id, "john@example.com") is True
+    assert len(alert_engine) == 0
+    db_manager.engine.dispose()
@@ -0,0 +1,20 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.price_bulk_loader import BulkLoadResult, PriceBulkLoader
+from app.service.price_backfill_service import PriceBackfillService
+
+
+def test_backfill_rebuilds_the_summaries_of_the_loaded_days():
+    mock_loader = MagicMock(spec=PriceBulkLoader)
+    mock_loader.load.return_value = BulkLoadResult(3, {("bitcoin", "usd"): (date(2024, 1, 1), date(2024, 1, 2))})
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.rebuild_summaries.return_value = 2
+    rows = [("bitcoin", "usd", datetime(2024, 1, 1), 1.0)]
+
+    result = PriceBackfillService(mock_loader, mock_repo).backfill(rows)
+
+    assert result.loaded_count == 3
+    mock_loader.load.assert_called_once_with(rows)
+    mock_repo.rebuild_summaries.assert_called_once_with(date(2024, 1, 1), date(2024, 1, 2), "bitcoin", "usd")
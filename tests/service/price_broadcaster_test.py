@@ -0,0 +1,67 @@
+import asyncio
+import json
+from datetime import date, datetime
+
+import pytest
+
+from app.service.price_broadcaster import PriceBroadcaster
+
+
+@pytest.mark.asyncio
+async def test_tick_is_encoded_once_for_every_subscriber():
+    broadcaster = PriceBroadcaster()
+    subscriptions = [broadcaster.subscribe() for _ in range(3)]
+
+    broadcaster.publish(100.0, datetime(2025, 1, 1, 12, 0), summary=(date(2025, 1, 1), 110.0, 90.0))
+    ticks = [await subscription.get(1) for subscription in subscriptions]
+
+    assert all(tick is ticks[0] for tick in ticks)
+    assert json.loads(ticks[0].json) == {"asset": "bitcoin", "vs_currency": "usd", "price": 100.0,
+                                         "timestamp": "2025-01-01 12:00:00",
+                                         "summary": {"date": "2025-01-01", "max_price": 110.0, "min_price": 90.0}}
+    assert ticks[0].sse == f"event: tick\ndata: {ticks[0].json}\n\n".encode()
+    assert broadcaster.published_count == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_from_another_thread_only_reaches_matching_subscribers():
+    broadcaster = PriceBroadcaster()
+    bitcoin_subscription = broadcaster.subscribe("bitcoin")
+    euro_subscription = broadcaster.subscribe(vs_currency="eur")
+
+    await asyncio.to_thread(broadcaster.publish, 100.0, datetime(2025, 1, 1, 12, 0), "bitcoin", "usd")
+    await asyncio.to_thread(broadcaster.publish, 3.0, datetime(2025, 1, 1, 12, 0), "ethereum", "eur")
+
+    assert json.loads((await bitcoin_subscription.get(1)).json)["price"] == 100.0
+    assert json.loads((await euro_subscription.get(1)).json)["price"] == 3.0
+    with pytest.raises(asyncio.TimeoutError):
+        await bitcoin_subscription.get(0.05)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_its_oldest_ticks():
+    broadcaster = PriceBroadcaster(max_queue_size=2)
+    slow_subscription = broadcaster.subscribe()
+
+    for price in [1.0, 2.0, 3.0, 4.0]:
+        broadcaster.publish(price, datetime(2025, 1, 1, 12, 0))
+    await asyncio.sleep(0)
+
+    assert slow_subscription.dropped_count == 2
+    assert [json.loads((await slow_subscription.get(1)).json)["price"] for _ in range(2)] == [3.0, 4.0]
+
+
+@pytest.mark.asyncio
+async def test_close_ends_the_streams_and_unsubscribe_stops_the_ticks():
+    broadcaster = PriceBroadcaster()
+    subscription = broadcaster.subscribe()
+    closed_subscription = broadcaster.subscribe()
+    closed_subscription.close()
+
+    broadcaster.close()
+
+    assert await subscription.get(1) is None
+    assert broadcaster.subscriber_count == 0
+    broadcaster.publish(100.0, datetime(2025, 1, 1, 12, 0))
+    with pytest.raises(asyncio.TimeoutError):
+        await closed_subscription.get(0.05)
@@ -0,0 +1,65 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import Base, DatabaseManager
+from app.service.price_export_service import PriceExportService
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture(scope="function")
+def db_manager():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    db_manager.create_tables()
+    BitcoinRepository(db_manager.get_session()).insert_prices(
+        [{"price": 100.0 + index, "timestamp": START + timedelta(minutes=index), "asset": "bitcoin",
+          "vs_currency": "usd"} for index in range(25)]
+        + [{"price": 3.0, "timestamp": START, "asset": "ethereum", "vs_currency": "usd"}])
+    yield db_manager
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def _export(db_manager, file_format, compress=False, start=None):
+    chunks = list(PriceExportService(db_manager.get_session, chunk_rows=10).export(
+        start, START + timedelta(days=1), file_format, compress))
+    return chunks, b"".join(chunks)
+
+
+def test_csv_export_is_streamed_in_chunks(db_manager):
+    chunks, data = _export(db_manager, "csv")
+
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert len(chunks) == 4
+    assert len(rows) == 25
+    assert rows[0] == {"asset": "bitcoin", "vs_currency": "usd", "timestamp": "2024-01-01T00:00:00.000000Z",
+                       "price": "100.0"}
+
+
+def test_ndjson_export_of_a_range(db_manager):
+    _, data = _export(db_manager, "ndjson", start=START + timedelta(minutes=20))
+
+    prices = [json.loads(line)["price"] for line in data.decode().splitlines()]
+    assert prices == [120.0, 121.0, 122.0, 123.0, 124.0]
+
+
+def test_gzipped_parquet_export(db_manager):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _, data = _export(db_manager, "parquet", compress=True)
+
+    table = pq.read_table(io.BytesIO(gzip.decompress(data)))
+    assert table.num_rows == 25
+    assert table.num_columns == 4
+    assert pq.ParquetFile(io.BytesIO(gzip.decompress(data))).num_row_groups == 3
+    assert table.column("price").to_pylist()[-1] == 124.0
+    assert table.column("timestamp").to_pylist()[0].isoformat() == "2024-01-01T00:00:00+00:00"
+
+
+def test_unknown_format_is_rejected(db_manager):
+    with pytest.raises(ValueError):
+        PriceExportService(db_manager.get_session).export(None, START, "xml")
@@ -0,0 +1,45 @@
+import random
+from datetime import date, timedelta
+
+from app.service.price_extremes import PriceExtremes, SlidingWindowExtrema
+
+
+def test_matches_brute_force_over_a_random_walk():
+    random.seed(7)
+    window = SlidingWindowExtrema(window_days=5)
+    values = []
+    price = 100.0
+    for tick in range(400):
+        day = date(2025, 1, 1) + timedelta(days=tick // 10)
+        price += random.uniform(-3, 3)
+        window.add(day, price, price)
+        values.append((day, price))
+
+        in_window = [value for value_day, value in values if value_day >= day - timedelta(days=5)]
+        assert window.get(day) == (max(in_window), min(in_window))
+
+
+def test_values_age_out_of_the_window_without_new_ticks():
+    window = SlidingWindowExtrema(window_days=90)
+    window.add(date(2025, 1, 1), 200.0, 50.0)
+    window.add(date(2025, 2, 1), 120.0, 100.0)
+
+    assert window.get(date(2025, 3, 1)) == (200.0, 50.0)
+    assert window.get(date(2025, 4, 2)) == (120.0, 100.0)
+    assert window.get(date(2025, 6, 1)) == (None, None)
+
+
+def test_window_is_built_once_per_pair():
+    price_extremes = PriceExtremes()
+    loads = []
+
+    def load_daily_extremes():
+        loads.append(1)
+        return [(date.today() - timedelta(days=1), 150.0, 90.0)]
+
+    first_window = price_extremes.get_or_build(("bitcoin", "usd"), load_daily_extremes)
+    second_window = price_extremes.get_or_build(("bitcoin", "usd"), load_daily_extremes)
+
+    assert first_window is second_window
+    assert len(loads) == 1
+    assert first_window.get(date.today()) == (150.0, 90.0)
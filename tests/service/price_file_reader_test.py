@@ -0,0 +1,56 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.service.price_file_reader import detect_format, iter_csv_prices, iter_market_chart_prices, iter_price_file
+
+
+def test_market_chart_entries_are_parsed_across_chunk_boundaries():
+    dump = json.dumps({"market_caps": [[1, 2]], "prices": [[1704067200000, 42000.5], [1704067260000, None],
+                                                           [1704067320000, 4.2e4]],
+                       "total_volumes": [[1, 2]]}, indent=2)
+
+    for chunk_size in (1, 7, 64, 1 << 16):
+        prices = list(iter_market_chart_prices(io.StringIO(dump), chunk_size))
+
+        assert prices == [(datetime(2024, 1, 1, 0, 0), 42000.5), (datetime(2024, 1, 1, 0, 2), 42000.0)]
+
+
+def test_empty_and_missing_prices_arrays():
+    assert list(iter_market_chart_prices(io.StringIO('{"prices": [ ], "market_caps": []}'))) == []
+
+    with pytest.raises(ValueError):
+        list(iter_market_chart_prices(io.StringIO('{"market_caps": [[1, 2]]}')))
+    with pytest.raises(ValueError):
+        list(iter_market_chart_prices(io.StringIO('{"prices": [[1704067200000, 42000.5], [17040')))
+
+
+def test_csv_timestamps_and_pairs():
+    csv_file = io.StringIO("timestamp,price,asset,vs_currency\n"
+                           "1704067200000,42000.5,,\n"
+                           "1704067260,42001,,eur\n"
+                           "2024-01-01T02:00:00+01:00,42002,ethereum,\n"
+                           "2024-01-01 01:03:00,,,\n")
+
+    assert list(iter_csv_prices(csv_file, "bitcoin", "usd")) == [
+        ("bitcoin", "usd", datetime(2024, 1, 1, 0, 0), 42000.5),
+        ("bitcoin", "eur", datetime(2024, 1, 1, 0, 1), 42001.0),
+        ("ethereum", "usd", datetime(2024, 1, 1, 1, 0), 42002.0),
+    ]
+
+
+def test_csv_without_the_required_columns_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_csv_prices(io.StringIO("time,value\n1,2\n")))
+
+
+def test_format_detection_and_rows_of_a_json_dump():
+    assert detect_format("history.json") == "json"
+    assert detect_format("history.CSV.gz") == "csv"
+    with pytest.raises(ValueError):
+        detect_format("history.txt")
+
+    rows = iter_price_file(io.StringIO('{"prices": [[1704067200000, 1.5]]}'), "json", "ethereum", "eur")
+    assert list(rows) == [("ethereum", "eur", datetime(2024, 1, 1), 1.5)]
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.model.bitcoin_summary import utc_today
+from app.integration.email_sender_integration import EmailSenderIntegration
+from app.jobs.price_follower_job import PriceFollower
+from app.service.bitcoin_service import BitcoinService
+from app.service.market_snapshot import MarketSnapshot
+from app.service.price_ring_buffer import RecentPrices
+
+
+def _price(price_id, price, timestamp, asset="bitcoin", vs_currency="usd"):
+    return SimpleNamespace(id=price_id, price=price, timestamp=timestamp, asset=asset, vs_currency=vs_currency)
+
+
+def test_apply_stored_prices_updates_the_in_memory_state_only():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.get_summaries_page.return_value = []
+    market_snapshot = MarketSnapshot()
+    recent_prices = RecentPrices(100)
+    bitcoin_service = BitcoinService(mock_repo, utc_today(), MagicMock(spec=EmailSenderIntegration),
+                                     market_snapshot=market_snapshot, recent_prices=recent_prices)
+    now = datetime.now()
+
+    bitcoin_service.apply_stored_prices([_price(7, 100.0, now - timedelta(minutes=1)), _price(8, 120.0, now)])
+
+    latest_price = market_snapshot.get_latest_price()
+    assert (latest_price.id, latest_price.price) == (8, 120.0)
+    assert market_snapshot.get_summary(utc_today()).max_price == 120.0
+    assert len(recent_prices.get()) == 2
+    assert bitcoin_service.get_price_extremes() == (120.0, 100.0)
+    mock_repo.insert_price.assert_not_called()
+    mock_repo.insert_prices.assert_not_called()
+    mock_repo.update_summary.assert_not_called()
+
+
+def test_follower_applies_the_prices_stored_after_its_start_in_batches():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_service = MagicMock(spec=BitcoinService)
+    mock_repo.get_last_price_id.return_value = 10
+    follower = PriceFollower(mock_repo, mock_service, batch_size=2)
+    now = datetime.now()
+    stored_prices = [_price(price_id, 100.0 + price_id, now) for price_id in (11, 12, 13)]
+    mock_repo.get_prices_after_id.side_effect = [stored_prices[:2], stored_prices[2:], []]
+
+    # The first run only records where to start, older prices are loaded at startup
+    assert follower.follow() == 0
+    mock_repo.get_prices_after_id.assert_not_called()
+
+    assert follower.follow() == 3
+    assert [call.args[0] for call in mock_repo.get_prices_after_id.call_args_list] == [10, 12]
+    assert mock_service.apply_stored_prices.call_count == 2
+
+    assert follower.follow() == 0
+    assert mock_repo.get_prices_after_id.call_args.args[0] == 13
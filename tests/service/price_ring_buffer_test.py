@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.service.price_ring_buffer import PriceRingBuffer, RecentPrices, to_epoch_ms
+
+START = datetime(2025, 4, 6, 12, 0)
+
+
+def _minutes(*offsets: int) -> list[int]:
+    return [to_epoch_ms(START + timedelta(minutes=offset)) for offset in offsets]
+
+
+def test_append_overwrites_oldest_tick_once_full():
+    buffer = PriceRingBuffer(3)
+    for offset in range(5):
+        buffer.append(START + timedelta(minutes=offset), 100.0 + offset)
+
+    timestamps, prices = buffer.to_arrays()
+
+    assert len(buffer) == 3
+    assert timestamps.tolist() == _minutes(2, 3, 4)
+    assert prices.tolist() == [102.0, 103.0, 104.0]
+    assert buffer.latest() == (_minutes(4)[0], 104.0)
+    assert buffer.version == 5
+
+
+def test_append_ignores_out_of_order_tick():
+    buffer = PriceRingBuffer(3)
+    buffer.append(START, 100.0)
+
+    assert buffer.append(START - timedelta(minutes=1), 99.0) is False
+    assert len(buffer) == 1
+
+
+def test_trim_older_than_across_the_wrap():
+    buffer = PriceRingBuffer(4)
+    for offset in range(6):
+        buffer.append(START + timedelta(minutes=offset), 100.0 + offset)
+
+    removed_count = buffer.trim_older_than(START + timedelta(minutes=4))
+    buffer.append(START + timedelta(minutes=6), 106.0)
+
+    assert removed_count == 2
+    assert buffer.to_arrays()[1].tolist() == [104.0, 105.0, 106.0]
+
+
+def test_extend_keeps_latest_capacity_ticks():
+    buffer = PriceRingBuffer(3)
+    buffer.append(START, 100.0)
+
+    buffer.extend(_minutes(1, 2, 3), [101.0, 102.0, 103.0])
+
+    assert buffer.to_arrays()[1].tolist() == [101.0, 102.0, 103.0]
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        PriceRingBuffer(0)
+
+
+def test_hydrate_loads_every_pair_from_the_repository():
+    mock_repo = MagicMock(spec=BitcoinRepository)
+    mock_repo.iter_prices.return_value = iter([
+        ("bitcoin", "usd", START, 100.0),
+        ("bitcoin", "usd", START + timedelta(minutes=1), 101.0),
+        ("ethereum", "eur", START, 3.0),
+    ])
+    recent_prices = RecentPrices(10)
+
+    loaded_count = recent_prices.hydrate(mock_repo, START - timedelta(days=90), START + timedelta(hours=1))
+
+    assert loaded_count == 3
+    assert recent_prices.get().to_arrays()[1].tolist() == [100.0, 101.0]
+    assert recent_prices.get("ethereum", "eur").to_arrays()[1].tolist() == [3.0]
+    mock_repo.iter_prices.assert_called_once_with(START - timedelta(days=90), START + timedelta(hours=1))
+
+    recent_prices.append(102.0, START + timedelta(minutes=2))
+    assert recent_prices.trim_older_than(START + timedelta(minutes=1)) == 2
+    assert recent_prices.get().to_arrays()[1].tolist() == [101.0, 102.0]
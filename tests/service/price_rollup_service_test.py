@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.database.bitcoin_repository import BitcoinRepository
+from app.database.database_manager import DatabaseManager, Base
+from app.service.price_rollup_service import PriceRollupService
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+@pytest.fixture(scope="function")
+def repository():
+    db_manager = DatabaseManager(database_url="sqlite:///:memory:")
+    db_manager.create_tables()
+
+    session = db_manager.get_session()
+    yield BitcoinRepository(session)
+
+    session.close()
+    Base.metadata.drop_all(bind=db_manager.engine)
+
+
+def test_roll_up_prices_older_than(repository: BitcoinRepository):
+    cutoff = datetime(2025, 1, 3)
+    day = datetime(2025, 1, 2)
+    repository.insert_prices([{"price": 100 + minute, "timestamp": day + timedelta(minutes=minute)}
+                              for minute in range(10)])
+    repository.insert_price(500, cutoff)
+
+    saved_count = PriceRollupService(repository).roll_up_prices_older_than(cutoff)
+
+    five_minute_candles = repository.get_candles("5m", day, cutoff, 100)
+    hourly_candles = repository.get_candles("1h", day, cutoff, 100)
+    daily_candles = repository.get_candles("1d", day, cutoff, 100)
+
+    assert saved_count == 4
+    assert [(candle.open_price, candle.close_price, candle.tick_count) for candle in five_minute_candles] == [
+        (100, 104, 5), (105, 109, 5)]
+    assert [(candle.low_price, candle.high_price, candle.tick_count) for candle in hourly_candles] == [(100, 109, 10)]
+    assert daily_candles[0].tick_count == 10
+    assert repository.get_candles("1m", day, cutoff, 100) == []
+
+
+def test_roll_up_overwrites_partial_live_candles(repository: BitcoinRepository):
+    cutoff = datetime(2025, 1, 3)
+    day = datetime(2025, 1, 2)
+    repository.insert_prices([{"price": 100 + minute, "timestamp": day + timedelta(minutes=minute)}
+                              for minute in range(5)])
+    rollup_service = PriceRollupService(repository)
+
+    rollup_service.roll_up_prices_older_than(cutoff)
+    rollup_service.roll_up_prices_older_than(cutoff)
+
+    assert repository.get_candles("5m", day, cutoff, 100)[0].tick_count == 5
+
+
+def test_choose_tier():
+    rollup_service = PriceRollupService(MagicMock(spec=BitcoinRepository))
+
+    assert rollup_service.choose_tier(NOW - timedelta(days=1), 60, NOW).interval == "1m"
+    assert rollup_service.choose_tier(NOW - timedelta(days=1), 600, NOW).interval == "5m"
+    assert rollup_service.choose_tier(NOW - timedelta(days=30), 7200, NOW).interval == "1h"
+    assert rollup_service.choose_tier(NOW - timedelta(days=400), 86400 * 7, NOW).interval == "1d"
+    # The 1m tier no longer holds data a year ago, the finest tier still covering it is used
+    assert rollup_service.choose_tier(NOW - timedelta(days=365), 60, NOW).interval == "5m"
+    assert rollup_service.choose_tier(NOW - timedelta(days=1000), 60, NOW).interval == "1h"
+
+
+def test_apply_candle_retention():
+    repository = MagicMock(spec=BitcoinRepository)
+
+    PriceRollupService(repository).apply_candle_retention(NOW)
+
+    deleted_intervals = {call.args[0]: call.args[1] for call in repository.delete_candles_older_than.call_args_list}
+    assert deleted_intervals == {"1m": NOW - timedelta(days=90), "5m": NOW - timedelta(days=730)}
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.service.price_ring_buffer import RecentPrices
+from app.service.price_stats_service import PriceStatsService, parse_duration
+
+START = datetime(2025, 4, 6, 12, 0)
+
+
+def _recent_prices(prices: list[float]) -> RecentPrices:
+    recent_prices = RecentPrices(100)
+    for offset, price in enumerate(prices):
+        recent_prices.append(price, START + timedelta(minutes=offset))
+    return recent_prices
+
+
+def test_parse_duration():
+    assert parse_duration("15m") == 900
+    assert parse_duration("24h") == 86400
+    assert parse_duration("7d") == 7 * 86400
+    for invalid_duration in ["", "0m", "1w", "h1", "-1h"]:
+        with pytest.raises(ValueError):
+            parse_duration(invalid_duration)
+
+
+def test_window_stats_match_the_iterative_definitions():
+    prices = [100.0, 110.0, 99.0, 105.0, 120.0, 90.0]
+    price_stats_service = PriceStatsService(_recent_prices(prices))
+
+    stats = price_stats_service.get_stats([3 * 60, 3600])
+    short_window, long_window = stats.windows
+
+    assert stats.price == 90.0
+    assert short_window.tick_count == 4
+    assert short_window.sma == pytest.approx(np.mean(prices[-4:]))
+    assert long_window.tick_count == 6
+
+    alpha = 2 / (len(prices) + 1)
+    ema = prices[0]
+    for price in prices[1:]:
+        ema = alpha * price + (1 - alpha) * ema
+    assert long_window.ema == pytest.approx(ema)
+    assert long_window.volatility == pytest.approx(np.std(np.diff(np.log(prices)), ddof=1))
+    assert long_window.max_drawdown == pytest.approx(90.0 / 120.0 - 1)
+
+
+def test_changes_use_the_price_one_period_ago():
+    recent_prices = RecentPrices(100)
+    recent_prices.append(100.0, START)
+    recent_prices.append(150.0, START + timedelta(minutes=30))
+    recent_prices.append(110.0, START + timedelta(hours=1))
+
+    stats = PriceStatsService(recent_prices).get_stats([3600])
+
+    assert stats.changes["1h"] == pytest.approx(10.0)
+    assert stats.changes["24h"] is None
+
+
+def test_results_are_memoized_until_the_next_tick():
+    recent_prices = _recent_prices([100.0, 110.0])
+    price_stats_service = PriceStatsService(recent_prices)
+
+    first_stats = price_stats_service.get_stats([3600])
+    assert price_stats_service.get_stats([3600]).windows[0] is first_stats.windows[0]
+
+    recent_prices.append(130.0, START + timedelta(minutes=2))
+    new_stats = price_stats_service.get_stats([3600])
+
+    assert new_stats.windows[0] is not first_stats.windows[0]
+    assert new_stats.windows[0].tick_count == 3
+
+
+def test_no_stats_without_ticks():
+    assert PriceStatsService(RecentPrices(10)).get_stats([3600]) is None
+
+
+def test_untracked_pairs_are_not_memoized():
+    recent_prices = _recent_prices([100.0, 110.0])
+    price_stats_service = PriceStatsService(recent_prices)
+
+    assert price_stats_service.get_stats([3600], "dogecoin", "usd") is None
+
+    assert recent_prices.find("dogecoin", "usd") is None
+    assert price_stats_service._memo == {}